@@ -0,0 +1,34 @@
+"""add source file signature to tacacslogdailytotals
+
+Revision ID: a2b3c4d5e6f7
+Revises: f1a2b3c4d5e6
+Create Date: 2026-10-16 22:00:00.000000
+
+Stored closed-day totals of the local node are recomputed when the size or
+mtime of their log file changes. Existing rows have no signature and are
+recomputed on their next request.
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "a2b3c4d5e6f7"
+down_revision = "f1a2b3c4d5e6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "tacacslogdailytotals", sa.Column("source_size", sa.BigInteger(), nullable=True)
+    )
+    op.add_column(
+        "tacacslogdailytotals",
+        sa.Column("source_mtime_ns", sa.BigInteger(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_column("tacacslogdailytotals", "source_mtime_ns")
+    op.drop_column("tacacslogdailytotals", "source_size")
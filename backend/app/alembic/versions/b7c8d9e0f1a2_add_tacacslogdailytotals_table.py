@@ -0,0 +1,39 @@
+"""add tacacslogdailytotals table (closed-day log event summaries)
+
+Revision ID: b7c8d9e0f1a2
+Revises: a1b2c3d4e5f7
+Create Date: 2026-10-16 09:00:00.000000
+
+"""
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b7c8d9e0f1a2"
+down_revision = "a1b2c3d4e5f7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "tacacslogdailytotals",
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("success", sa.Integer(), nullable=False),
+        sa.Column("failed", sa.Integer(), nullable=False),
+        sa.Column("permit", sa.Integer(), nullable=False),
+        sa.Column("deny", sa.Integer(), nullable=False),
+        sa.Column("start", sa.Integer(), nullable=False),
+        sa.Column("stop", sa.Integer(), nullable=False),
+        sa.Column("total", sa.Integer(), nullable=False),
+        sa.Column("log_date", sa.Date(), nullable=False),
+        sa.Column("node_name", sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False),
+        sa.Column("log_type", sqlmodel.sql.sqltypes.AutoString(length=32), nullable=False),
+        sa.PrimaryKeyConstraint("log_date", "node_name", "log_type"),
+    )
+
+
+def downgrade():
+    op.drop_table("tacacslogdailytotals")
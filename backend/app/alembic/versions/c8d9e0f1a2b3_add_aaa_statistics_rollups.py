@@ -0,0 +1,89 @@
+"""add aaa statistics rollup tables (daily per node, per-key daily/monthly)
+
+Revision ID: c8d9e0f1a2b3
+Revises: b7c8d9e0f1a2
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c8d9e0f1a2b3"
+down_revision = "b7c8d9e0f1a2"
+branch_labels = None
+depends_on = None
+
+# table -> (log_type, first count, second count, node-daily first, node-daily second)
+_TABLES = {
+    "authenticationstatistics": ("authentication", "success_count", "fail_count", "auth_success", "auth_fail"),
+    "authorizationstatistics": ("authorization", "permit_count", "deny_count", "authz_permit", "authz_deny"),
+    "accountingstatistics": ("accounting", "start_count", "stop_count", "acct_start", "acct_stop"),
+}
+_DIMENSIONS = ("username", "nas_ip", "user_source_ip")
+
+
+def upgrade():
+    op.create_table(
+        "aaastatisticsnodedaily",
+        sa.Column("log_date", sa.Date(), nullable=False),
+        sa.Column("node_name", sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False),
+        sa.Column("auth_success", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("auth_fail", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("authz_permit", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("authz_deny", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("acct_start", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("acct_stop", sa.Integer(), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("log_date", "node_name"),
+    )
+    op.create_table(
+        "aaastatisticskeyrollup",
+        sa.Column("grain", sqlmodel.sql.sqltypes.AutoString(length=8), nullable=False),
+        sa.Column("log_type", sqlmodel.sql.sqltypes.AutoString(length=32), nullable=False),
+        sa.Column("dimension", sqlmodel.sql.sqltypes.AutoString(length=32), nullable=False),
+        sa.Column("period", sa.Date(), nullable=False),
+        sa.Column("node_name", sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False),
+        sa.Column("value", sqlmodel.sql.sqltypes.AutoString(length=1024), nullable=False),
+        sa.Column("first_count", sa.Integer(), nullable=False),
+        sa.Column("second_count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("grain", "log_type", "dimension", "period", "node_name", "value"),
+    )
+
+    # Build the rollups of the statistics already stored.
+    for table, (log_type, first, second, daily_first, daily_second) in _TABLES.items():
+        op.execute(
+            f"""
+            INSERT INTO aaastatisticsnodedaily (log_date, node_name, {daily_first}, {daily_second})
+            SELECT CAST(log_date AS date), node_name, SUM({first}), SUM({second})
+            FROM {table}
+            GROUP BY CAST(log_date AS date), node_name
+            ON CONFLICT (log_date, node_name) DO UPDATE
+            SET {daily_first} = EXCLUDED.{daily_first}, {daily_second} = EXCLUDED.{daily_second}
+            """
+        )
+        for dimension in _DIMENSIONS:
+            op.execute(
+                f"""
+                INSERT INTO aaastatisticskeyrollup
+                SELECT 'day', '{log_type}', '{dimension}', CAST(log_date AS date), node_name,
+                       {dimension}, SUM({first}), SUM({second})
+                FROM {table}
+                GROUP BY CAST(log_date AS date), node_name, {dimension}
+                """
+            )
+    op.execute(
+        """
+        INSERT INTO aaastatisticskeyrollup
+        SELECT 'month', log_type, dimension, CAST(date_trunc('month', period) AS date), node_name,
+               value, SUM(first_count), SUM(second_count)
+        FROM aaastatisticskeyrollup
+        WHERE grain = 'day'
+        GROUP BY log_type, dimension, date_trunc('month', period), node_name, value
+        """
+    )
+
+
+def downgrade():
+    op.drop_table("aaastatisticskeyrollup")
+    op.drop_table("aaastatisticsnodedaily")
@@ -0,0 +1,49 @@
+"""replace single-column statistics indexes with (log_date, node_name) covering indexes
+
+Revision ID: d9e0f1a2b3c4
+Revises: c8d9e0f1a2b3
+Create Date: 2026-10-16 14:00:00.000000
+
+Every query left on the raw statistics tables filters on a log_date range or
+day, usually with node_name: live fallbacks for offline peers, rollup refresh,
+event summaries, the list endpoints, feature matrix and alert baselines. One
+(log_date, node_name) index per table INCLUDE-ing the columns those queries
+read replaces the four single-column indexes, which no query used and which
+every bulk upsert had to maintain. Lookups by username still use the unique
+key, which starts with username.
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d9e0f1a2b3c4"
+down_revision = "c8d9e0f1a2b3"
+branch_labels = None
+depends_on = None
+
+_INCLUDE = {
+    "authenticationstatistics": ["username", "user_source_ip", "success_count", "fail_count"],
+    "authorizationstatistics": ["username", "permit_count", "deny_count"],
+    "accountingstatistics": ["start_count", "stop_count"],
+}
+_SINGLE_COLUMN = ("node_name", "username", "nas_ip", "user_source_ip")
+
+
+def upgrade():
+    for table, include in _INCLUDE.items():
+        op.create_index(
+            f"ix_{table}_log_date_node_name",
+            table,
+            ["log_date", "node_name"],
+            unique=False,
+            postgresql_include=include,
+        )
+        for column in _SINGLE_COLUMN:
+            op.drop_index(f"ix_{table}_{column}", table_name=table)
+
+
+def downgrade():
+    for table in _INCLUDE:
+        for column in _SINGLE_COLUMN:
+            op.create_index(f"ix_{table}_{column}", table, [column], unique=False)
+        op.drop_index(f"ix_{table}_log_date_node_name", table_name=table)
@@ -0,0 +1,104 @@
+"""partition the raw statistics tables by month on log_date
+
+Revision ID: e0f1a2b3c4d5
+Revises: d9e0f1a2b3c4
+Create Date: 2026-10-16 16:00:00.000000
+
+Each table is rebuilt as PARTITION BY RANGE (log_date) with one partition per
+month that holds data, plus the current month and the next three; the
+scheduler's daily partition maintenance creates later ones. The partition key
+has to be part of every unique constraint, so the primary key becomes
+(id, log_date); the unique key already includes log_date. Rows are copied in
+one INSERT … SELECT per table, so plan the upgrade for a quiet period on large
+installations.
+
+"""
+from datetime import date, datetime, timezone
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e0f1a2b3c4d5"
+down_revision = "d9e0f1a2b3c4"
+branch_labels = None
+depends_on = None
+
+_INCLUDE = {
+    "authenticationstatistics": ["username", "user_source_ip", "success_count", "fail_count"],
+    "authorizationstatistics": ["username", "permit_count", "deny_count"],
+    "accountingstatistics": ["start_count", "stop_count"],
+}
+_UNIQUE = {
+    "authenticationstatistics": "uq_authenticationstatistics_username_nas_ip_src_ip_log_date_nod",
+    "authorizationstatistics": "uq_authorizationstatistics_username_nas_ip_src_ip_log_date_node",
+    "accountingstatistics": "uq_accountingstatistics_username_nas_ip_src_ip_log_date_node",
+}
+_UNIQUE_COLUMNS = ["username", "nas_ip", "user_source_ip", "log_date", "node_name"]
+_MONTHS_AHEAD = 3
+
+
+def _add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _detach_keys(table, old):
+    """Rename ``table`` to ``old`` and drop its keys so their names are free."""
+    op.rename_table(table, old)
+    op.drop_index(f"ix_{table}_log_date_node_name", table_name=old)
+    op.drop_constraint(_UNIQUE[table], old, type_="unique")
+    op.drop_constraint(f"{table}_pkey", old, type_="primary")
+
+
+def _add_keys(table, primary_key):
+    op.create_primary_key(f"{table}_pkey", table, primary_key)
+    op.create_unique_constraint(_UNIQUE[table], table, _UNIQUE_COLUMNS)
+    op.create_index(
+        f"ix_{table}_log_date_node_name",
+        table,
+        ["log_date", "node_name"],
+        unique=False,
+        postgresql_include=_INCLUDE[table],
+    )
+
+
+def upgrade():
+    conn = op.get_bind()
+    current = datetime.now(timezone.utc).date().replace(day=1)
+    for table in _INCLUDE:
+        old = f"{table}_unpartitioned"
+        _detach_keys(table, old)
+        op.execute(
+            f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS)"
+            " PARTITION BY RANGE (log_date)"
+        )
+        _add_keys(table, ["id", "log_date"])
+
+        months = {
+            row[0].date()
+            for row in conn.execute(
+                sa.text(f"SELECT DISTINCT date_trunc('month', log_date) FROM {old}")
+            )
+        }
+        months.update(_add_months(current, n) for n in range(_MONTHS_AHEAD + 1))
+        for month in sorted(months):
+            op.execute(
+                f"CREATE TABLE {table}_p{month:%Y%m} PARTITION OF {table}"
+                f" FOR VALUES FROM ('{month.isoformat()}')"
+                f" TO ('{_add_months(month, 1).isoformat()}')"
+            )
+
+        op.execute(f"INSERT INTO {table} SELECT * FROM {old}")
+        op.drop_table(old)
+
+
+def downgrade():
+    for table in _INCLUDE:
+        old = f"{table}_partitioned"
+        _detach_keys(table, old)
+        op.execute(f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS)")
+        op.execute(f"INSERT INTO {table} SELECT * FROM {old}")
+        # Dropping the partitioned table drops its partitions.
+        op.drop_table(old)
+        _add_keys(table, ["id"])
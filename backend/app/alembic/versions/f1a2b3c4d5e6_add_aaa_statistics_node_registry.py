@@ -0,0 +1,40 @@
+"""add aaa statistics node registry
+
+Revision ID: f1a2b3c4d5e6
+Revises: e0f1a2b3c4d5
+Create Date: 2026-10-16 18:00:00.000000
+
+Node lists (/aaa_statistics/nodes/, offline-peer fallbacks, the log summary)
+read this table instead of a DISTINCT node_name over the three statistics
+tables. It is filled from the per-node daily rollup, which holds every
+(day, node) with statistics.
+
+"""
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "f1a2b3c4d5e6"
+down_revision = "e0f1a2b3c4d5"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "aaastatisticsnode",
+        sa.Column("node_name", sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False),
+        sa.Column("first_log_date", sa.Date(), nullable=False),
+        sa.Column("last_log_date", sa.Date(), nullable=False),
+        sa.PrimaryKeyConstraint("node_name"),
+    )
+    op.execute(
+        "INSERT INTO aaastatisticsnode (node_name, first_log_date, last_log_date)"
+        " SELECT node_name, min(log_date), max(log_date)"
+        " FROM aaastatisticsnodedaily GROUP BY node_name"
+    )
+
+
+def downgrade():
+    op.drop_table("aaastatisticsnode")
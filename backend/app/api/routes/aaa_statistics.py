@@ -1,8 +1,5 @@
 import logging
-import subprocess
-import sys
 from datetime import datetime, time, timedelta, timezone
-from pathlib import Path
 from typing import Any
 
 import httpx
@@ -13,13 +10,12 @@ from app.api.deps import SessionDep, get_current_active_superuser, get_current_u
 from app.core.config import settings
 from app.core.db import engine
 from app.crud import aaa_statistics
+from app.crud.stats_transport import STATS_ACCEPT, decode_stats_response
 from app.models import (
     AaaStatisticsDateRangePublic,
     AaaStatisticsTodayPublic,
-    AccountingStatistics,
-    AuthenticationStatistics,
-    AuthorizationStatistics,
 )
+from scripts._log_stats_base import previous_local_date
 
 log = logging.getLogger(__name__)
 
@@ -30,9 +26,9 @@ router = APIRouter(prefix="/aaa_statistics", tags=["aaa_statistics"])
     "/nodes/",
     dependencies=[Depends(get_current_user)],
 )
-def list_aaa_nodes(session: SessionDep) -> list[str]:
-    """Return distinct node_name values present in AAA statistics tables."""
-    return aaa_statistics.get_distinct_node_names(session)
+def list_aaa_nodes() -> list[str]:
+    """Return the node_name values that have AAA statistics."""
+    return aaa_statistics.get_distinct_node_names()
 
 
 @router.get(
@@ -57,10 +53,7 @@ def read_aaa_statistics(
     )
 
     return_statistics.update(
-        aaa_statistics.process_today_authentication_statistics(
-            session=session,
-            node_name=node_name,
-        )
+        aaa_statistics.process_today_authentication_statistics(node_name=node_name)
     )
 
     return return_statistics
@@ -100,127 +93,38 @@ def read_aaa_statistics_range(
         end_date = datetime.now(timezone.utc)
         start_date = end_date - timedelta(days=7)
 
-    return_statistics = {}
-    return_statistics.update(
-        aaa_statistics.get_date_range_statistics(
-            session=session,
-            start_date=start_date,
-            end_date=end_date,
-            node_name=node_name,
-        )
-    )
-    return_statistics.update(
-        aaa_statistics.process_authentication_statistics(
-            session=session,
-            start_date=start_date,
-            end_date=end_date,
-            skip=skip,
-            limit=limit,
-            node_name=node_name,
-        )
-    )
-    return_statistics.update(
-        aaa_statistics.process_authorization_statistics(
-            session=session,
-            start_date=start_date,
-            end_date=end_date,
-            skip=skip,
-            limit=limit,
-            node_name=node_name,
-        )
+    return aaa_statistics.get_date_range_statistics(
+        session=session,
+        start_date=start_date,
+        end_date=end_date,
+        skip=skip,
+        limit=limit,
+        node_name=node_name,
     )
 
-    return return_statistics
-
 
 def _upsert_peer_stats(session: Session, data: dict[str, Any]) -> None:
     """Write stats returned by a peer's collect-stats endpoint into the local DB."""
-    from datetime import datetime as dt
-
-    from sqlmodel import select as sel
-
     peer_node = data.get("node_name", "unknown")
-
-    for row in data.get("authentication", []):
-        log_dt = dt.fromisoformat(row["log_date"])
-        auth_stmt = sel(AuthenticationStatistics).where(
-            AuthenticationStatistics.username == row["username"],
-            AuthenticationStatistics.nas_ip == row["nas_ip"],
-            AuthenticationStatistics.user_source_ip == row["user_source_ip"],
-            AuthenticationStatistics.log_date == log_dt,
-            AuthenticationStatistics.node_name == peer_node,
-        )
-        auth_obj = session.exec(auth_stmt).first()
-        if auth_obj:
-            auth_obj.success_count = row["success_count"]
-            auth_obj.fail_count = row["fail_count"]
-        else:
-            auth_obj = AuthenticationStatistics(
-                username=row["username"],
-                nas_ip=row["nas_ip"],
-                user_source_ip=row["user_source_ip"],
-                success_count=row["success_count"],
-                fail_count=row["fail_count"],
-                log_date=log_dt,
-                node_name=peer_node,
-            )
-        session.add(auth_obj)
-
-    for row in data.get("authorization", []):
-        log_dt = dt.fromisoformat(row["log_date"])
-        authz_stmt = sel(AuthorizationStatistics).where(
-            AuthorizationStatistics.username == row["username"],
-            AuthorizationStatistics.nas_ip == row["nas_ip"],
-            AuthorizationStatistics.user_source_ip == row["user_source_ip"],
-            AuthorizationStatistics.log_date == log_dt,
-            AuthorizationStatistics.node_name == peer_node,
-        )
-        authz_obj = session.exec(authz_stmt).first()
-        if authz_obj:
-            authz_obj.permit_count = row["permit_count"]
-            authz_obj.deny_count = row["deny_count"]
-        else:
-            authz_obj = AuthorizationStatistics(
-                username=row["username"],
-                nas_ip=row["nas_ip"],
-                user_source_ip=row["user_source_ip"],
-                permit_count=row["permit_count"],
-                deny_count=row["deny_count"],
-                log_date=log_dt,
-                node_name=peer_node,
-            )
-        session.add(authz_obj)
-
-    for row in data.get("accounting", []):
-        log_dt = dt.fromisoformat(row["log_date"])
-        acct_stmt = sel(AccountingStatistics).where(
-            AccountingStatistics.username == row["username"],
-            AccountingStatistics.nas_ip == row["nas_ip"],
-            AccountingStatistics.user_source_ip == row["user_source_ip"],
-            AccountingStatistics.log_date == log_dt,
-            AccountingStatistics.node_name == peer_node,
+    for log_type in aaa_statistics.STATISTICS_TABLES:
+        rows = aaa_statistics.peer_statistics_rows(
+            log_type, data.get(log_type, []), peer_node
         )
-        acct_obj = session.exec(acct_stmt).first()
-        if acct_obj:
-            acct_obj.start_count = row["start_count"]
-            acct_obj.stop_count = row["stop_count"]
-        else:
-            acct_obj = AccountingStatistics(
-                username=row["username"],
-                nas_ip=row["nas_ip"],
-                user_source_ip=row["user_source_ip"],
-                start_count=row["start_count"],
-                stop_count=row["stop_count"],
-                log_date=log_dt,
-                node_name=peer_node,
-            )
-        session.add(acct_obj)
+        aaa_statistics.upsert_statistics(session, log_type, rows)
+
+
+# (peer url, date) -> collect-stats cursor of the last rows written to the DB
+_peer_stats_cursors: dict[tuple[str, str], str] = {}
 
-    session.commit()
 
+def _collect_from_peers(
+    date_str: str | None, incremental: bool = False
+) -> dict[str, Any]:
+    """Call each peer's internal collect-stats endpoint and upsert results.
 
-def _collect_from_peers(date_str: str | None) -> dict[str, Any]:
-    """Call each peer's internal collect-stats endpoint and upsert results."""
+    With ``incremental`` (and a date), each peer is asked only for the rows that
+    changed since the previous call's cursor.
+    """
     peer_urls = [u.strip() for u in settings.PEER_NODES.split(",") if u.strip()]
     if not peer_urls and settings.PEER_BACKEND_URL:
         peer_urls = [settings.PEER_BACKEND_URL]
@@ -232,17 +136,33 @@ def _collect_from_peers(date_str: str | None) -> dict[str, Any]:
         log.warning("INTERNAL_SYNC_TOKEN not set — skipping peer stats collection.")
         return {}
 
+    if incremental and date_str:
+        # Only the day being collected needs cursors: forget earlier days and
+        # peers that are no longer configured.
+        for key in [
+            key
+            for key in _peer_stats_cursors
+            if key[1] != date_str or key[0] not in peer_urls
+        ]:
+            del _peer_stats_cursors[key]
+
     peer_results: dict[str, Any] = {}
-    params = {"date": date_str} if date_str else {}
 
     for url in peer_urls:
+        params = {"date": date_str} if date_str else {}
+        cursor_key = (url, date_str) if incremental and date_str else None
+        if cursor_key in _peer_stats_cursors:
+            params["since"] = _peer_stats_cursors[cursor_key]
         endpoint = f"{url.rstrip('/')}/api/v1/sync/internal/collect-stats"
         try:
             with httpx.Client(timeout=60) as client:
                 resp = client.post(
                     endpoint,
                     params=params,
-                    headers={"X-Internal-Token": settings.INTERNAL_SYNC_TOKEN},
+                    headers={
+                        "X-Internal-Token": settings.INTERNAL_SYNC_TOKEN,
+                        "Accept": STATS_ACCEPT,
+                    },
                 )
         except httpx.RequestError as e:
             log.warning("Peer %s collect-stats request failed: %s", url, e)
@@ -254,12 +174,14 @@ def _collect_from_peers(date_str: str | None) -> dict[str, Any]:
             peer_results[url] = {"error": f"HTTP {resp.status_code}"}
             continue
 
-        data = resp.json()
+        data = decode_stats_response(resp)
         peer_node = data.get("node_name", url)
         log.info("Received stats from peer node '%s' (%s)", peer_node, url)
 
         with Session(engine) as session:
             _upsert_peer_stats(session, data)
+        if cursor_key and data.get("cursor"):
+            _peer_stats_cursors[cursor_key] = data["cursor"]
 
         peer_results[url] = {"node_name": peer_node, "status": "ok"}
 
@@ -270,37 +192,23 @@ def _collect_from_peers(date_str: str | None) -> dict[str, Any]:
     "/run/",
     dependencies=[Depends(get_current_active_superuser)],
 )
-def run_aaa_statistics(date: str | None = None) -> Any:
-    """Manually trigger AAA statistics scripts for a given date (YYYY-MM-DD) or yesterday.
+def run_aaa_statistics(session: SessionDep, date: str | None = None) -> Any:
+    """Manually collect AAA statistics for a given date (YYYY-MM-DD) or yesterday.
 
-    On the primary node (SCHEDULER_ENABLED=true), also collects stats from all peer nodes
-    configured in PEER_NODES.
+    Runs in-process against the shared log event store. On the primary node
+    (SCHEDULER_ENABLED=true), also collects stats from all peer nodes configured
+    in PEER_NODES.
     """
-    scripts = [
-        "/app/scripts/tacacs_logs_authentication.py",
-        "/app/scripts/tacacs_logs_authorization.py",
-        "/app/scripts/tacacs_logs_accounting.py",
-    ]
-    results: dict[str, Any] = {}
-    args = [date] if date else []
-    for script in scripts:
-        name = Path(script).stem
+    if date:
         try:
-            proc = subprocess.run(
-                [sys.executable, script, *args],
-                capture_output=True,
-                text=True,
-                timeout=120,
-            )
-            results[name] = {
-                "returncode": proc.returncode,
-                "stdout": proc.stdout[-2000:] if proc.stdout else "",
-                "stderr": proc.stderr[-1000:] if proc.stderr else "",
-            }
-        except subprocess.TimeoutExpired:
-            results[name] = {"returncode": -1, "error": "timeout"}
-        except Exception as e:
-            results[name] = {"returncode": -1, "error": str(e)}
+            target_date = datetime.strptime(date, "%Y-%m-%d").date()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="date must be YYYY-MM-DD")
+    else:
+        target_date = previous_local_date()
+    results: dict[str, Any] = aaa_statistics.collect_local_statistics(
+        session, target_date
+    )
 
     # Collect stats from peer nodes (primary only)
     if settings.SCHEDULER_ENABLED:
@@ -1,8 +1,9 @@
 import logging
-import time
 import uuid
 from datetime import date, datetime, timezone
+from functools import partial
 from pathlib import Path
+from typing import Any, Literal
 
 import httpx
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
@@ -11,6 +12,7 @@ from sqlmodel import select
 
 from app.api.deps import CurrentUser, SessionDep, get_current_active_superuser
 from app.core.config import settings
+from app.crud.live_cache import live_cache
 from app.crud.tacacs_configs import reload_active_config_from_db
 from app.models import (
     HaConfig,
@@ -54,7 +56,6 @@ def _last_sync_ts(ha_state: HaState) -> str | None:
     return ts.isoformat() if ts else None
 
 _PEER_CACHE_TTL = 30  # seconds
-_peers_cache: dict[str, dict] = {}  # url -> {"available": bool|None, "ts": float}
 
 
 # --- helpers ---
@@ -76,26 +77,29 @@ def _get_ha_config(session: SessionDep) -> HaConfig:
     return cfg or HaConfig()
 
 
+def _peer_available_key(url: str) -> str:
+    return f"peer-available:{url}"
+
+
 def _check_peers_available(peer_urls: list[str]) -> dict[str, bool | None]:
-    """Return {url: available} for each URL. Results cached 30 s per URL."""
+    """Return {url: available} for each URL. Results cached 30 s per URL, across workers."""
     if not settings.INTERNAL_SYNC_TOKEN:
         return {url: None for url in peer_urls}
-    now = time.monotonic()
-    result: dict[str, bool | None] = {}
-    for url in peer_urls:
-        cache = _peers_cache.setdefault(url, {"available": None, "ts": 0.0})
-        if now - cache["ts"] < _PEER_CACHE_TTL:
-            result[url] = cache["available"]
-            continue
+
+    def health_check(url: str) -> bool:
         try:
             with httpx.Client(timeout=5) as client:
                 r = client.get(f"{url.rstrip('/')}/api/v1/utils/health-check/")
-            cache["available"] = r.status_code == 200
+            return r.status_code == 200
         except Exception:
-            cache["available"] = False
-        cache["ts"] = now
-        result[url] = cache["available"]
-    return result
+            return False
+
+    return {
+        url: live_cache.get(
+            _peer_available_key(url), partial(health_check, url), _PEER_CACHE_TTL
+        )
+        for url in peer_urls
+    }
 
 
 def _get_enabled_peers(session: SessionDep) -> list[HaPeerNode]:
@@ -257,7 +261,7 @@ def update_peer(
     session.commit()
     session.refresh(peer)
     # invalidate availability cache for changed URL
-    _peers_cache.pop(peer.url, None)
+    live_cache.invalidate(_peer_available_key(peer.url))
     return HaPeerNodePublic.model_validate(peer)
 
 
@@ -273,7 +277,7 @@ def delete_peer(
     peer = session.get(HaPeerNode, peer_id)
     if peer is None:
         raise HTTPException(status_code=404, detail="Peer not found.")
-    _peers_cache.pop(peer.url, None)
+    live_cache.invalidate(_peer_available_key(peer.url))
     session.delete(peer)
     session.commit()
 
@@ -377,55 +381,81 @@ def promote_to_primary(
 def internal_collect_stats(
     request: Request,
     target_date: date = Query(default=None, alias="date"),
-) -> dict:
-    """Internal: parse local TACACS logs and return raw stats. Called by primary."""
+    log_types: list[Literal["authentication", "authorization", "accounting"]] = Query(
+        default=["authentication", "authorization", "accounting"]
+    ),
+    level: Literal["rows", "totals"] = "rows",
+    since: str | None = None,
+) -> Any:
+    """Internal: return this node's TACACS stats for a day. Called by primary.
+
+    ``log_types`` limits the log types returned. ``level=totals`` returns only
+    the per-type sums under "totals". With ``level=rows`` each type also lists
+    its (username, nas_ip, user_source_ip) rows, and the response carries a
+    "cursor": passing it back as ``since`` returns only the rows whose counts
+    changed since, flagged per type in "delta" (a type whose cursor no longer
+    applies, e.g. after log rotation, is returned whole).
+
+    Callers whose Accept header lists the columnar stats media type get the
+    payload dictionary-encoded and gzip-compressed (see stats_transport).
+    """
     token = request.headers.get("X-Internal-Token")
     if not settings.INTERNAL_SYNC_TOKEN or token != settings.INTERNAL_SYNC_TOKEN:
         raise HTTPException(status_code=403, detail="Invalid or missing internal sync token.")
 
-    import sys
-
-    from scripts._log_stats_base import (
-        get_target_date,
-        parse_accounting_logs,
-        parse_authentication_logs,
-        parse_authorization_logs,
-        to_log_datetime,
-    )
+    from app.crud.aaa_statistics import STATISTICS_TABLES, statistics_rows
+    from app.crud.log_events import event_store
+    from app.crud.stats_transport import columnar_response, wants_columnar
+    from scripts._log_stats_base import previous_local_date, to_log_datetime
 
     if target_date is None:
-        orig_argv = sys.argv[:]
-        sys.argv = sys.argv[:1]
-        target_date = get_target_date()
-        sys.argv = orig_argv
-
-    log_dir = settings.TACACS_LOG_DIRECTORY
-    auth_success, auth_fail = parse_authentication_logs(target_date, log_dir)
-    authz_permit, authz_deny = parse_authorization_logs(target_date, log_dir)
-    acct_start, acct_stop = parse_accounting_logs(target_date, log_dir)
+        target_date = previous_local_date()
     log_dt = to_log_datetime(target_date)
+    since_by_type = dict(
+        part.partition("=")[::2] for part in (since or "").split(",") if "=" in part
+    )
 
-    def _counters_to_list(c1: dict, c2: dict, k1: str, k2: str) -> list[dict]:
-        all_keys = set(c1.keys()) | set(c2.keys())
-        return [
-            {
-                "username": u,
-                "nas_ip": n,
-                "user_source_ip": c,
-                k1: c1.get((u, n, c), 0),
-                k2: c2.get((u, n, c), 0),
-                "log_date": log_dt.isoformat(),
-            }
-            for u, n, c in sorted(all_keys)
-        ]
-
-    return {
+    payload: dict = {
         "node_name": settings.NODE_NAME,
         "date": target_date.isoformat(),
-        "authentication": _counters_to_list(auth_success, auth_fail, "success_count", "fail_count"),
-        "authorization": _counters_to_list(authz_permit, authz_deny, "permit_count", "deny_count"),
-        "accounting": _counters_to_list(acct_start, acct_stop, "start_count", "stop_count"),
+        "level": level,
+        "totals": {},
     }
+    cursors: list[str] = []
+    delta: dict[str, bool] = {}
+    for log_type in dict.fromkeys(log_types):
+        _model, first, second = STATISTICS_TABLES[log_type]
+        if level == "totals":
+            totals = event_store.totals(log_type, target_date)
+        else:
+            # Recent days come from the in-memory event store; older days are parsed.
+            changes = event_store.changes(
+                log_type, target_date, since_by_type.get(log_type)
+            )
+            totals = changes.totals
+            rows = statistics_rows(log_type, changes.counters, log_dt, settings.NODE_NAME)
+            payload[log_type] = [
+                {
+                    "username": r["username"],
+                    "nas_ip": r["nas_ip"],
+                    "user_source_ip": r["user_source_ip"],
+                    first: r[first],
+                    second: r[second],
+                    "log_date": log_dt.isoformat(),
+                }
+                for r in rows
+            ]
+            delta[log_type] = changes.delta
+            if changes.cursor:
+                cursors.append(f"{log_type}={changes.cursor}")
+        payload["totals"][log_type] = {first: totals[0], second: totals[1]}
+
+    if level == "rows":
+        payload["delta"] = delta
+        payload["cursor"] = ",".join(cursors) or None
+    if wants_columnar(request.headers.get("accept")):
+        return columnar_response(payload)
+    return payload
 
 
 @router.post("/internal/reload-config")
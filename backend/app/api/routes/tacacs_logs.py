@@ -3,160 +3,40 @@ import os
 import re
 import uuid
 from datetime import datetime, timedelta, timezone
+from datetime import time as time_
+from itertools import islice
 from typing import Any
 
-import httpx
-
-logger = logging.getLogger(__name__)
-
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from sqlmodel import func, select
 
 from app.api.deps import SessionDep, get_current_user
 from app.core.config import settings
+from app.crud import log_summaries as crud_log_summaries
+from app.crud.aaa_statistics import get_distinct_node_names
+from app.crud.log_event_index import EventFilter, event_index, page_events
+from app.crud.log_files import read_line_range, search_line_range, stream_log_file
+from app.crud.peer_stats import peer_stats
 from app.models import (
+    AccountingStatistics,
+    AuthenticationStatistics,
+    AuthorizationStatistics,
     TacacsLog,
     TacacsLogDailySummary,
-    TacacsLogEvent,
     TacacsLogEventsPublic,
     TacacsLogLatestDate,
     TacacsLogPublic,
     TacacsLogsPublic,
-    TacacsLogTypeSummary,
 )
+from scripts._log_stats_base import iter_lines_reversed
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/tacacs_logs", tags=["tacacs_logs"])
 
 LOG_DIRECTORY = "/var/log/tacacs"
 
-IP_REGEX = r"([a-fA-F0-9:.]+|[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3})"
-_LOG_REGEX = re.compile(
-    r"^(?P<timestamp>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2} [+-]\d{4})\s+"
-    rf"(?P<nas_ip>{IP_REGEX})\s+"
-    r"(?P<username>[\w.-]+)\s+"
-    r"(?P<port>[\w/.-]+)\s+"  # tty / port field (e.g. vty14, tty0, ssh)
-    rf"(?P<client_ip>{IP_REGEX})\s+"
-    r"(?P<message>.*)$"
-)
-
-# Regex to strip the leading profile name from authorization messages:
-# e.g. "tacacs_super_user_profile permit shell show ip route" → group(permit/deny/...) + command
-_AUTHZ_CMD_REGEX = re.compile(
-    r"^(?:[\w.-]+\s+)?"
-    r"(?:permit|deny)\s+"
-    r"(?:[\w.-]+\s+)?"  # optional service token (shell, junos-exec, …)
-    r"(?P<command>.+?)\s*$",
-    re.IGNORECASE,
-)
-_ACCT_CMD_REGEX = re.compile(
-    r"(?:start|stop)\s+"
-    r"(?:[\w.-]+\s+)?"  # optional service token
-    r"(?P<command>.+?)\s*$",
-    re.IGNORECASE,
-)
-
-_AUTH_RESULT_MAP = {
-    "succeeded": "success",
-    "failed": "failed",
-    "denied": "failed",
-}
-_AUTHZ_RESULT_MAP = {
-    "permit": "permit",
-    "deny": "deny",
-}
-_ACCT_RESULT_MAP = {
-    "start": "start",
-    "stop": "stop",
-}
-
-
-def _classify_result(log_type: str, message: str) -> str:
-    msg = message.lower()
-    if log_type == "authentication":
-        for kw, result in _AUTH_RESULT_MAP.items():
-            if kw in msg:
-                return result
-        return "unknown"
-    if log_type == "authorization":
-        for kw, result in _AUTHZ_RESULT_MAP.items():
-            if kw in msg:
-                return result
-        return "unknown"
-    if log_type == "accounting":
-        for kw, result in _ACCT_RESULT_MAP.items():
-            if kw in msg:
-                return result
-        return "unknown"
-    return "unknown"
-
-
-def _log_file_path(log_type: str, date: datetime) -> str:
-    """Return the absolute path for a log file of the given type and date."""
-    year = date.strftime("%Y")
-    month = date.strftime("%m")
-    day = date.strftime("%d")
-    filename = f"{log_type}-{year}-{month}-{day}.log"
-    return os.path.join(settings.TACACS_LOG_DIRECTORY, year, month, filename)
-
-
-def _extract_command(log_type: str, message: str) -> str | None:
-    """Best-effort extraction of a human-readable command from the raw log message."""
-    if log_type == "authorization":
-        m = _AUTHZ_CMD_REGEX.match(message.strip())
-        if m:
-            cmd = m.group("command").strip()
-            # Strip trailing <cr> artifact common in TACACS+ authz messages
-            return cmd.removesuffix("<cr>").strip() or None
-    if log_type == "accounting":
-        m = _ACCT_CMD_REGEX.search(message.strip())
-        if m:
-            cmd = m.group("command").strip()
-            return cmd.removesuffix("<cr>").strip() or None
-    return None
-
-
-def _parse_log_file(log_type: str, path: str) -> list[TacacsLogEvent]:
-    """Parse a single log file, returning structured events."""
-    events: list[TacacsLogEvent] = []
-    if not os.path.exists(path):
-        return events
-    try:
-        with open(path, errors="ignore") as f:
-            for line in f:
-                m = _LOG_REGEX.match(line.rstrip())
-                if not m:
-                    continue
-                d = m.groupdict()
-                message = d["message"]
-                result = _classify_result(log_type, message)
-                port = d.get("port") or None
-                command = _extract_command(log_type, message)
-                # Session ID: deterministic grouping key (no DB needed)
-                session_key_parts = [
-                    d["username"],
-                    d["nas_ip"],
-                    d["client_ip"],
-                    port or "",
-                ]
-                session_id = "|".join(session_key_parts)
-                events.append(
-                    TacacsLogEvent(
-                        timestamp=d["timestamp"],
-                        log_type=log_type,
-                        username=d["username"],
-                        nas_ip=d["nas_ip"],
-                        client_ip=d["client_ip"],
-                        result=result,
-                        message=message,
-                        command=command,
-                        port=port,
-                        session_id=session_id,
-                    )
-                )
-    except OSError:
-        pass
-    return events
-
 
 def _find_latest_log_date() -> str:
     log_dir = settings.TACACS_LOG_DIRECTORY
@@ -188,10 +68,14 @@ def get_latest_log_date() -> Any:
     response_model=TacacsLogDailySummary,
 )
 def get_log_events_summary(
+    session: SessionDep,
     date: str | None = None,
 ) -> Any:
     """
     Return count totals for auth/authz/acct log events for a given date (default: today).
+    Totals of days that have ended (local time, plus a grace period) are stored per
+    node on first request and served from the tacacslogdailytotals table afterwards;
+    this node's totals are recounted when its log files change.
     """
     try:
         target_date = (
@@ -201,144 +85,102 @@ def get_log_events_summary(
         raise HTTPException(status_code=400, detail="date must be YYYY-MM-DD")
 
     date_str = target_date.strftime("%Y-%m-%d")
-    summary: dict[str, TacacsLogTypeSummary] = {
-        lt: TacacsLogTypeSummary()
-        for lt in ("authentication", "authorization", "accounting")
-    }
-
-    for lt in ("authentication", "authorization", "accounting"):
-        path = _log_file_path(lt, target_date)
-        events = _parse_log_file(lt, path)
-        s = summary[lt]
-        for ev in events:
-            s.total += 1
-            if ev.result == "success":
-                s.success += 1
-            elif ev.result == "failed":
-                s.failed += 1
-            elif ev.result == "permit":
-                s.permit += 1
-            elif ev.result == "deny":
-                s.deny += 1
-            elif ev.result == "start":
-                s.start += 1
-            elif ev.result == "stop":
-                s.stop += 1
+    log_day = target_date.date()
+    closed = crud_log_summaries.is_closed(log_day)
+    # Taken before counting, so a write during the count is seen next time.
+    sources = crud_log_summaries.source_signatures(log_day) if closed else {}
+    stored = (
+        crud_log_summaries.get_daily_totals(
+            session, log_day, settings.NODE_NAME, sources
+        )
+        if closed
+        else {}
+    )
+
+    summary = crud_log_summaries.empty_summary()
+    stale_nodes: dict[str, float | None] = {}
+    local = stored.get(settings.NODE_NAME)
+    if local is None:
+        local = crud_log_summaries.local_summary(log_day)
+        if closed:
+            crud_log_summaries.save_daily_totals(
+                session, log_day, settings.NODE_NAME, local, sources
+            )
+    crud_log_summaries.add_summary(summary, local)
 
     # If primary node, also collect and aggregate from peer nodes
     if settings.NODE_ROLE == "primary":
-        peer_urls = [u.strip() for u in settings.PEER_NODES.split(",") if u.strip()]
-        if not peer_urls and settings.PEER_BACKEND_URL:
-            peer_urls = [settings.PEER_BACKEND_URL]
-
-        fetched_peer_nodes = set()
-        for url in peer_urls:
-            endpoint = f"{url.rstrip('/')}/api/v1/sync/internal/collect-stats"
-            if not settings.INTERNAL_SYNC_TOKEN:
+        done = {n: s for n, s in stored.items() if n != settings.NODE_NAME}
+        for node_summary in done.values():
+            crud_log_summaries.add_summary(summary, node_summary)
+        pending = set(get_distinct_node_names()) - {settings.NODE_NAME} - done.keys()
+        skip_peers = closed and not pending and (done or not settings.peer_urls)
+        peers = {} if skip_peers else peer_stats.collect_by_node(date_str, "totals")
+
+        fetched: dict[str, crud_log_summaries.NodeSummary] = {}
+        for peer_node_name, peer in peers.items():
+            if peer_node_name in done or peer_node_name == settings.NODE_NAME:
                 continue
-            try:
-                with httpx.Client(timeout=3.0) as client:
-                    resp = client.post(
-                        endpoint,
-                        params={"date": date_str},
-                        headers={"X-Internal-Token": settings.INTERNAL_SYNC_TOKEN},
-                    )
-                    if resp.status_code == 200:
-                        data = resp.json()
-                        peer_node_name = data.get("node_name")
-                        if peer_node_name:
-                            fetched_peer_nodes.add(peer_node_name)
-                        # Add authentication
-                        for row in data.get("authentication", []):
-                            summary["authentication"].total += row.get(
-                                "success_count", 0
-                            ) + row.get("fail_count", 0)
-                            summary["authentication"].success += row.get(
-                                "success_count", 0
-                            )
-                            summary["authentication"].failed += row.get("fail_count", 0)
-                        # Add authorization
-                        for row in data.get("authorization", []):
-                            summary["authorization"].total += row.get(
-                                "permit_count", 0
-                            ) + row.get("deny_count", 0)
-                            summary["authorization"].permit += row.get(
-                                "permit_count", 0
-                            )
-                            summary["authorization"].deny += row.get("deny_count", 0)
-                        # Add accounting
-                        for row in data.get("accounting", []):
-                            summary["accounting"].total += row.get(
-                                "start_count", 0
-                            ) + row.get("stop_count", 0)
-                            summary["accounting"].start += row.get("start_count", 0)
-                            summary["accounting"].stop += row.get("stop_count", 0)
-            except Exception as e:
-                logger.warning("Failed to fetch live stats from peer %s: %s", url, e)
+            node_summary = crud_log_summaries.summary_from_stats(
+                [peer.totals("authentication")],
+                [peer.totals("authorization")],
+                [peer.totals("accounting")],
+            )
+            crud_log_summaries.add_summary(summary, node_summary)
+            if peer.stale:
+                stale_nodes[peer_node_name] = peer.age
+            else:
+                fetched[peer_node_name] = node_summary
+
+        # Only totals parsed by the peer itself are final; DB fallbacks are not stored.
+        if closed:
+            for node_name, node_summary in fetched.items():
+                crud_log_summaries.save_daily_totals(
+                    session, log_day, node_name, node_summary
+                )
 
         # Fallback to DB for any non-local nodes not fetched successfully
-        from datetime import time as time_
-
-        from sqlmodel import Session, select
-
-        from app.core.db import engine
-        from app.crud.aaa_statistics import get_distinct_node_names
-        from app.models import (
-            AccountingStatistics,
-            AuthenticationStatistics,
-            AuthorizationStatistics,
-        )
-
-        log_dt = datetime.combine(target_date.date(), time_.min).replace(
-            tzinfo=timezone.utc
-        )
-        with Session(engine) as session:
-            all_known_nodes = get_distinct_node_names(session)
-            for kn in all_known_nodes:
-                if kn != settings.NODE_NAME and kn not in fetched_peer_nodes:
-                    # Query Authentication
-                    auth_rows = session.exec(
-                        select(AuthenticationStatistics).where(
-                            AuthenticationStatistics.log_date == log_dt,
-                            AuthenticationStatistics.node_name == kn,
-                        )
-                    ).all()
-                    for r in auth_rows:
-                        summary["authentication"].total += (
-                            r.success_count + r.fail_count
-                        )
-                        summary["authentication"].success += r.success_count
-                        summary["authentication"].failed += r.fail_count
-
-                    # Query Authorization
-                    authz_rows = session.exec(
-                        select(AuthorizationStatistics).where(
-                            AuthorizationStatistics.log_date == log_dt,
-                            AuthorizationStatistics.node_name == kn,
-                        )
-                    ).all()
-                    for r in authz_rows:
-                        summary["authorization"].total += r.permit_count + r.deny_count
-                        summary["authorization"].permit += r.permit_count
-                        summary["authorization"].deny += r.deny_count
-
-                    # Query Accounting
-                    acct_rows = session.exec(
-                        select(AccountingStatistics).where(
-                            AccountingStatistics.log_date == log_dt,
-                            AccountingStatistics.node_name == kn,
-                        )
-                    ).all()
-                    for r in acct_rows:
-                        summary["accounting"].total += r.start_count + r.stop_count
-                        summary["accounting"].start += r.start_count
-                        summary["accounting"].stop += r.stop_count
+        log_dt = datetime.combine(log_day, time_.min).replace(tzinfo=timezone.utc)
+        for kn in sorted(pending - peers.keys()):
+            stale_nodes[kn] = None
+            auth_rows = session.exec(
+                select(
+                    AuthenticationStatistics.success_count,
+                    AuthenticationStatistics.fail_count,
+                ).where(
+                    AuthenticationStatistics.log_date == log_dt,
+                    AuthenticationStatistics.node_name == kn,
+                )
+            ).all()
+            authz_rows = session.exec(
+                select(
+                    AuthorizationStatistics.permit_count,
+                    AuthorizationStatistics.deny_count,
+                ).where(
+                    AuthorizationStatistics.log_date == log_dt,
+                    AuthorizationStatistics.node_name == kn,
+                )
+            ).all()
+            acct_rows = session.exec(
+                select(
+                    AccountingStatistics.start_count,
+                    AccountingStatistics.stop_count,
+                ).where(
+                    AccountingStatistics.log_date == log_dt,
+                    AccountingStatistics.node_name == kn,
+                )
+            ).all()
+            crud_log_summaries.add_summary(
+                summary,
+                crud_log_summaries.summary_from_stats(auth_rows, authz_rows, acct_rows),
+            )
 
     return TacacsLogDailySummary(
         date=date_str,
         authentication=summary["authentication"],
         authorization=summary["authorization"],
         accounting=summary["accounting"],
+        stale_nodes=stale_nodes,
     )
 
 
@@ -395,42 +237,15 @@ def list_log_events(
         else [log_type]
     )
 
-    all_events: list[TacacsLogEvent] = []
+    frames = []
     current = start_date
     while current <= end_date:
         for lt in log_types:
-            path = _log_file_path(lt, current)
-            all_events.extend(_parse_log_file(lt, path))
+            frames.append(event_index.frame(lt, current.date()))
         current += timedelta(days=1)
 
-    # Sort newest-first by timestamp string (ISO-ish format sorts lexicographically)
-    all_events.sort(key=lambda e: e.timestamp, reverse=True)
-
-    # Apply filters
-    if result:
-        all_events = [e for e in all_events if e.result == result]
-    if username:
-        lower = username.lower()
-        all_events = [e for e in all_events if lower in e.username.lower()]
-    if nas_ip:
-        all_events = [e for e in all_events if nas_ip in e.nas_ip]
-    if search:
-        q = search.lower()
-        all_events = [
-            e
-            for e in all_events
-            if q in e.username.lower()
-            or q in e.nas_ip.lower()
-            or (e.client_ip and q in e.client_ip.lower())
-            or (e.port and q in e.port.lower())
-            or q in e.result.lower()
-            or q in e.log_type.lower()
-            or (e.command and q in e.command.lower())
-            or q in e.message.lower()
-        ]
-
-    count = len(all_events)
-    page = all_events[skip : skip + limit]
+    flt = EventFilter(result=result, username=username, nas_ip=nas_ip, search=search)
+    count, page = page_events(frames, flt, skip, limit)
     return TacacsLogEventsPublic(data=page, count=count)
 
 
@@ -499,6 +314,18 @@ def list_log_files(
     return TacacsLogsPublic(data=tacacs_logs, count=count)
 
 
+def _get_log_file(session: SessionDep, id: uuid.UUID) -> tuple[TacacsLog, str]:
+    """Return the TacacsLog row and the path of its file, or raise 404."""
+    db_tacacs_log = session.get(TacacsLog, id)
+    if not db_tacacs_log:
+        raise HTTPException(status_code=404, detail="Log file not found in database.")
+
+    log_path = os.path.join(LOG_DIRECTORY, db_tacacs_log.filepath)
+    if not os.path.exists(log_path):
+        raise HTTPException(status_code=404, detail="Log file not found.")
+    return db_tacacs_log, log_path
+
+
 @router.get(
     "/{id}",
     dependencies=[Depends(get_current_user)],
@@ -508,29 +335,67 @@ def read_log_file(
     id: uuid.UUID,
     session: SessionDep,
     search: str | None = None,
+    tail: int | None = None,
+    offset: int = 0,
+    limit: int | None = None,
 ) -> Any:
     """
     Read a specific TACACS+ log file. Can be filtered by a search term.
+    offset / limit: page by line number (of matching lines when searching).
+    tail: return only the last N (matching) lines, read backwards from the end of the file;
+    cannot be combined with offset / limit.
     """
-    db_tacacs_log = session.get(TacacsLog, id)
-    if not db_tacacs_log:
-        raise HTTPException(status_code=404, detail="Log file not found in database.")
-
-    log_path = os.path.join(LOG_DIRECTORY, db_tacacs_log.filepath)
-    if not os.path.exists(log_path):
-        raise HTTPException(status_code=404, detail="Log file not found.")
+    db_tacacs_log, log_path = _get_log_file(session, id)
+    if tail is not None and tail < 1:
+        raise HTTPException(status_code=400, detail="tail must be >= 1")
+    if tail is not None and (offset or limit is not None):
+        raise HTTPException(
+            status_code=400, detail="tail cannot be combined with offset or limit"
+        )
+    if offset < 0 or (limit is not None and limit < 0):
+        raise HTTPException(status_code=400, detail="offset and limit must be >= 0")
 
     try:
-        with open(log_path, errors="ignore") as f:
-            file_content_lines = f.readlines()
-
-        if search:
-            file_content_lines = [
-                line for line in file_content_lines if search.lower() in line.lower()
-            ]
+        line_count = None
+        if tail is not None:
+            lines = iter_lines_reversed(log_path)
+            if search:
+                lines = (line for line in lines if search.lower() in line.lower())
+            newest = list(islice(lines, tail))
+            data = "".join(line + "\n" for line in reversed(newest))
+        elif search:
+            data, line_count = search_line_range(log_path, search, offset, limit)
+        else:
+            data, line_count = read_line_range(log_path, offset, limit)
 
         tacacs_log_result = TacacsLogPublic.model_validate(db_tacacs_log)
-        tacacs_log_result.data = "".join(file_content_lines)
+        tacacs_log_result.data = data
+        tacacs_log_result.line_count = line_count
         return tacacs_log_result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error reading log file: {e}")
+
+
+@router.get(
+    "/{id}/stream",
+    dependencies=[Depends(get_current_user)],
+    response_class=StreamingResponse,
+)
+def stream_log_file_content(
+    id: uuid.UUID,
+    request: Request,
+    session: SessionDep,
+    search: str | None = None,
+) -> Any:
+    """
+    Stream a log file (or its lines matching ``search``) as plain text, gzip-compressed
+    chunk by chunk when the client accepts it. Use this for files too large to page.
+    """
+    _db_tacacs_log, log_path = _get_log_file(session, id)
+    compress = "gzip" in request.headers.get("accept-encoding", "")
+    headers = {"Content-Encoding": "gzip"} if compress else {}
+    return StreamingResponse(
+        stream_log_file(log_path, search=search, compress=compress),
+        media_type="text/plain; charset=utf-8",
+        headers=headers,
+    )
@@ -127,6 +127,13 @@ class Settings(BaseSettings):
     BACKGROUND: str = "no"
     TACACS_LOG_DIRECTORY: str = "/var/log/tacacs/"
     TACACS_TIMEZONE: str = "UTC"  # IANA tz name, e.g. "Asia/Ho_Chi_Minh"
+    # Columnar event index built from completed days' logs (log viewer)
+    TACACS_LOG_INDEX_DIRECTORY: str = "/var/lib/tacacs-ng-ui/log-index/"
+    # SQLite file shared by all workers caching live dashboard stats / peer health
+    LIVE_CACHE_PATH: str = "/var/lib/tacacs-ng-ui/live-cache.sqlite3"
+    # Evaluate auth/authz alert rules within seconds of new log lines, not only
+    # on the 5-minute sweep
+    ALERT_REALTIME_ENABLED: bool = True
     ACCESS_LOG_DESTINATION: str = TACACS_LOG_DIRECTORY + "%Y/%m/access-%Y-%m-%d.log"
     AUTHENTICATION_LOG_DESTINATION: str = (
         TACACS_LOG_DIRECTORY + "%Y/%m/authentication-%Y-%m-%d.log"
@@ -208,6 +215,11 @@ class Settings(BaseSettings):
     STATS_INTERVAL_MINUTES: int = (
         30  # how often to collect today's AAA stats into DB (0 = disable)
     )
+    STATS_UPSERT_CHUNK_SIZE: int = 1000  # rows per INSERT … ON CONFLICT statement
+    STATS_RETENTION_MONTHS: int = (
+        0  # drop raw statistics partitions older than N months; 0 = keep forever
+    )
+    STATS_PARTITIONS_AHEAD: int = 3  # monthly statistics partitions created ahead
 
     @computed_field  # type: ignore[prop-decorator]
     @property
@@ -0,0 +1,269 @@
+"""
+Background job scheduler for the lifespan tasks.
+
+Jobs are plain synchronous callables. Each one runs in an executor, never on
+the event loop, so a slow purge, rule evaluation or model fit does not stall
+the worker's API requests:
+
+- "thread": a pool of its own, so jobs do not compete with the default pool
+  that asyncio.to_thread() and sync route handlers share;
+- "process": a single spawned process, for CPU-bound work such as ML scoring.
+  The callable must be importable (a module-level function).
+
+Each job is one coroutine that waits for its run to finish before scheduling
+the next, so a job never overlaps itself: ticks missed while a run overruns
+its interval are skipped and counted, not queued. Jobs with a ``trigger``
+run whenever it fires instead, rate-limited to one run per interval. A random
+delay of up to ``jitter`` seconds is added before every run so that nodes
+restarted together do not hit the database in lockstep.
+
+With several uvicorn workers each one starts a Scheduler, but only the worker
+holding a PostgreSQL session advisory lock runs jobs. The lock lives on a
+dedicated connection; if that worker exits or loses the connection, the lock
+is released and another worker takes over within LEADER_RETRY_SECONDS.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import random
+import time
+from collections.abc import Awaitable, Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Literal
+
+import sqlalchemy as sa
+from sqlalchemy.exc import DBAPIError
+
+from app.core.db import engine
+
+logger = logging.getLogger(__name__)
+
+LEADER_RETRY_SECONDS = 30.0
+_LEADER_LOCK_KEY = "tacacs-ng-ui-scheduler"
+_PAUSED_RECHECK_SECONDS = 60.0
+_THREAD_WORKERS = 4
+
+
+@dataclass
+class JobStats:
+    """Timing metrics of one job in this worker."""
+
+    runs: int = 0
+    failures: int = 0
+    skipped: int = 0  # ticks missed because the previous run overran
+    running: bool = False
+    last_started: float | None = None  # time.time()
+    last_duration: float | None = None  # seconds
+    max_duration: float = 0.0
+    total_duration: float = 0.0
+
+
+@dataclass
+class Job:
+    name: str
+    func: Callable[[], Any]
+    # Seconds between run starts, or a callable returning them (called in the
+    # thread pool before each run); <= 0 pauses the job.
+    interval: float | Callable[[], float]
+    initial_delay: float = 0.0
+    jitter: float = 0.0
+    executor: Literal["thread", "process"] = "thread"
+    # Event-driven jobs: run each time the awaitable returns instead of on a
+    # timer, at most once per ``interval`` seconds.
+    trigger: Callable[[], Awaitable[Any]] | None = None
+    stats: JobStats = field(default_factory=JobStats)
+
+
+class Scheduler:
+    def __init__(self, lock_key: str | None = _LEADER_LOCK_KEY) -> None:
+        """``lock_key`` None runs jobs without leader election (one worker)."""
+        self.lock_key = lock_key
+        self.jobs: dict[str, Job] = {}
+        self.is_leader = False
+        self._threads: ThreadPoolExecutor | None = None
+        self._processes: ProcessPoolExecutor | None = None
+        self._lock_conn: sa.Connection | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._job_tasks: list[asyncio.Task[None]] = []
+
+    def add_job(
+        self,
+        name: str,
+        func: Callable[[], Any],
+        interval: float | Callable[[], float],
+        *,
+        initial_delay: float = 0.0,
+        jitter: float = 0.0,
+        executor: Literal["thread", "process"] = "thread",
+        trigger: Callable[[], Awaitable[Any]] | None = None,
+    ) -> Job:
+        if name in self.jobs:
+            raise ValueError(f"Job {name!r} already registered")
+        job = Job(name, func, interval, initial_delay, jitter, executor, trigger)
+        self.jobs[name] = job
+        return job
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        return {name: asdict(job.stats) for name, job in self.jobs.items()}
+
+    # -- lifecycle -----------------------------------------------------------
+
+    def start(self) -> None:
+        self._threads = ThreadPoolExecutor(
+            max_workers=_THREAD_WORKERS, thread_name_prefix="scheduler"
+        )
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        tasks = [t for t in (self._task, *self._job_tasks) if t]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._job_tasks = []
+        self._release_leadership()
+        for pool in (self._threads, self._processes):
+            if pool:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._threads = self._processes = None
+
+    async def _run(self) -> None:
+        while True:
+            if not self.is_leader:
+                try:
+                    self.is_leader = await self._in_thread(self._try_lead)
+                except Exception:
+                    logger.exception("Scheduler leader election failed")
+                if self.is_leader:
+                    logger.info("Scheduler: this worker runs background jobs")
+                    self._job_tasks = [
+                        asyncio.create_task(self._job_loop(job))
+                        for job in self.jobs.values()
+                    ]
+            elif not await self._in_thread(self._still_leading):
+                logger.warning("Scheduler lost its leader lock; stopping jobs")
+                for task in self._job_tasks:
+                    task.cancel()
+                self._job_tasks = []
+                self._release_leadership()
+                self.is_leader = False
+            await asyncio.sleep(LEADER_RETRY_SECONDS)
+
+    # -- leadership ----------------------------------------------------------
+
+    def _try_lead(self) -> bool:
+        if self.lock_key is None:
+            return True
+        conn = engine.connect()
+        acquired = conn.execute(
+            sa.text("SELECT pg_try_advisory_lock(hashtext(:key))"),
+            {"key": self.lock_key},
+        ).scalar()
+        # End the implicit transaction; the session-level lock outlives it.
+        conn.commit()
+        if acquired:
+            self._lock_conn = conn
+        else:
+            conn.close()
+        return bool(acquired)
+
+    def _still_leading(self) -> bool:
+        if self._lock_conn is None:
+            return self.lock_key is None
+        try:
+            self._lock_conn.execute(sa.text("SELECT 1"))
+            self._lock_conn.commit()
+            return True
+        except DBAPIError:
+            return False
+
+    def _release_leadership(self) -> None:
+        conn, self._lock_conn = self._lock_conn, None
+        if conn is None:
+            return
+        try:
+            # Closing the session releases its advisory locks; the pool must
+            # not hand the connection out again still holding one.
+            conn.invalidate()
+        finally:
+            conn.close()
+
+    # -- jobs ----------------------------------------------------------------
+
+    def _executor(self, job: Job) -> Executor | None:
+        if job.executor == "process":
+            if self._processes is None:
+                self._processes = ProcessPoolExecutor(
+                    max_workers=1, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._processes
+        return self._threads
+
+    async def _in_thread(self, func: Callable[[], Any]) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._threads, func)
+
+    async def _interval(self, job: Job) -> float:
+        if callable(job.interval):
+            return float(await self._in_thread(job.interval))
+        return job.interval
+
+    async def _job_loop(self, job: Job) -> None:
+        await asyncio.sleep(job.initial_delay)
+        while True:
+            try:
+                interval = await self._interval(job)
+            except Exception:
+                logger.exception("Job %s: reading its interval failed", job.name)
+                interval = _PAUSED_RECHECK_SECONDS
+            if interval <= 0:
+                await asyncio.sleep(_PAUSED_RECHECK_SECONDS)
+                continue
+            if job.trigger is not None:
+                await job.trigger()
+            if job.jitter > 0:
+                await asyncio.sleep(random.uniform(0, job.jitter))
+            started = time.monotonic()
+            await self.run_job(job)
+            elapsed = time.monotonic() - started
+            if job.trigger is not None:
+                # Triggers arriving during the run or this pause coalesce into
+                # the next trigger() return.
+                await asyncio.sleep(max(interval - elapsed, 0))
+                continue
+            if elapsed > interval:
+                missed = int(elapsed // interval)
+                job.stats.skipped += missed
+                logger.warning(
+                    "Job %s took %.1fs, longer than its %.0fs interval; "
+                    "skipped %d run(s)",
+                    job.name,
+                    elapsed,
+                    interval,
+                    missed,
+                )
+            await asyncio.sleep(interval - elapsed % interval)
+
+    async def run_job(self, job: Job) -> None:
+        """Run ``job`` once in its executor, recording timing and failures."""
+        stats = job.stats
+        stats.running = True
+        stats.last_started = time.time()
+        started = time.monotonic()
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                self._executor(job), job.func
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            stats.failures += 1
+            logger.exception("Job %s failed", job.name)
+        finally:
+            duration = time.monotonic() - started
+            stats.running = False
+            stats.runs += 1
+            stats.last_duration = duration
+            stats.max_duration = max(stats.max_duration, duration)
+            stats.total_duration += duration
+            logger.debug("Job %s finished in %.3fs", job.name, duration)
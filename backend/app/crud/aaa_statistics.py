@@ -1,145 +1,64 @@
 import logging
-import os
-import time as _time
-from collections import Counter, defaultdict
+import uuid
+from collections import defaultdict
+from collections.abc import Callable, Iterable
 from datetime import date, datetime, timedelta, timezone
 from datetime import time as time_
-from typing import Any
+from typing import Any, TypeVar
 
-import httpx
 from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlmodel import Session, select
 
 from app.core.config import settings
+from app.core.db import engine
+from app.crud.live_cache import live_cache
+from app.crud.log_events import StatsCounters, event_store
+from app.crud.peer_stats import peer_stats
+from app.crud.statistics_partitions import ensure_partitions
+from app.crud.statistics_rollups import (
+    TopList,
+    daily_totals,
+    range_overview,
+    refresh_rollups,
+    register_nodes,
+)
+from app.crud.tacacs_siem import forward_tacacs_event_to_siem
 from app.models import (
+    AaaStatisticsNode,
     AccountingStatistics,
     AuthenticationStatistics,
     AuthorizationStatistics,
 )
-from scripts._log_stats_base import AUTH_LOG_REGEX
+from scripts._log_stats_base import LOG_TYPES, to_log_datetime
 
 logger = logging.getLogger(__name__)
 
-_today_cache: dict = {}  # {node_name_or_all: {"date": str, "data": dict, "ts": float}}
-_today_authz_cache: dict = {}  # {node_name_or_all: {"date": str, "permit": int, "deny": int, "ts": float}}
-_today_acct_cache: dict = {}  # {node_name_or_all: {"date": str, "start": int, "stop": int, "ts": float}}
+T = TypeVar("T")
+
 _LIVE_CACHE_TTL = 60
+_NODES_CACHE_KEY = "aaa_nodes"
+_NODES_CACHE_TTL = 600  # safety net; new nodes invalidate the entry at once
 
 
 def _today_authz_counts() -> tuple[int, int]:
-    """Return (permit, deny) for today from live authorization log. Cached 60 s."""
-    global _today_authz_cache
-    today = datetime.now(timezone.utc)
-    today_str = today.strftime("%Y-%m-%d")
-    ts = _time.monotonic()
-    if (
-        _today_authz_cache.get("date") == today_str
-        and ts - _today_authz_cache.get("ts", 0.0) < _LIVE_CACHE_TTL
-    ):
-        return _today_authz_cache["permit"], _today_authz_cache["deny"]
-
-    log_path = today.strftime(
-        settings.TACACS_LOG_DIRECTORY + "%Y/%m/authorization-%Y-%m-%d.log"
-    )
-    permit = deny = 0
-    if os.path.exists(log_path):
-        try:
-            with open(log_path, errors="ignore") as f:
-                for line in f:
-                    if not line.startswith(today_str):
-                        continue
-                    low = line.lower()
-                    if "\tpermit\t" in low or "\tpermit " in low:
-                        permit += 1
-                    elif "\tdeny\t" in low or "\tdeny " in low:
-                        deny += 1
-        except OSError:
-            pass
-
-    _today_authz_cache.clear()
-    _today_authz_cache.update(
-        {"date": today_str, "permit": permit, "deny": deny, "ts": ts}
-    )
-    return permit, deny
+    """Return (permit, deny) for today from the live authorization log."""
+    today = datetime.now(timezone.utc).date()
+    permitted, denied = event_store.counters("authorization", today)
+    return sum(permitted.values()), sum(denied.values())
 
 
 def _today_acct_counts() -> tuple[int, int]:
-    """Return (start, stop) for today from live accounting log. Cached 60 s."""
-    global _today_acct_cache
-    today = datetime.now(timezone.utc)
-    today_str = today.strftime("%Y-%m-%d")
-    ts = _time.monotonic()
-    if (
-        _today_acct_cache.get("date") == today_str
-        and ts - _today_acct_cache.get("ts", 0.0) < _LIVE_CACHE_TTL
-    ):
-        return _today_acct_cache["start"], _today_acct_cache["stop"]
-
-    log_path = today.strftime(
-        settings.TACACS_LOG_DIRECTORY + "%Y/%m/accounting-%Y-%m-%d.log"
-    )
-    start = stop = 0
-    if os.path.exists(log_path):
-        try:
-            with open(log_path, errors="ignore") as f:
-                for line in f:
-                    if not line.startswith(today_str):
-                        continue
-                    if "\tstart\t" in line or "\tstart " in line:
-                        start += 1
-                    elif "\tstop\t" in line or "\tstop " in line:
-                        stop += 1
-        except OSError:
-            pass
-
-    _today_acct_cache.clear()
-    _today_acct_cache.update(
-        {"date": today_str, "start": start, "stop": stop, "ts": ts}
-    )
-    return start, stop
-
-
-def get_peer_urls() -> list[str]:
-    """Parse peer nodes from PEER_NODES settings or fallback to PEER_BACKEND_URL."""
-    peer_urls = [u.strip() for u in settings.PEER_NODES.split(",") if u.strip()]
-    if not peer_urls and settings.PEER_BACKEND_URL:
-        peer_urls = [settings.PEER_BACKEND_URL]
-    return peer_urls
+    """Return (start, stop) for today from the live accounting log."""
+    today = datetime.now(timezone.utc).date()
+    start_events, stop_events = event_store.counters("accounting", today)
+    return sum(start_events.values()), sum(stop_events.values())
 
 
 def parse_local_today_authentication_details() -> list[dict]:
-    """Parse local authentication log files for today and return details list."""
-    today = datetime.now(timezone.utc)
-    today_str = today.strftime("%Y-%m-%d")
-    log_file_path = today.strftime(
-        settings.TACACS_LOG_DIRECTORY + "%Y/%m/authentication-%Y-%m-%d.log"
-    )
-    if not os.path.exists(log_file_path):
-        return []
-
-    successful_logins = Counter()
-    failed_logins = Counter()
-    try:
-        with open(log_file_path, errors="ignore") as f:
-            for line in f:
-                if not line.startswith(today_str):
-                    continue
-                match = AUTH_LOG_REGEX.search(line)
-                if not match:
-                    continue
-                log_data = match.groupdict()
-                msg = log_data["message"].lower()
-                username = log_data["username"]
-                nas_ip = log_data["nas_ip"]
-                client_ip = log_data["client_ip"]
-                key = (username, nas_ip, client_ip)
-                if "succeeded" in msg:
-                    successful_logins[key] += 1
-                elif "failed" in msg or "denied" in msg:
-                    failed_logins[key] += 1
-    except OSError as e:
-        logger.error(f"Error reading file {log_file_path}: {e}")
-        return []
+    """Return today's per-(user, NAS, client) authentication counts from the local log."""
+    today = datetime.now(timezone.utc).date()
+    successful_logins, failed_logins = event_store.counters("authentication", today)
 
     all_keys = set(successful_logins.keys()) | set(failed_logins.keys())
     list_authentication_details = []
@@ -285,11 +204,15 @@ def _merge_today_top(
     )
 
 
+def _as_date(value: date | datetime) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
 def fill_missing_dates(
     db_results: list[Any], date_range: list[date], count_field: str
 ) -> list[dict]:
     """Fills missing dates in a list of DB results with a count of 0."""
-    data_map = {r.date.date(): getattr(r, count_field) for r in db_results}
+    data_map = {_as_date(r.date): getattr(r, count_field) for r in db_results}
     return [{"date": d.isoformat(), "count": data_map.get(d, 0)} for d in date_range]
 
 
@@ -308,18 +231,97 @@ def fill_missing_acct_dates(
     ]
 
 
-def get_distinct_node_names(session: Session) -> list[str]:
-    """Return sorted list of all known node_names across the three stats tables."""
+def _registered_node_names(session: Session) -> list[str]:
+    return list(
+        session.exec(
+            select(AaaStatisticsNode.node_name).order_by(AaaStatisticsNode.node_name)
+        ).all()
+    )
+
+
+def get_distinct_node_names() -> list[str]:
+    """
+    Sorted node names that have AAA statistics, from the node registry
+    maintained by upsert_statistics(). Cached across workers and dropped from
+    the cache whenever a new node is registered.
+    """
+    return _live_stats(_NODES_CACHE_KEY, _registered_node_names, _NODES_CACHE_TTL)
+
+
+# name -> (log_type, key column, rollup count column, count field). Today's live
+# counts of the authentication lists are under "today_" + name in the snapshot.
+_RANGE_TOP_LISTS = {
+    "authentication_failed_count_by_user": (
+        "authentication",
+        "username",
+        "second_count",
+        "fail_count",
+    ),
+    "authentication_success_count_by_user": (
+        "authentication",
+        "username",
+        "first_count",
+        "success_count",
+    ),
+    "authentication_success_count_by_user_source_ip": (
+        "authentication",
+        "user_source_ip",
+        "first_count",
+        "success_count",
+    ),
+    "authentication_success_count_by_nas_ip": (
+        "authentication",
+        "nas_ip",
+        "first_count",
+        "success_count",
+    ),
+    "authorization_deny_count_by_user": (
+        "authorization",
+        "username",
+        "second_count",
+        "deny_count",
+    ),
+}
+
+
+def _trend_series(
+    daily_results: list[Any], start_date: date, end_date: date, key_prefix: str
+) -> dict[str, list[dict]]:
+    """The six per-day series of a range from daily_totals() rows."""
+    num_days = (end_date - start_date).days + 1
+    all_dates = [(start_date + timedelta(days=i)) for i in range(num_days)]
+    return {
+        f"{key_prefix}_{series}": fill_missing_dates(daily_results, all_dates, column)
+        for series, column in (
+            ("authentication_success", "auth_success"),
+            ("authentication_fail", "auth_fail"),
+            ("authorization_permit", "authz_permit"),
+            ("authorization_deny", "authz_deny"),
+            ("accounting_start", "acct_start"),
+            ("accounting_stop", "acct_stop"),
+        )
+    }
+
 
-    auth_nodes = session.exec(
-        select(AuthenticationStatistics.node_name).distinct()
-    ).all()
-    authz_nodes = session.exec(
-        select(AuthorizationStatistics.node_name).distinct()
-    ).all()
-    acct_nodes = session.exec(select(AccountingStatistics.node_name).distinct()).all()
-    all_nodes = set(auth_nodes) | set(authz_nodes) | set(acct_nodes)
-    return sorted(all_nodes)
+def _set_trends_today(
+    result: dict[str, list[dict]],
+    key_prefix: str,
+    today_iso: str,
+    snapshot: dict[str, Any],
+) -> None:
+    """Put the live snapshot's counts into today's entry of the six series."""
+    authentication = snapshot["authentication"]
+    permit, deny = snapshot["authorization"]
+    start, stop = snapshot["accounting"]
+    for series, count in (
+        ("authentication_success", authentication.get("today_successful_logins", 0)),
+        ("authentication_fail", authentication.get("today_failed_logins", 0)),
+        ("authorization_permit", permit),
+        ("authorization_deny", deny),
+        ("accounting_start", start),
+        ("accounting_stop", stop),
+    ):
+        _set_trend_today(result[f"{key_prefix}_{series}"], today_iso, count)
 
 
 def _get_range_statistics(
@@ -334,114 +336,15 @@ def _get_range_statistics(
     DB is queried up to yesterday; today's data injected from live log files.
     """
     today = datetime.now(timezone.utc).date()
-    include_today = end_date >= today
     # DB never has today's data (cron runs at 1am for yesterday), so cap at yesterday
     db_end = min(end_date, today - timedelta(days=1))
 
-    start_dt = datetime.combine(start_date, time_.min).replace(tzinfo=timezone.utc)
-    db_end_dt = datetime.combine(db_end, time_.max).replace(tzinfo=timezone.utc)
-
-    auth_daily_stmt = (
-        select(
-            AuthenticationStatistics.log_date.label("date"),
-            func.sum(AuthenticationStatistics.success_count).label(
-                "auth_success_count"
-            ),
-            func.sum(AuthenticationStatistics.fail_count).label("auth_fail_count"),
+    daily_results = daily_totals(session, start_date, db_end, node_name)
+    result = _trend_series(daily_results, start_date, end_date, key_prefix)
+    if end_date >= today:
+        _set_trends_today(
+            result, key_prefix, today.isoformat(), get_today_snapshot(node_name)
         )
-        .where(AuthenticationStatistics.log_date.between(start_dt, db_end_dt))
-        .group_by(AuthenticationStatistics.log_date)
-        .order_by(AuthenticationStatistics.log_date)
-    )
-
-    authz_daily_stmt = (
-        select(
-            AuthorizationStatistics.log_date.label("date"),
-            func.sum(AuthorizationStatistics.permit_count).label("authz_permit_count"),
-            func.sum(AuthorizationStatistics.deny_count).label("authz_deny_count"),
-        )
-        .where(AuthorizationStatistics.log_date.between(start_dt, db_end_dt))
-        .group_by(AuthorizationStatistics.log_date)
-        .order_by(AuthorizationStatistics.log_date)
-    )
-
-    acct_daily_stmt = (
-        select(
-            AccountingStatistics.log_date.label("date"),
-            func.sum(AccountingStatistics.start_count).label("acct_start_count"),
-            func.sum(AccountingStatistics.stop_count).label("acct_stop_count"),
-        )
-        .where(AccountingStatistics.log_date.between(start_dt, db_end_dt))
-        .group_by(AccountingStatistics.log_date)
-        .order_by(AccountingStatistics.log_date)
-    )
-
-    if node_name:
-        auth_daily_stmt = auth_daily_stmt.where(
-            AuthenticationStatistics.node_name == node_name
-        )
-        authz_daily_stmt = authz_daily_stmt.where(
-            AuthorizationStatistics.node_name == node_name
-        )
-        acct_daily_stmt = acct_daily_stmt.where(
-            AccountingStatistics.node_name == node_name
-        )
-
-    auth_daily_results = session.exec(auth_daily_stmt).all()
-    authz_daily_results = session.exec(authz_daily_stmt).all()
-    acct_daily_results = session.exec(acct_daily_stmt).all()
-
-    num_days = (end_date - start_date).days + 1
-    all_dates = [(start_date + timedelta(days=i)) for i in range(num_days)]
-
-    result = {
-        f"{key_prefix}_authentication_success": fill_missing_dates(
-            auth_daily_results, all_dates, "auth_success_count"
-        ),
-        f"{key_prefix}_authentication_fail": fill_missing_dates(
-            auth_daily_results, all_dates, "auth_fail_count"
-        ),
-        f"{key_prefix}_authorization_permit": fill_missing_dates(
-            authz_daily_results, all_dates, "authz_permit_count"
-        ),
-        f"{key_prefix}_authorization_deny": fill_missing_dates(
-            authz_daily_results, all_dates, "authz_deny_count"
-        ),
-        f"{key_prefix}_accounting_start": fill_missing_dates(
-            acct_daily_results, all_dates, "acct_start_count"
-        ),
-        f"{key_prefix}_accounting_stop": fill_missing_dates(
-            acct_daily_results, all_dates, "acct_stop_count"
-        ),
-    }
-
-    # Inject today's live data
-    inject_live = include_today
-
-    if inject_live:
-        today_iso = today.isoformat()
-        today_stats = process_today_authentication_statistics(
-            session, node_name=node_name
-        )
-        _set_trend_today(
-            result[f"{key_prefix}_authentication_success"],
-            today_iso,
-            today_stats.get("today_successful_logins", 0),
-        )
-        _set_trend_today(
-            result[f"{key_prefix}_authentication_fail"],
-            today_iso,
-            today_stats.get("today_failed_logins", 0),
-        )
-        permit, deny = get_today_authz_counts(session, node_name=node_name)
-        _set_trend_today(
-            result[f"{key_prefix}_authorization_permit"], today_iso, permit
-        )
-        _set_trend_today(result[f"{key_prefix}_authorization_deny"], today_iso, deny)
-        start_c, stop_c = get_today_acct_counts(session, node_name=node_name)
-        _set_trend_today(result[f"{key_prefix}_accounting_start"], today_iso, start_c)
-        _set_trend_today(result[f"{key_prefix}_accounting_stop"], today_iso, stop_c)
-
     return result
 
 
@@ -462,20 +365,6 @@ def get_last_7_days_statistics(
 
 def get_date_range_statistics(
     *,
-    session: Session,
-    start_date: datetime,
-    end_date: datetime,
-    node_name: str | None = None,
-) -> dict[str, Any]:
-    """
-    Retrieves statistics for the range of days from the database.
-    """
-    return _get_range_statistics(
-        session, start_date.date(), end_date.date(), "last_range_days", node_name
-    )
-
-
-def process_authentication_statistics(
     session: Session,
     start_date: datetime,
     end_date: datetime,
@@ -484,198 +373,62 @@ def process_authentication_statistics(
     node_name: str | None = None,
 ) -> dict[str, Any]:
     """
-    Processes authentication log files to extract statistics and save them to the database.
+    Retrieves the six per-day series and the top-N lists of a date range in one
+    rollup query, plus one live snapshot when the range includes today.
     """
-
-    failed_count_stmt = (
-        select(
-            AuthenticationStatistics.username,
-            func.sum(AuthenticationStatistics.fail_count).label("fail_count"),
-        )
-        .where(AuthenticationStatistics.fail_count > 0)
-        .group_by(AuthenticationStatistics.username)
-        .having(func.sum(AuthenticationStatistics.fail_count) > 0)
-        .order_by(func.sum(AuthenticationStatistics.fail_count).desc())
-    )
-    success_count_stmt = (
-        select(
-            AuthenticationStatistics.username,
-            func.sum(AuthenticationStatistics.success_count).label("success_count"),
-        )
-        .where(AuthenticationStatistics.success_count > 0)
-        .group_by(AuthenticationStatistics.username)
-        .having(func.sum(AuthenticationStatistics.success_count) > 0)
-        .order_by(func.sum(AuthenticationStatistics.success_count).desc())
-    )
-    success_count_by_ip_stmt = (
-        select(
-            AuthenticationStatistics.user_source_ip,
-            func.sum(AuthenticationStatistics.success_count).label("success_count"),
-        )
-        .where(AuthenticationStatistics.success_count > 0)
-        .group_by(AuthenticationStatistics.user_source_ip)
-        .having(func.sum(AuthenticationStatistics.success_count) > 0)
-        .order_by(func.sum(AuthenticationStatistics.success_count).desc())
-    )
-    success_count_by_nas_ip_stmt = (
-        select(
-            AuthenticationStatistics.nas_ip,
-            func.sum(AuthenticationStatistics.success_count).label("success_count"),
-        )
-        .where(AuthenticationStatistics.success_count > 0)
-        .group_by(AuthenticationStatistics.nas_ip)
-        .having(func.sum(AuthenticationStatistics.success_count) > 0)
-        .order_by(func.sum(AuthenticationStatistics.success_count).desc())
-    )
-    # DB query capped at yesterday; today injected from live log below
     today = datetime.now(timezone.utc).date()
     include_today = end_date.date() >= today
+    # DB query capped at yesterday; today injected from the live snapshot below
     db_end = min(end_date.date(), today - timedelta(days=1))
-    start_dt = datetime.combine(start_date.date(), time_.min).replace(
-        tzinfo=timezone.utc
-    )
-    db_end_dt = datetime.combine(db_end, time_.max).replace(tzinfo=timezone.utc)
-
-    failed_count_stmt = failed_count_stmt.where(
-        AuthenticationStatistics.log_date.between(start_dt, db_end_dt)
-    )
-    success_count_stmt = success_count_stmt.where(
-        AuthenticationStatistics.log_date.between(start_dt, db_end_dt)
-    )
-    success_count_by_ip_stmt = success_count_by_ip_stmt.where(
-        AuthenticationStatistics.log_date.between(start_dt, db_end_dt)
-    )
-    success_count_by_nas_ip_stmt = success_count_by_nas_ip_stmt.where(
-        AuthenticationStatistics.log_date.between(start_dt, db_end_dt)
-    )
-
-    if node_name:
-        failed_count_stmt = failed_count_stmt.where(
-            AuthenticationStatistics.node_name == node_name
-        )
-        success_count_stmt = success_count_stmt.where(
-            AuthenticationStatistics.node_name == node_name
+    top_lists = {
+        name: TopList(
+            log_type,
+            dimension,
+            count,
+            start_date.date(),
+            # Authorization lists have no live counterpart: read stored rows up to the end.
+            db_end if log_type == "authentication" else end_date.date(),
         )
-        success_count_by_ip_stmt = success_count_by_ip_stmt.where(
-            AuthenticationStatistics.node_name == node_name
-        )
-        success_count_by_nas_ip_stmt = success_count_by_nas_ip_stmt.where(
-            AuthenticationStatistics.node_name == node_name
-        )
-
-    failed_count_results = session.exec(failed_count_stmt).all()
-    authentication_failed_count_by_user = [
-        {"username": r.username, "fail_count": r.fail_count}
-        for r in failed_count_results
-    ]
-    success_count_results = session.exec(success_count_stmt).all()
-    authentication_success_count_by_user = [
-        {"username": r.username, "success_count": r.success_count}
-        for r in success_count_results
-    ]
-    success_count_by_ip_results = session.exec(success_count_by_ip_stmt).all()
-    authentication_success_count_by_user_source_ip = [
-        {"user_source_ip": r.user_source_ip, "success_count": r.success_count}
-        for r in success_count_by_ip_results
-    ]
-    success_count_by_nas_ip_results = session.exec(success_count_by_nas_ip_stmt).all()
-    authentication_success_count_by_nas_ip = [
-        {"nas_ip": r.nas_ip, "success_count": r.success_count}
-        for r in success_count_by_nas_ip_results
-    ]
-
+        for name, (log_type, dimension, count, _field) in _RANGE_TOP_LISTS.items()
+    }
+    today_stats: dict[str, Any] = {}
+    snapshot: dict[str, Any] = {}
     if include_today:
-        ts = process_today_authentication_statistics(session, node_name=node_name)
-        authentication_success_count_by_user = _merge_today_top(
-            authentication_success_count_by_user,
-            ts.get("today_authentication_success_count_by_user", []),
-            "username",
-            "success_count",
-        )
-        authentication_failed_count_by_user = _merge_today_top(
-            authentication_failed_count_by_user,
-            ts.get("today_authentication_failed_count_by_user", []),
-            "username",
-            "fail_count",
-        )
-        authentication_success_count_by_user_source_ip = _merge_today_top(
-            authentication_success_count_by_user_source_ip,
-            ts.get("today_authentication_success_count_by_user_source_ip", []),
-            "user_source_ip",
-            "success_count",
-        )
-        authentication_success_count_by_nas_ip = _merge_today_top(
-            authentication_success_count_by_nas_ip,
-            ts.get("today_authentication_success_count_by_nas_ip", []),
-            "nas_ip",
-            "success_count",
-        )
-
-    return {
-        "authentication_failed_count_by_user": authentication_failed_count_by_user[
-            skip : skip + limit
-        ],
-        "authentication_success_count_by_user": authentication_success_count_by_user[
-            skip : skip + limit
-        ],
-        "authentication_success_count_by_user_source_ip": authentication_success_count_by_user_source_ip[
-            skip : skip + limit
-        ],
-        "authentication_success_count_by_nas_ip": authentication_success_count_by_nas_ip[
-            skip : skip + limit
-        ],
+        snapshot = get_today_snapshot(node_name)
+        today_stats = snapshot["authentication"]
+    # The top ``skip + limit`` stored keys and the stored totals of today's live
+    # keys are enough to rank the merged list: any other key keeps its stored
+    # total, which does not exceed the last of the stored top keys.
+    live_keys = {
+        name: [entry[dimension] for entry in today_stats.get(f"today_{name}", [])]
+        for name, (_log_type, dimension, _count, _field) in _RANGE_TOP_LISTS.items()
     }
-
-
-def process_authorization_statistics(
-    session: Session,
-    start_date: datetime,
-    end_date: datetime,
-    skip: int = 0,
-    limit: int = 5,
-    node_name: str | None = None,
-) -> dict[str, Any]:
-    """
-    Processes authorization log files to extract statistics and save them to the database.
-    """
-
-    authz_deny_count_stmt = (
-        select(
-            AuthorizationStatistics.username,
-            func.sum(AuthorizationStatistics.deny_count).label("deny_count"),
-        )
-        .where(AuthorizationStatistics.deny_count > 0)
-        .group_by(AuthorizationStatistics.username)
-        .having(func.sum(AuthorizationStatistics.deny_count) > 0)
-        .order_by(func.sum(AuthorizationStatistics.deny_count).desc())
+    overview = range_overview(
+        session,
+        start_date.date(),
+        db_end,
+        top_lists,
+        node_name,
+        limit=skip + limit,
+        extra_keys=live_keys,
     )
 
-    authz_start_dt = datetime.combine(start_date.date(), time_.min).replace(
-        tzinfo=timezone.utc
-    )
-    authz_end_dt = datetime.combine(end_date.date(), time_.max).replace(
-        tzinfo=timezone.utc
-    )
-    authz_deny_count_stmt = authz_deny_count_stmt.where(
-        AuthorizationStatistics.log_date.between(authz_start_dt, authz_end_dt)
+    result: dict[str, Any] = _trend_series(
+        overview.daily, start_date.date(), end_date.date(), "last_range_days"
     )
+    if include_today:
+        _set_trends_today(result, "last_range_days", today.isoformat(), snapshot)
 
-    if node_name:
-        authz_deny_count_stmt = authz_deny_count_stmt.where(
-            AuthorizationStatistics.node_name == node_name
-        )
-
-    authz_deny_count_results = session.exec(authz_deny_count_stmt).all()
-    # Convert the Row objects to a list of dicts
-    authorization_deny_count_by_user = [
-        {"username": r.username, "deny_count": r.deny_count}
-        for r in authz_deny_count_results
-    ]
-    return {
-        "authorization_deny_count_by_user": authorization_deny_count_by_user[
-            skip : skip + limit
-        ],
-    }
+    for name, (_log_type, dimension, _count, count_field) in _RANGE_TOP_LISTS.items():
+        entries = [
+            {dimension: key, count_field: total} for key, total in overview.top[name]
+        ]
+        if f"today_{name}" in today_stats:
+            entries = _merge_today_top(
+                entries, today_stats[f"today_{name}"], dimension, count_field
+            )
+        result[name] = entries[skip : skip + limit]
+    return result
 
 
 def _get_node_today_authz_counts_from_db(
@@ -710,310 +463,267 @@ def _get_node_today_acct_counts_from_db(
     return 0, 0
 
 
-def get_today_authz_counts(
-    session: Session, node_name: str | None = None
-) -> tuple[int, int]:
-    """Get live today's authorization permit/deny counts for the selected node or all nodes."""
-    global _today_authz_cache
-    today = datetime.now(timezone.utc)
-    today_str = today.strftime("%Y-%m-%d")
-    today_dt = datetime.combine(today.date(), time_.min).replace(tzinfo=timezone.utc)
-    now_ts = _time.monotonic()
-
-    cache_key = node_name or "all"
-    if (
-        _today_authz_cache.get(cache_key, {}).get("date") == today_str
-        and now_ts - _today_authz_cache.get(cache_key, {}).get("ts", 0.0) < 60
-    ):
-        return _today_authz_cache[cache_key]["permit"], _today_authz_cache[cache_key][
-            "deny"
-        ]
+def _live_stats(
+    key: str, compute: Callable[[Session], T], ttl: float = _LIVE_CACHE_TTL
+) -> T:
+    """
+    Value of ``key`` from the live cache shared by all workers. ``compute`` may
+    run in a background refresh, after the request's session is gone, so it is
+    given a session of its own.
+    """
 
-    permit = deny = 0
+    def _run() -> T:
+        with Session(engine) as session:
+            return compute(session)
 
-    if node_name:
-        if node_name == settings.NODE_NAME:
-            permit, deny = _today_authz_counts()
-        else:
-            fetched = False
-            peer_urls = get_peer_urls()
-            for url in peer_urls:
-                try:
-                    endpoint = f"{url.rstrip('/')}/api/v1/sync/internal/collect-stats"
-                    if not settings.INTERNAL_SYNC_TOKEN:
-                        continue
-                    with httpx.Client(timeout=3.0) as client:
-                        resp = client.post(
-                            endpoint,
-                            params={"date": today_str},
-                            headers={"X-Internal-Token": settings.INTERNAL_SYNC_TOKEN},
-                        )
-                        if resp.status_code == 200:
-                            data = resp.json()
-                            if data.get("node_name") == node_name:
-                                authz = data.get("authorization", [])
-                                permit = sum(r.get("permit_count", 0) for r in authz)
-                                deny = sum(r.get("deny_count", 0) for r in authz)
-                                fetched = True
-                                break
-                except Exception as e:
-                    logger.warning(
-                        "Failed to fetch live authz stats from peer %s for node %s: %s",
-                        url,
-                        node_name,
-                        e,
-                    )
-            if not fetched:
-                permit, deny = _get_node_today_authz_counts_from_db(
-                    session, node_name, today_dt
-                )
-    else:
-        # All nodes
-        local_p, local_d = _today_authz_counts()
-        permit += local_p
-        deny += local_d
-
-        peer_urls = get_peer_urls()
-        fetched_peer_nodes = set()
-        for url in peer_urls:
-            try:
-                endpoint = f"{url.rstrip('/')}/api/v1/sync/internal/collect-stats"
-                if not settings.INTERNAL_SYNC_TOKEN:
-                    continue
-                with httpx.Client(timeout=3.0) as client:
-                    resp = client.post(
-                        endpoint,
-                        params={"date": today_str},
-                        headers={"X-Internal-Token": settings.INTERNAL_SYNC_TOKEN},
-                    )
-                    if resp.status_code == 200:
-                        data = resp.json()
-                        peer_node_name = data.get("node_name")
-                        if peer_node_name:
-                            authz = data.get("authorization", [])
-                            permit += sum(r.get("permit_count", 0) for r in authz)
-                            deny += sum(r.get("deny_count", 0) for r in authz)
-                            fetched_peer_nodes.add(peer_node_name)
-            except Exception as e:
-                logger.warning(
-                    "Failed to fetch live authz stats from peer %s: %s", url, e
-                )
+    value: T = live_cache.get(key, _run, ttl)
+    return value
 
-        all_known_nodes = get_distinct_node_names(session)
-        for kn in all_known_nodes:
-            if kn != settings.NODE_NAME and kn not in fetched_peer_nodes:
-                p, d = _get_node_today_authz_counts_from_db(session, kn, today_dt)
-                permit += p
-                deny += d
-
-    _today_authz_cache[cache_key] = {
-        "date": today_str,
-        "permit": permit,
-        "deny": deny,
-        "ts": now_ts,
-    }
-    return permit, deny
 
+def get_today_snapshot(node_name: str | None = None) -> dict[str, Any]:
+    """
+    Today's live figures for the selected node or all nodes, gathered with one
+    peer fan-out and cached (60 s, across workers) as one entry:
+    {"authentication": aggregate_today_auth_details() + "today_stale_nodes",
+    "authorization": [permit, deny], "accounting": [start, stop]}.
+    """
+    today_str = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    return _live_stats(
+        f"today:{today_str}:{node_name or ''}",
+        lambda session: _compute_today_snapshot(session, node_name, today_str),
+    )
 
-def get_today_acct_counts(
-    session: Session, node_name: str | None = None
-) -> tuple[int, int]:
-    """Get live today's accounting start/stop counts for the selected node or all nodes."""
-    global _today_acct_cache
-    today = datetime.now(timezone.utc)
-    today_str = today.strftime("%Y-%m-%d")
-    today_dt = datetime.combine(today.date(), time_.min).replace(tzinfo=timezone.utc)
-    now_ts = _time.monotonic()
-
-    cache_key = node_name or "all"
-    if (
-        _today_acct_cache.get(cache_key, {}).get("date") == today_str
-        and now_ts - _today_acct_cache.get(cache_key, {}).get("ts", 0.0) < 60
-    ):
-        return _today_acct_cache[cache_key]["start"], _today_acct_cache[cache_key][
-            "stop"
-        ]
 
-    start = stop = 0
+def _compute_today_snapshot(
+    session: Session, node_name: str | None, today_str: str
+) -> dict[str, Any]:
+    today_dt = datetime.combine(
+        date.fromisoformat(today_str), time_.min, tzinfo=timezone.utc
+    )
+    details: list[dict] = []
+    authz = [0, 0]
+    acct = [0, 0]
+    stale_nodes: dict[str, float | None] = {}
+
+    def add(into: list[int], counts: tuple[int, int]) -> None:
+        into[0] += counts[0]
+        into[1] += counts[1]
 
-    if node_name:
-        if node_name == settings.NODE_NAME:
-            start, stop = _today_acct_counts()
+    if node_name in (None, settings.NODE_NAME):
+        details.extend(parse_local_today_authentication_details())
+        add(authz, _today_authz_counts())
+        add(acct, _today_acct_counts())
+
+    if node_name != settings.NODE_NAME:
+        # Peer live stats (a stale peer contributes its last good payload)
+        peers = peer_stats.collect_by_node(today_str)
+        if node_name:
+            peers = {n: peer for n, peer in peers.items() if n == node_name}
+            wanted = [node_name]
         else:
-            fetched = False
-            peer_urls = get_peer_urls()
-            for url in peer_urls:
-                try:
-                    endpoint = f"{url.rstrip('/')}/api/v1/sync/internal/collect-stats"
-                    if not settings.INTERNAL_SYNC_TOKEN:
-                        continue
-                    with httpx.Client(timeout=3.0) as client:
-                        resp = client.post(
-                            endpoint,
-                            params={"date": today_str},
-                            headers={"X-Internal-Token": settings.INTERNAL_SYNC_TOKEN},
-                        )
-                        if resp.status_code == 200:
-                            data = resp.json()
-                            if data.get("node_name") == node_name:
-                                acct = data.get("accounting", [])
-                                start = sum(r.get("start_count", 0) for r in acct)
-                                stop = sum(r.get("stop_count", 0) for r in acct)
-                                fetched = True
-                                break
-                except Exception as e:
-                    logger.warning(
-                        "Failed to fetch live acct stats from peer %s for node %s: %s",
-                        url,
-                        node_name,
-                        e,
-                    )
-            if not fetched:
-                start, stop = _get_node_today_acct_counts_from_db(
-                    session, node_name, today_dt
-                )
-    else:
-        # All nodes
-        local_s, local_st = _today_acct_counts()
-        start += local_s
-        stop += local_st
-
-        peer_urls = get_peer_urls()
-        fetched_peer_nodes = set()
-        for url in peer_urls:
-            try:
-                endpoint = f"{url.rstrip('/')}/api/v1/sync/internal/collect-stats"
-                if not settings.INTERNAL_SYNC_TOKEN:
-                    continue
-                with httpx.Client(timeout=3.0) as client:
-                    resp = client.post(
-                        endpoint,
-                        params={"date": today_str},
-                        headers={"X-Internal-Token": settings.INTERNAL_SYNC_TOKEN},
-                    )
-                    if resp.status_code == 200:
-                        data = resp.json()
-                        peer_node_name = data.get("node_name")
-                        if peer_node_name:
-                            acct = data.get("accounting", [])
-                            start += sum(r.get("start_count", 0) for r in acct)
-                            stop += sum(r.get("stop_count", 0) for r in acct)
-                            fetched_peer_nodes.add(peer_node_name)
-            except Exception as e:
-                logger.warning(
-                    "Failed to fetch live acct stats from peer %s: %s", url, e
-                )
+            wanted = get_distinct_node_names()
+        for peer_node_name, peer in peers.items():
+            details.extend(peer.rows("authentication"))
+            add(authz, peer.totals("authorization"))
+            add(acct, peer.totals("accounting"))
+            if peer.stale:
+                stale_nodes[peer_node_name] = peer.age
+
+        # Fallback for offline peers
+        for kn in wanted:
+            if kn != settings.NODE_NAME and kn not in peers:
+                details.extend(get_node_today_stats_from_db(session, kn, today_dt))
+                add(authz, _get_node_today_authz_counts_from_db(session, kn, today_dt))
+                add(acct, _get_node_today_acct_counts_from_db(session, kn, today_dt))
+                stale_nodes[kn] = None
 
-        all_known_nodes = get_distinct_node_names(session)
-        for kn in all_known_nodes:
-            if kn != settings.NODE_NAME and kn not in fetched_peer_nodes:
-                s, st = _get_node_today_acct_counts_from_db(session, kn, today_dt)
-                start += s
-                stop += st
-
-    _today_acct_cache[cache_key] = {
-        "date": today_str,
-        "start": start,
-        "stop": stop,
-        "ts": now_ts,
+    authentication = aggregate_today_auth_details(details, today_str)
+    authentication["today_stale_nodes"] = stale_nodes
+    return {
+        "authentication": authentication,
+        "authorization": authz,
+        "accounting": acct,
     }
-    return start, stop
 
 
 def process_today_authentication_statistics(
-    session: Session,
     node_name: str | None = None,
 ) -> dict[str, Any]:
     """
     Parses today's authentication log file live (for local node) or fetches from peer,
     falling back to database if needed, and returns aggregated stats.
-    Result cached for 60 s to avoid repeated queries/file scans on dashboard polling.
+    Result cached for 60 s, across workers, to avoid repeated queries/file scans
+    on dashboard polling.
     """
-    global _today_cache
-    today = datetime.now(timezone.utc)
-    today_str = today.strftime("%Y-%m-%d")
-    today_dt = datetime.combine(today.date(), time_.min).replace(tzinfo=timezone.utc)
-    now_ts = _time.monotonic()
-
-    cache_key = node_name or "all"
-    if (
-        _today_cache.get(cache_key, {}).get("date") == today_str
-        and now_ts - _today_cache.get(cache_key, {}).get("ts", 0.0) < 60
-    ):
-        return _today_cache[cache_key]["data"]
+    stats: dict[str, Any] = get_today_snapshot(node_name)["authentication"]
+    return stats
+
+
+# ---------------------------------------------------------------------------
+# Bulk persistence — one INSERT … ON CONFLICT DO UPDATE per chunk of keys.
+# ---------------------------------------------------------------------------
+
+# log_type -> (table model, count column for Counter slot 0, count column for slot 1)
+STATISTICS_TABLES: dict[str, tuple[Any, str, str]] = {
+    "authentication": (AuthenticationStatistics, "success_count", "fail_count"),
+    "authorization": (AuthorizationStatistics, "permit_count", "deny_count"),
+    "accounting": (AccountingStatistics, "start_count", "stop_count"),
+}
+_STATISTICS_KEY = ("username", "nas_ip", "user_source_ip", "log_date", "node_name")
+
+
+def statistics_rows(
+    log_type: str,
+    counters: StatsCounters,
+    log_date: datetime,
+    node_name: str,
+) -> list[dict[str, Any]]:
+    """Turn (slot 0, slot 1) Counters keyed by (username, nas_ip, client_ip) into table rows."""
+    _model, first, second = STATISTICS_TABLES[log_type]
+    now = datetime.now(timezone.utc)
+    rows = []
+    for key in sorted(set(counters[0]) | set(counters[1])):
+        username, nas_ip, user_source_ip = key
+        rows.append(
+            {
+                "id": uuid.uuid4(),
+                "username": username,
+                "nas_ip": nas_ip,
+                "user_source_ip": user_source_ip,
+                "log_date": log_date,
+                "node_name": node_name,
+                first: counters[0].get(key, 0),
+                second: counters[1].get(key, 0),
+                "created_at": now,
+                "updated_at": now,
+            }
+        )
+    return rows
 
-    # Gather raw details
-    details = []
 
-    if node_name:
-        if node_name == settings.NODE_NAME:
-            details = parse_local_today_authentication_details()
-        else:
-            # Try peer URL
-            fetched_details = None
-            peer_urls = get_peer_urls()
-            for url in peer_urls:
-                try:
-                    endpoint = f"{url.rstrip('/')}/api/v1/sync/internal/collect-stats"
-                    if not settings.INTERNAL_SYNC_TOKEN:
-                        continue
-                    with httpx.Client(timeout=3.0) as client:
-                        resp = client.post(
-                            endpoint,
-                            params={"date": today_str},
-                            headers={"X-Internal-Token": settings.INTERNAL_SYNC_TOKEN},
-                        )
-                        if resp.status_code == 200:
-                            data = resp.json()
-                            if data.get("node_name") == node_name:
-                                fetched_details = data.get("authentication", [])
-                                break
-                except Exception as e:
-                    logger.warning(
-                        "Failed to fetch live stats from peer %s for node %s: %s",
-                        url,
-                        node_name,
-                        e,
-                    )
-
-            if fetched_details is not None:
-                details = fetched_details
-            else:
-                details = get_node_today_stats_from_db(session, node_name, today_dt)
-    else:
-        # All nodes
-        # 1. Local live stats
-        details.extend(parse_local_today_authentication_details())
+def peer_statistics_rows(
+    log_type: str, peer_rows: list[dict[str, Any]], node_name: str
+) -> list[dict[str, Any]]:
+    """Turn the rows of a peer's collect-stats payload into table rows for ``node_name``."""
+    _model, first, second = STATISTICS_TABLES[log_type]
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "id": uuid.uuid4(),
+            "username": row["username"],
+            "nas_ip": row["nas_ip"],
+            "user_source_ip": row["user_source_ip"],
+            "log_date": datetime.fromisoformat(row["log_date"]),
+            "node_name": node_name,
+            first: row[first],
+            second: row[second],
+            "created_at": now,
+            "updated_at": now,
+        }
+        for row in peer_rows
+    ]
 
-        # 2. Peer live stats
-        peer_urls = get_peer_urls()
-        fetched_peer_nodes = set()
-        for url in peer_urls:
-            try:
-                endpoint = f"{url.rstrip('/')}/api/v1/sync/internal/collect-stats"
-                if not settings.INTERNAL_SYNC_TOKEN:
-                    continue
-                with httpx.Client(timeout=3.0) as client:
-                    resp = client.post(
-                        endpoint,
-                        params={"date": today_str},
-                        headers={"X-Internal-Token": settings.INTERNAL_SYNC_TOKEN},
-                    )
-                    if resp.status_code == 200:
-                        data = resp.json()
-                        peer_node_name = data.get("node_name")
-                        if peer_node_name:
-                            details.extend(data.get("authentication", []))
-                            fetched_peer_nodes.add(peer_node_name)
-            except Exception as e:
-                logger.warning("Failed to fetch live stats from peer %s: %s", url, e)
-
-        # 3. Fallback for offline peers
-        all_known_nodes = get_distinct_node_names(session)
-        for kn in all_known_nodes:
-            if kn != settings.NODE_NAME and kn not in fetched_peer_nodes:
-                details.extend(get_node_today_stats_from_db(session, kn, today_dt))
 
-    result = aggregate_today_auth_details(details, today_str)
-    _today_cache[cache_key] = {"date": today_str, "data": result, "ts": now_ts}
-    return result
+def upsert_statistics(
+    session: Session,
+    log_type: str,
+    rows: list[dict[str, Any]],
+    chunk_size: int | None = None,
+) -> int:
+    """
+    Insert or overwrite statistics rows on the table's unique key
+    (username, nas_ip, user_source_ip, log_date, node_name), one statement per
+    ``chunk_size`` rows (default STATS_UPSERT_CHUNK_SIZE). A key given twice
+    keeps its last row. Commits and returns the number of rows written.
+    """
+    model, first, second = STATISTICS_TABLES[log_type]
+    chunk_size = chunk_size or settings.STATS_UPSERT_CHUNK_SIZE
+    # ON CONFLICT DO UPDATE cannot touch the same row twice in one statement.
+    unique = list({tuple(r[k] for k in _STATISTICS_KEY): r for r in rows}.values())
+    ensure_partitions(session, {r["log_date"].date() for r in unique})
+    for start in range(0, len(unique), chunk_size):
+        stmt = pg_insert(model).values(unique[start : start + chunk_size])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(_STATISTICS_KEY),
+            set_={
+                first: stmt.excluded[first],
+                second: stmt.excluded[second],
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        session.execute(stmt)
+    written = {(r["log_date"].date(), r["node_name"]) for r in unique}
+    new_node = register_nodes(session, written)
+    refresh_rollups(session, log_type, written)
+    session.commit()
+    if new_node:
+        live_cache.invalidate(_NODES_CACHE_KEY)
+    return len(unique)
+
+
+# ---------------------------------------------------------------------------
+# In-process collection — replaces running the three tacacs_logs_* scripts.
+# ---------------------------------------------------------------------------
+
+# log_type -> SIEM result names for Counter slot 0 and slot 1
+_SIEM_RESULTS = {
+    "authentication": ("success", "failed"),
+    "authorization": ("permit", "deny"),
+    "accounting": ("start", "stop"),
+}
+
+
+def _forward_statistics_to_siem(
+    log_type: str, counters: StatsCounters, timestamp: float
+) -> None:
+    """Forward one event per (key, result) seen, as the batch scripts do."""
+    results = _SIEM_RESULTS[log_type]
+    for key in sorted(set(counters[0]) | set(counters[1])):
+        username, nas_ip, user_source_ip = key
+        for counter, result in zip(counters, results, strict=True):
+            if counter.get(key, 0) > 0:
+                forward_tacacs_event_to_siem(
+                    log_type,
+                    username,
+                    nas_ip,
+                    user_source_ip,
+                    result,
+                    timestamp,
+                    background=False,
+                )
+
+
+def collect_local_statistics(
+    session: Session,
+    target_date: date,
+    node_name: str | None = None,
+    log_types: Iterable[str] = LOG_TYPES,
+) -> dict[str, dict[str, Any]]:
+    """
+    Aggregate this node's logs for ``target_date`` into the statistics tables.
+
+    Counters come from the shared event store (the live tail for recent days,
+    a single parse otherwise) and are bulk-upserted through ``session``. This
+    blocks on file and DB I/O — call it with asyncio.to_thread from async code.
+    Returns {log_type: {"events", "rows"} or {"error"}}.
+    """
+    node_name = node_name or settings.NODE_NAME
+    log_dt = to_log_datetime(target_date)
+    results: dict[str, dict[str, Any]] = {}
+    for log_type in log_types:
+        try:
+            counters = event_store.counters(log_type, target_date)
+            rows = statistics_rows(log_type, counters, log_dt, node_name)
+            upsert_statistics(session, log_type, rows)
+        except Exception as e:
+            session.rollback()
+            logger.exception("Collecting %s statistics failed", log_type)
+            results[log_type] = {"error": str(e)}
+            continue
+        results[log_type] = {
+            "events": counters[0].total() + counters[1].total(),
+            "rows": len(rows),
+        }
+        if settings.SIEM_FORWARD_TACACS_EVENTS:
+            _forward_statistics_to_siem(log_type, counters, log_dt.timestamp())
+    return results
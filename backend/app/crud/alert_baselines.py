@@ -0,0 +1,117 @@
+"""
+Baselines of the "new_value" alert rules: the usernames and source IPs seen
+in the BASELINE_DAYS days before today.
+
+The sets are read once per day from the per-day and per-month key rollups
+(AaaStatisticsKeyRollup) and kept in memory, so a rule evaluation is a set
+difference and never queries the statistics tables. Statistics written for
+past days during the day (backfills, late peers) are picked up by the next
+day's refresh.
+
+Values a rule has already reported are remembered for the rest of the day, so
+a rule firing again after its cooldown reports only values seen since.
+"""
+
+import threading
+from collections.abc import Hashable, Iterable
+from datetime import date, timedelta
+
+import sqlalchemy as sa
+from sqlmodel import Session, col, select
+
+from app.crud.statistics_rollups import rollup_periods
+from app.models import AaaStatisticsKeyRollup
+
+BASELINE_DAYS = 30
+BASELINE_DIMENSIONS = ("username", "user_source_ip")
+
+
+def load_baseline(
+    session: Session, start: date, end: date
+) -> dict[str, frozenset[str]]:
+    """
+    Distinct authentication usernames and source IPs between ``start`` and
+    ``end`` (inclusive), keyed by dimension. Whole months are read from the
+    monthly rollup rows.
+    """
+    rollup = AaaStatisticsKeyRollup
+    months, day_ranges = rollup_periods(start, end)
+    periods = [
+        sa.and_(col(rollup.grain) == "day", col(rollup.period).between(lo, hi))
+        for lo, hi in day_ranges
+    ]
+    if months is not None:
+        periods.append(
+            sa.and_(col(rollup.grain) == "month", col(rollup.period).between(*months))
+        )
+    values: dict[str, set[str]] = {dim: set() for dim in BASELINE_DIMENSIONS}
+    if periods:
+        rows = session.exec(
+            select(rollup.dimension, rollup.value)
+            .where(
+                col(rollup.log_type) == "authentication",
+                col(rollup.dimension).in_(BASELINE_DIMENSIONS),
+                sa.or_(*periods),
+            )
+            .distinct()
+        )
+        for dimension, value in rows.all():
+            values[dimension].add(value)
+    return {dimension: frozenset(seen) for dimension, seen in values.items()}
+
+
+class BaselineCache:
+    """
+    The baseline sets of the current day, loaded on first use each day, and
+    the values reported today per scope (an alert rule).
+    """
+
+    def __init__(self, days: int = BASELINE_DAYS) -> None:
+        self._days = days
+        self._lock = threading.Lock()
+        self._day: date | None = None
+        self._sets: dict[str, frozenset[str]] = {}
+        self._reported: dict[tuple[Hashable, str], set[str]] = {}
+
+    def _load(self, session: Session, today: date) -> None:
+        if self._day != today:
+            start = today - timedelta(days=self._days)
+            self._sets = load_baseline(session, start, today - timedelta(days=1))
+            self._reported = {}
+            self._day = today
+
+    def get(self, session: Session, dimension: str, today: date) -> frozenset[str]:
+        """The ``dimension`` values seen in the ``days`` days before ``today``."""
+        with self._lock:
+            self._load(session, today)
+            return self._sets[dimension]
+
+    def report_new(
+        self,
+        session: Session,
+        scope: Hashable,
+        dimension: str,
+        values: Iterable[str | None],
+        today: date,
+    ) -> set[str]:
+        """
+        The (non-null) ``values`` in neither the baseline nor an earlier report
+        of ``scope`` today; they are remembered as reported until the next day.
+        """
+        with self._lock:
+            self._load(session, today)
+            reported = self._reported.setdefault((scope, dimension), set())
+            new_values = {v for v in values if v is not None}
+            new_values -= self._sets[dimension]
+            new_values -= reported
+            reported |= new_values
+            return new_values
+
+    def clear(self) -> None:
+        with self._lock:
+            self._day = None
+            self._sets = {}
+            self._reported = {}
+
+
+baseline_cache = BaselineCache()
@@ -2,22 +2,23 @@
 
 import json
 import logging
-import os
-import re
-from collections import defaultdict
-from datetime import datetime, timedelta, timezone
+import threading
+from collections import Counter
+from collections.abc import Sequence
+from datetime import date, datetime, timedelta, timezone
 from datetime import time as dt_time
+from typing import NamedTuple
 
 from sqlmodel import Session, col, select
 
-from app.core.config import settings
 from app.crud import alert_events as crud_alert_events
 from app.crud import alert_rules as crud_alert_rules
+from app.crud.alert_baselines import baseline_cache
+from app.crud.log_events import WindowCounts, event_store
 from app.crud.notification_dispatcher import dispatch_notification
 from app.models import (
     AlertRule,
     AuditLog,
-    AuthenticationStatistics,
     NotificationChannel,
 )
 
@@ -27,137 +28,172 @@ logger = logging.getLogger(__name__)
 # Live log parsing — real-time (no dependency on daily cron)
 # ---------------------------------------------------------------------------
 
-_IP = r"(?:[0-9]{1,3}\.){3}[0-9]{1,3}|[a-fA-F0-9]{0,4}(?::[a-fA-F0-9]{0,4})+"
-_NON_IP_FIELD = rf"(?:\t(?!(?:{_IP})(?:\t|$))[^\t]*)?"
-_AUTH_REGEX = re.compile(
-    r"^(?P<timestamp>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2} [+-]\d{4})\s+"
-    rf"(?P<nas_ip>{_IP})\t"
-    r"(?P<username>[\w.-]+)"
-    + _NON_IP_FIELD
-    + rf"(?:\t(?P<client_ip>{_IP}))?"
-    + r"\t(?P<message>[^\n]+)$"
-)
-_AUTHZ_REGEX = re.compile(
-    r"^(?P<timestamp>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2} [+-]\d{4})\s+"
-    rf"(?P<nas_ip>{_IP})\s+"
-    r"(?P<username>[\w.-]+)\s+"
-    r"(?P<tty>[\w/.-]+)\s+"
-    rf"(?P<client_ip>{_IP})\s+"
-    r"(?:(?P<profile>[\w.-]+)\s+)?(?P<message>.*)$"
-)
-
 
-def _log_paths_for_window(
-    window_start: datetime, now: datetime, log_type: str
-) -> list[str]:
-    """Return log file paths needed to cover the time window (today + yesterday if spans midnight)."""
-    today_path = now.strftime(
-        f"{settings.TACACS_LOG_DIRECTORY}%Y/%m/{log_type}-%Y-%m-%d.log"
-    )
-    paths = [today_path]
+def _log_dates_for_window(window_start: datetime, now: datetime) -> list[date]:
+    """Return the log dates needed to cover the time window (today + yesterday if spans midnight)."""
+    dates = [now.date()]
     today_midnight = datetime.combine(now.date(), dt_time.min, tzinfo=timezone.utc)
     if window_start < today_midnight:
-        yesterday_path = (now - timedelta(days=1)).strftime(
-            f"{settings.TACACS_LOG_DIRECTORY}%Y/%m/{log_type}-%Y-%m-%d.log"
+        dates.append(now.date() - timedelta(days=1))
+    return dates
+
+
+def _window_counts(
+    log_type: str, field: str | None, window_start: datetime, now: datetime
+) -> WindowCounts:
+    """
+    Event counts of the time window by (result, ``field`` value), from the
+    event store's per-minute buckets.
+    """
+    counts: WindowCounts = Counter()
+    for log_date in _log_dates_for_window(window_start, now):
+        counts.update(
+            event_store.window_counts(
+                log_type, log_date, field, window_start.timestamp(), now.timestamp()
+            )
         )
-        paths.append(yesterday_path)
-    return [p for p in paths if os.path.exists(p)]
+    return counts
+
+
+# ---------------------------------------------------------------------------
+# Evaluation plan
+# ---------------------------------------------------------------------------
+
+# Alert log_type -> (log file, result counted by thresholds, payload count key)
+_WINDOW_LOG_TYPES: dict[str, tuple[str, str, str]] = {
+    "auth": ("authentication", "failed", "fail_count"),
+    "authz": ("authorization", "deny", "deny_count"),
+}
+
+# condition_field values whose threshold applies to each value on its own
+# rather than to the total -> (payload item key, payload list key)
+_GROUP_KEYS: dict[str, tuple[str, str]] = {
+    "username": ("username", "triggered_usernames"),
+    "nas_ip": ("nas_ip", "triggered_nas_ips"),
+    "client_ip": ("ip", "triggered_ips"),
+    "command": ("command", "triggered_commands"),
+}
+
+# new_value condition_field -> (baseline dimension, payload key)
+_NEW_VALUE_FIELDS: dict[str, tuple[str, str]] = {
+    "username": ("username", "new_usernames"),
+    "client_ip": ("user_source_ip", "new_source_ips"),
+}
+
+# condition_field values of a total-count threshold on the auth log; authz
+# thresholds on any field outside _GROUP_KEYS are totals.
+_AUTH_TOTAL_FIELDS = ("fail_count", "result")
 
 
-def _parse_auth_log(
-    window_start: datetime, now: datetime
-) -> tuple[dict[str, int], dict[str, int], set[str], set[str]]:
+class Grouping(NamedTuple):
     """
-    Parse auth log for the time window.
-    Returns: (fail_counts_by_user, fail_counts_by_ip, recent_usernames, recent_ips)
-    Actually returns (fail_by_user, fail_by_ip, recent_set_of_(user,ip))
+    One aggregation of a rule window: the ``log_type`` ("auth" / "authz")
+    events of the last ``window_minutes`` counted per ``group_by`` value
+    (a WINDOW_FIELDS name), or in total when ``group_by`` is None.
     """
-    fail_by_user: dict[str, int] = defaultdict(int)
-    fail_by_ip: dict[str, int] = defaultdict(int)
-    seen_usernames: set[str] = set()
-    seen_ips: set[str] = set()
 
-    for path in _log_paths_for_window(window_start, now, "authentication"):
-        try:
-            with open(path, errors="ignore") as f:
-                for line in f:
-                    m = _AUTH_REGEX.match(line)
-                    if not m:
-                        continue
-                    try:
-                        ts = datetime.strptime(
-                            m.group("timestamp"), "%Y-%m-%d %H:%M:%S %z"
-                        )
-                    except ValueError:
-                        continue
-                    if ts < window_start or ts > now:
-                        continue
-                    msg = m.group("message").lower()
-                    username = m.group("username")
-                    client_ip = m.group("client_ip") or m.group("nas_ip")
-                    seen_usernames.add(username)
-                    seen_ips.add(client_ip)
-                    if "failed" in msg or "denied" in msg:
-                        fail_by_user[username] += 1
-                        fail_by_ip[client_ip] += 1
-        except OSError:
-            pass
-
-    return dict(fail_by_user), dict(fail_by_ip), seen_usernames, seen_ips
-
-
-def _parse_authz_log(window_start: datetime, now: datetime) -> dict[str, int]:
-    """Parse authz log for the time window. Returns deny_count_by_user."""
-    deny_by_user: dict[str, int] = defaultdict(int)
-
-    for path in _log_paths_for_window(window_start, now, "authorization"):
-        try:
-            with open(path, errors="ignore") as f:
-                for line in f:
-                    m = _AUTHZ_REGEX.match(line)
-                    if not m:
-                        continue
-                    try:
-                        ts = datetime.strptime(
-                            m.group("timestamp"), "%Y-%m-%d %H:%M:%S %z"
-                        )
-                    except ValueError:
-                        continue
-                    if ts < window_start or ts > now:
-                        continue
-                    msg = m.group("message").lower()
-                    if "deny" in msg:
-                        deny_by_user[m.group("username")] += 1
-        except OSError:
-            pass
-
-    return dict(deny_by_user)
-
-
-def _baseline_usernames(window_start: datetime, session: Session) -> set[str]:
-    """Usernames seen in the 30-day baseline period (from DB — historical data is fine for baseline)."""
-    baseline_start = window_start - timedelta(days=30)
-    return set(
-        session.exec(
-            select(AuthenticationStatistics.username)
-            .where(AuthenticationStatistics.log_date >= baseline_start)
-            .where(AuthenticationStatistics.log_date < window_start)
-            .distinct()
-        ).all()
-    )
+    log_type: str
+    window_minutes: int
+    group_by: str | None
 
 
-def _baseline_ips(window_start: datetime, session: Session) -> set[str]:
-    """Source IPs seen in the 30-day baseline period."""
-    baseline_start = window_start - timedelta(days=30)
-    return set(
-        session.exec(
-            select(AuthenticationStatistics.user_source_ip)
-            .where(AuthenticationStatistics.log_date >= baseline_start)
-            .where(AuthenticationStatistics.log_date < window_start)
-            .distinct()
-        ).all()
-    )
+class GroupCounts(NamedTuple):
+    counts: Counter[str | None]  # failed / deny events per value ({None: n} for totals)
+    seen: frozenset[str | None]  # values with any event in the window
+
+
+def _rule_groupings(rule: AlertRule) -> list[Grouping | None]:
+    """
+    The checks of a rule in evaluation order: a Grouping per log it reads,
+    None for the config audit check.
+    """
+    field = rule.condition_field
+    operator = rule.condition_operator
+    checks: list[Grouping | None] = []
+    for log_type in _WINDOW_LOG_TYPES:
+        if rule.log_type not in (log_type, "all"):
+            continue
+        if operator == "new_value":
+            if log_type != "auth" or field not in _NEW_VALUE_FIELDS:
+                continue
+            group_by: str | None = field
+        elif operator in ("gt", "lt", "eq"):
+            if field in _GROUP_KEYS:
+                group_by = field
+            elif log_type == "authz" or field in _AUTH_TOTAL_FIELDS:
+                group_by = None
+            else:
+                continue
+        else:
+            continue
+        checks.append(Grouping(log_type, rule.time_window_minutes, group_by))
+    if rule.log_type in ("config", "all"):
+        checks.append(None)
+    return checks
+
+
+def _group_counts(window: WindowCounts, grouping: Grouping) -> GroupCounts:
+    """Split a window's (result, value) counts into counted events and seen values."""
+    counted_result = _WINDOW_LOG_TYPES[grouping.log_type][1]
+    counts: Counter[str | None] = Counter()
+    seen: set[str | None] = set()
+    for (result, value), n in window.items():
+        if grouping.group_by is not None and value is None:
+            continue  # e.g. authz lines without a command
+        seen.add(value)
+        if result == counted_result:
+            counts[value] += n
+    return GroupCounts(counts, frozenset(seen))
+
+
+class EvaluationPlan:
+    """
+    Rules compiled into checks that share aggregations. Each (log_type,
+    window, group-by field) is read from the event store's buckets of that
+    field once and answers every rule using it, so adding rules adds
+    comparisons, not scans. All windows end at the same ``now``.
+    """
+
+    def __init__(self, rules: list[AlertRule], now: datetime | None = None) -> None:
+        self.now = now or datetime.now(timezone.utc)
+        self.checks = {rule.id: _rule_groupings(rule) for rule in rules}
+        self._groups: dict[Grouping, GroupCounts] = {}
+
+    @property
+    def groupings(self) -> set[Grouping]:
+        return {g for checks in self.checks.values() for g in checks if g is not None}
+
+    def group_counts(self, grouping: Grouping) -> GroupCounts:
+        groups = self._groups.get(grouping)
+        if groups is None:
+            window = _window_counts(
+                _WINDOW_LOG_TYPES[grouping.log_type][0],
+                grouping.group_by,
+                self.now - timedelta(minutes=grouping.window_minutes),
+                self.now,
+            )
+            groups = self._groups[grouping] = _group_counts(window, grouping)
+        return groups
+
+    def evaluate(self, rule: AlertRule, session: Session) -> tuple[bool, dict]:
+        """Return (triggered, payload_dict) of the first check that triggers."""
+        for grouping in self.checks[rule.id]:
+            if grouping is None:
+                window_start = self.now - timedelta(minutes=rule.time_window_minutes)
+                triggered, payload = _check_audit_logs(
+                    rule=rule, session=session, window_start=window_start
+                )
+            else:
+                triggered, payload = _check_grouping(
+                    rule=rule,
+                    grouping=grouping,
+                    groups=self.group_counts(grouping),
+                    session=session,
+                    now=self.now,
+                )
+            if triggered:
+                return True, payload
+        return False, {}
 
 
 # ---------------------------------------------------------------------------
@@ -165,19 +201,48 @@ def _baseline_ips(window_start: datetime, session: Session) -> set[str]:
 # ---------------------------------------------------------------------------
 
 
+# Operators that new log events can satisfy. "lt" / "eq" thresholds and config
+# rules are left to the periodic sweep.
+_REALTIME_OPERATORS = ("gt", "new_value")
+_REALTIME_LOG_TYPES = ("auth", "authz", "all")
+
+# The periodic sweep and the realtime job run in different threads; one at a
+# time, so a rule fired by one is out of cooldown for the other.
+_evaluation_lock = threading.Lock()
+
+
 def evaluate_all_rules(*, session: Session) -> None:
     """Evaluate all alert rules that are due. Fire notifications for triggered rules."""
-    rules = crud_alert_rules.get_rules_due_evaluation(session=session)
+    with _evaluation_lock:
+        _evaluate_rules(
+            crud_alert_rules.get_rules_due_evaluation(session=session), session
+        )
+
+
+def evaluate_realtime_rules(*, session: Session) -> None:
+    """
+    Evaluate the due auth/authz rules that new log events can trigger; run
+    when today's authentication or authorization log is appended to.
+    """
+    with _evaluation_lock:
+        rules = [
+            rule
+            for rule in crud_alert_rules.get_rules_due_evaluation(session=session)
+            if rule.log_type in _REALTIME_LOG_TYPES
+            and rule.condition_operator in _REALTIME_OPERATORS
+        ]
+        _evaluate_rules(rules, session)
+
+
+def _evaluate_rules(rules: list[AlertRule], session: Session) -> None:
     if not rules:
         return
 
-    channels = session.exec(
-        select(NotificationChannel).where(NotificationChannel.enabled == True)  # noqa: E712
-    ).all()
-
+    channels: Sequence[NotificationChannel] | None = None  # loaded on first trigger
+    plan = EvaluationPlan(rules)
     for rule in rules:
         try:
-            triggered, payload = _evaluate_rule(rule=rule, session=session)
+            triggered, payload = plan.evaluate(rule, session)
         except Exception:
             logger.exception("Error evaluating rule %s (%s)", rule.id, rule.name)
             continue
@@ -185,6 +250,11 @@ def evaluate_all_rules(*, session: Session) -> None:
         if not triggered:
             continue
 
+        if channels is None:
+            channels = session.exec(
+                select(NotificationChannel).where(NotificationChannel.enabled == True)  # noqa: E712
+            ).all()
+
         now = datetime.now(timezone.utc)
         payload_str = json.dumps(payload)
 
@@ -210,110 +280,51 @@ def evaluate_all_rules(*, session: Session) -> None:
         crud_alert_rules.set_last_fired(session=session, rule_id=rule.id, fired_at=now)
 
 
-def _evaluate_rule(*, rule: AlertRule, session: Session) -> tuple[bool, dict]:
-    """Return (triggered, payload_dict)."""
-    now = datetime.now(timezone.utc)
-    window_start = now - timedelta(minutes=rule.time_window_minutes)
-
-    if rule.log_type in ("auth", "all"):
-        triggered, payload = _check_auth_stats(
-            rule=rule, session=session, window_start=window_start, now=now
-        )
-        if triggered:
-            return True, payload
-
-    if rule.log_type in ("authz", "all"):
-        triggered, payload = _check_authz_stats(
-            rule=rule, window_start=window_start, now=now
-        )
-        if triggered:
-            return True, payload
-
-    if rule.log_type in ("config", "all"):
-        triggered, payload = _check_audit_logs(
-            rule=rule, session=session, window_start=window_start
-        )
-        if triggered:
-            return True, payload
-
-    return False, {}
-
-
-def _check_auth_stats(
-    *, rule: AlertRule, session: Session, window_start: datetime, now: datetime
+def _check_grouping(
+    *,
+    rule: AlertRule,
+    grouping: Grouping,
+    groups: GroupCounts,
+    session: Session,
+    now: datetime,
 ) -> tuple[bool, dict]:
-    field = rule.condition_field
     operator = rule.condition_operator
     threshold = rule.threshold or 0
 
-    fail_by_user, fail_by_ip, seen_usernames, seen_ips = _parse_auth_log(
-        window_start, now
-    )
-
-    if field == "username" and operator == "new_value":
-        baseline = _baseline_usernames(window_start, session)
-        new_usernames = seen_usernames - baseline
-        if new_usernames:
-            return True, {"new_usernames": list(new_usernames), "rule": rule.name}
-        return False, {}
-
-    if field == "client_ip" and operator == "new_value":
-        baseline = _baseline_ips(window_start, session)
-        new_ips = seen_ips - baseline
-        if new_ips:
-            return True, {"new_source_ips": list(new_ips), "rule": rule.name}
-        return False, {}
-
-    if field == "client_ip" and operator in ("gt", "lt", "eq"):
-        matches = [
-            (ip, count)
-            for ip, count in fail_by_ip.items()
-            if _compare(value=float(count), operator=operator, threshold=threshold)
-        ]
-        matches.sort(key=lambda pair: pair[1], reverse=True)
-        if matches:
-            return True, {
-                "triggered_ips": [
-                    {"ip": ip, "fail_count": count} for ip, count in matches
-                ],
-                "ip": matches[0][0],
-                "fail_count": matches[0][1],
-                "window_minutes": rule.time_window_minutes,
-                "rule": rule.name,
-            }
+    if operator == "new_value":
+        dimension, payload_key = _NEW_VALUE_FIELDS[rule.condition_field]
+        new_values = baseline_cache.report_new(
+            session, rule.id, dimension, groups.seen, now.date()
+        )
+        if new_values:
+            return True, {payload_key: sorted(new_values), "rule": rule.name}
         return False, {}
 
-    if field in ("fail_count", "result") and operator in ("gt", "lt", "eq"):
-        total_fail = sum(fail_by_user.values())
-        return _compare(
-            value=float(total_fail), operator=operator, threshold=threshold
-        ), {
-            "fail_count": total_fail,
-            "window_minutes": rule.time_window_minutes,
-            "rule": rule.name,
-        }
-
-    return False, {}
-
-
-def _check_authz_stats(
-    *, rule: AlertRule, window_start: datetime, now: datetime
-) -> tuple[bool, dict]:
-    operator = rule.condition_operator
-    threshold = rule.threshold or 0
-
-    if operator in ("gt", "lt", "eq"):
-        deny_by_user = _parse_authz_log(window_start, now)
-        total_deny = sum(deny_by_user.values())
-        return _compare(
-            value=float(total_deny), operator=operator, threshold=threshold
-        ), {
-            "deny_count": total_deny,
+    count_key = _WINDOW_LOG_TYPES[grouping.log_type][2]
+    if grouping.group_by is None:
+        total = sum(groups.counts.values())
+        return _compare(value=float(total), operator=operator, threshold=threshold), {
+            count_key: total,
             "window_minutes": rule.time_window_minutes,
             "rule": rule.name,
         }
 
-    return False, {}
+    matches = [
+        (value, count)
+        for value, count in groups.counts.items()
+        if _compare(value=float(count), operator=operator, threshold=threshold)
+    ]
+    matches.sort(key=lambda pair: pair[1], reverse=True)
+    if not matches:
+        return False, {}
+    item_key, list_key = _GROUP_KEYS[grouping.group_by]
+    return True, {
+        list_key: [{item_key: value, count_key: count} for value, count in matches],
+        item_key: matches[0][0],
+        count_key: matches[0][1],
+        "window_minutes": rule.time_window_minutes,
+        "rule": rule.name,
+    }
 
 
 _CONFIG_ACTION_MAP: dict[str, list[str]] = {
@@ -392,12 +403,21 @@ _PAYLOAD_LABELS: dict[str, str] = {
     "new_usernames": "New usernames",
     "new_source_ips": "New source IPs",
     "triggered_ips": "Offending IPs",
+    "triggered_usernames": "Offending usernames",
+    "triggered_nas_ips": "Offending NAS",
+    "triggered_commands": "Denied commands",
     "config_change_count": "Config changes",
     "actions_checked": "Actions",
     "window_minutes": "Window (min)",
 }
 
 
+def _format_count(item: dict) -> str:
+    if "deny_count" in item:
+        return f"{item['deny_count']} denies"
+    return f"{item['fail_count']} fails"
+
+
 def _format_body(*, rule: AlertRule, payload: dict) -> str:
     sev_icon = _SEVERITY_EMOJI.get(rule.severity, "⚠️")
     type_icon = _LOG_TYPE_EMOJI.get(rule.log_type, "📋")
@@ -426,13 +446,20 @@ def _format_body(*, rule: AlertRule, payload: dict) -> str:
         "",
         "📊 Details:",
     ]
+    # The single item key ("ip", "username", ...) duplicates the first entry of
+    # its triggered_* list; it is kept in the payload only for webhook consumers.
+    list_items = {
+        list_key: item_key
+        for item_key, list_key in _GROUP_KEYS.values()
+        if list_key in payload
+    }
     for k, v in payload.items():
-        if k in ("rule", "window_minutes", "ip"):
-            continue  # "ip" duplicates triggered_ips[0]; kept in payload only for webhook consumers
+        if k in ("rule", "window_minutes") or k in list_items.values():
+            continue
         label = _PAYLOAD_LABELS.get(k, k.replace("_", " ").title())
-        if k == "triggered_ips" and isinstance(v, list):
+        if k in list_items and isinstance(v, list):
             v = ", ".join(
-                f"{item['ip']} ({item['fail_count']} fails)" for item in v[:10]
+                f"{item[list_items[k]]} ({_format_count(item)})" for item in v[:10]
             )
         lines.append(f"  • {label}: {v}")
     return "\n".join(lines)
@@ -0,0 +1,161 @@
+"""
+Cross-worker cache for the live-stats subsystem (dashboard figures, peer health).
+
+Values are stored as JSON in a small SQLite file shared by every uvicorn worker
+on the node. A value older than its TTL is still returned while exactly one
+caller refreshes it in a background thread; a missing value is computed by one
+caller while the others wait for it. Who refreshes is decided by a lease column
+claimed with a single conditional UPSERT, so many dashboards polling at once
+cause one recomputation, not one per worker or request.
+
+If the file cannot be used the cache degrades to calling ``compute`` directly.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_LEASE_SECONDS = 60.0  # a refresh taking longer is assumed dead and taken over
+_POLL_INTERVAL = 0.05
+_EXPIRE_SECONDS = 86400.0  # rows untouched this long are dropped
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS live_cache (
+    key TEXT PRIMARY KEY,
+    value TEXT,
+    updated_at REAL NOT NULL DEFAULT 0,
+    lease_until REAL NOT NULL DEFAULT 0
+)
+"""
+
+
+class LiveCache:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._ready = False
+        self._init_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._ready:
+            with self._init_lock:
+                if not self._ready:
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                    with sqlite3.connect(self.path, timeout=5) as conn:
+                        conn.execute("PRAGMA journal_mode=WAL")
+                        conn.execute(_SCHEMA)
+                    self._ready = True
+        return sqlite3.connect(self.path, timeout=5, isolation_level=None)
+
+    def _read(self, key: str) -> tuple[str | None, float]:
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT value, updated_at FROM live_cache WHERE key = ?", (key,)
+            ).fetchone()
+        finally:
+            conn.close()
+        return (row[0], row[1]) if row else (None, 0.0)
+
+    def _acquire(self, key: str) -> bool:
+        """Claim the refresh lease of ``key``; False while another caller holds it."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            cur = conn.execute(
+                "INSERT INTO live_cache (key, lease_until) VALUES (?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET lease_until = excluded.lease_until "
+                "WHERE live_cache.lease_until < ?",
+                (key, now + _LEASE_SECONDS, now),
+            )
+            return cur.rowcount == 1
+        finally:
+            conn.close()
+
+    def _store(self, key: str, value: Any) -> None:
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute(
+                "UPDATE live_cache SET value = ?, updated_at = ?, lease_until = 0 "
+                "WHERE key = ?",
+                (json.dumps(value), now, key),
+            )
+            conn.execute(
+                "DELETE FROM live_cache WHERE updated_at < ? AND lease_until < ?",
+                (now - _EXPIRE_SECONDS, now),
+            )
+        finally:
+            conn.close()
+
+    def _release(self, key: str) -> None:
+        conn = self._connect()
+        try:
+            conn.execute("UPDATE live_cache SET lease_until = 0 WHERE key = ?", (key,))
+        finally:
+            conn.close()
+
+    def _refresh(self, key: str, compute: Callable[[], Any]) -> Any:
+        """Compute and store ``key`` while holding its lease."""
+        try:
+            value = compute()
+        except BaseException:
+            self._release(key)
+            raise
+        # Round-trip through JSON so every caller sees the same types.
+        value = json.loads(json.dumps(value))
+        self._store(key, value)
+        return value
+
+    def _refresh_in_background(self, key: str, compute: Callable[[], Any]) -> None:
+        def _run() -> None:
+            try:
+                self._refresh(key, compute)
+            except Exception:
+                logger.exception("Background refresh of live cache key %s failed", key)
+
+        threading.Thread(target=_run, name=f"live-cache:{key}", daemon=True).start()
+
+    def invalidate(self, key: str) -> None:
+        """Drop ``key`` so the next get() computes it afresh."""
+        try:
+            conn = self._connect()
+            try:
+                conn.execute("DELETE FROM live_cache WHERE key = ?", (key,))
+            finally:
+                conn.close()
+        except (OSError, sqlite3.Error) as exc:
+            logger.warning("Live cache %s unavailable (%s)", self.path, exc)
+
+    def get(self, key: str, compute: Callable[[], Any], ttl: float) -> Any:
+        """
+        Return the cached JSON value of ``key``. A value older than ``ttl`` seconds
+        is returned as is while one background refresh runs; a missing value is
+        computed by one caller while the others wait.
+        """
+        try:
+            while True:
+                value, updated_at = self._read(key)
+                if value is not None:
+                    if time.time() - updated_at >= ttl and self._acquire(key):
+                        self._refresh_in_background(key, compute)
+                    return json.loads(value)
+                if self._acquire(key):
+                    return self._refresh(key, compute)
+                time.sleep(_POLL_INTERVAL)
+        except (OSError, sqlite3.Error) as exc:
+            logger.warning(
+                "Live cache %s unavailable (%s); computing directly", self.path, exc
+            )
+            return compute()
+
+
+live_cache = LiveCache(settings.LIVE_CACHE_PATH)
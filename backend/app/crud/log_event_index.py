@@ -0,0 +1,369 @@
+"""
+Columnar event frames for the log viewer.
+
+A frame is a read-only numpy view of one day's log file: an int64 epoch column
+plus one uint32 dictionary-code column per string field. Recent days are
+snapshotted from the in-memory event store; completed days are converted once
+into .npy files under TACACS_LOG_INDEX_DIRECTORY and memory-mapped afterwards.
+Filters are evaluated against the (small) dictionaries and applied to the code
+columns with np.isin, so TacacsLogEvent objects are only built for the rows
+that end up on the returned page.
+"""
+
+import heapq
+import json
+import logging
+import os
+import shutil
+import threading
+from collections import Counter
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from dataclasses import dataclass
+from datetime import date
+from functools import cached_property
+from itertools import islice
+from operator import itemgetter
+from pathlib import Path
+
+import numpy as np
+
+from app.core.config import settings
+from app.crud.log_events import LogEventColumns, LogEventStore, event_store
+from app.models import TacacsLogEvent
+from scripts._log_stats_base import build_log_file_path
+
+logger = logging.getLogger(__name__)
+
+STRING_COLUMNS = ("timestamp", "username", "nas_ip", "client_ip", "port", "message")
+
+# Bump when the on-disk layout changes; older indexes are rebuilt.
+_INDEX_VERSION = 1
+_FRAME_CACHE_SIZE = 64
+
+
+@dataclass(frozen=True)
+class EventFilter:
+    """Filters of GET /tacacs_logs/events (None = no filter)."""
+
+    result: str | None = None
+    username: str | None = None  # case-insensitive substring
+    nas_ip: str | None = None  # substring
+    search: str | None = None  # case-insensitive substring over all fields
+
+    def __bool__(self) -> bool:
+        return any((self.result, self.username, self.nas_ip, self.search))
+
+
+def _codes_where(
+    values: Sequence[str | None], predicate: Callable[[str], bool]
+) -> np.ndarray:
+    """Dictionary codes whose (non-null) value satisfies ``predicate``."""
+    return np.fromiter(
+        (code for code, v in enumerate(values) if v is not None and predicate(v)),
+        dtype=np.uint32,
+    )
+
+
+class EventFrame:
+    """Read-only columnar events of one (log_type, log_date) log file."""
+
+    def __init__(
+        self,
+        log_type: str,
+        log_date: date,
+        epoch: np.ndarray,
+        codes: dict[str, np.ndarray],
+        values: dict[str, list[str | None]],
+        result_by_message: list[str],
+        command_by_message: list[str | None],
+    ) -> None:
+        self.log_type = log_type
+        self.log_date = log_date
+        self.epoch = epoch
+        self.codes = codes
+        self.values = values
+        self.result_by_message = result_by_message
+        self.command_by_message = command_by_message
+
+    def __len__(self) -> int:
+        return len(self.epoch)
+
+    @cached_property
+    def ordered(self) -> bool:
+        """True when rows are in non-decreasing timestamp order (the normal case)."""
+        epoch = np.asarray(self.epoch)
+        return bool(np.all(epoch[1:] >= epoch[:-1]))
+
+    @classmethod
+    def empty(cls, log_type: str, log_date: date) -> "EventFrame":
+        return cls(
+            log_type,
+            log_date,
+            np.empty(0, dtype=np.int64),
+            {name: np.empty(0, dtype=np.uint32) for name in STRING_COLUMNS},
+            {name: [] for name in STRING_COLUMNS},
+            [],
+            [],
+        )
+
+    @classmethod
+    def from_columns(cls, columns: LogEventColumns) -> "EventFrame":
+        """Snapshot parsed columns (call with the owning segment's lock held)."""
+        n = len(columns)
+        codes = {
+            # Slicing copies the array, so the store can keep appending to its own.
+            name: np.frombuffer(getattr(columns, name).codes[:n], dtype=np.uint32)
+            for name in STRING_COLUMNS
+        }
+        epoch_by_timestamp = np.asarray(columns.epoch_by_timestamp, dtype=np.int64)
+        return cls(
+            columns.log_type,
+            columns.log_date,
+            epoch_by_timestamp[codes["timestamp"]],
+            codes,
+            {name: list(getattr(columns, name).values) for name in STRING_COLUMNS},
+            list(columns.result_by_message),
+            list(columns.command_by_message),
+        )
+
+    def matches(self, flt: EventFilter) -> np.ndarray:
+        """Boolean row mask for the filter."""
+        mask = np.ones(len(self), dtype=bool)
+        if flt.result:
+            mask &= self._isin(
+                "message",
+                _codes_where(self.result_by_message, lambda r: r == flt.result),
+            )
+        if flt.username:
+            lower = flt.username.lower()
+            mask &= self._isin(
+                "username",
+                _codes_where(self.values["username"], lambda v: lower in v.lower()),
+            )
+        if flt.nas_ip:
+            nas_ip = flt.nas_ip
+            mask &= self._isin(
+                "nas_ip", _codes_where(self.values["nas_ip"], lambda v: nas_ip in v)
+            )
+        if flt.search:
+            mask &= self._search_mask(flt.search.lower())
+        return mask
+
+    def _search_mask(self, q: str) -> np.ndarray:
+        if q in self.log_type:
+            return np.ones(len(self), dtype=bool)
+        hit = np.zeros(len(self), dtype=bool)
+        for name in ("username", "nas_ip", "client_ip", "port"):
+            hit |= self._isin(
+                name, _codes_where(self.values[name], lambda v: q in v.lower())
+            )
+        # result, command and message all derive from the message code.
+        message_codes = [
+            code
+            for code, message in enumerate(self.values["message"])
+            if q in (message or "").lower()
+            or q in self.result_by_message[code]
+            or q in (self.command_by_message[code] or "").lower()
+        ]
+        hit |= self._isin("message", np.asarray(message_codes, dtype=np.uint32))
+        return hit
+
+    def _isin(self, name: str, codes: np.ndarray) -> np.ndarray:
+        if len(codes) == 0:
+            return np.zeros(len(self), dtype=bool)
+        return np.isin(self.codes[name], codes)
+
+    def result_counts(self) -> Counter[str]:
+        """Number of events per result, counted per message code."""
+        per_message = np.bincount(
+            self.codes["message"], minlength=len(self.result_by_message)
+        )
+        counts: Counter[str] = Counter()
+        for code, n in enumerate(per_message.tolist()):
+            if n:
+                counts[self.result_by_message[code]] += n
+        return counts
+
+    def value(self, name: str, row: int) -> str | None:
+        return self.values[name][int(self.codes[name][row])]
+
+    def event(self, row: int) -> TacacsLogEvent:
+        message_code = int(self.codes["message"][row])
+        # Only the port column holds nulls.
+        username = self.value("username", row) or ""
+        nas_ip = self.value("nas_ip", row) or ""
+        client_ip = self.value("client_ip", row) or ""
+        port = self.value("port", row)
+        return TacacsLogEvent(
+            timestamp=self.value("timestamp", row) or "",
+            log_type=self.log_type,
+            username=username,
+            nas_ip=nas_ip,
+            client_ip=client_ip,
+            result=self.result_by_message[message_code],
+            message=self.values["message"][message_code] or "",
+            command=self.command_by_message[message_code],
+            port=port,
+            session_id="|".join([username, nas_ip, client_ip, port or ""]),
+        )
+
+
+class LogEventIndex:
+    """
+    Frames for the log viewer: live snapshots for days held by the event store,
+    memory-mapped on-disk indexes for completed days.
+
+    An index records the size and mtime of the log file it was built from and is
+    rebuilt when they change (late writes, restored archives, …).
+    """
+
+    def __init__(self, store: LogEventStore, index_directory: str) -> None:
+        self.store = store
+        self.index_directory = Path(index_directory)
+        self._cache: dict[tuple[str, date], tuple[list[int], EventFrame]] = {}
+        self._lock = threading.Lock()
+
+    def _index_path(self, log_type: str, log_date: date) -> Path:
+        return self.index_directory / log_date.strftime(f"%Y/%m/{log_type}-%Y-%m-%d")
+
+    def frame(self, log_type: str, log_date: date) -> EventFrame:
+        segment = self.store.segment(log_type, log_date)
+        if segment is not None:
+            return segment.read(EventFrame.from_columns)
+
+        source = build_log_file_path(log_date, log_type, self.store.log_directory)
+        try:
+            st = os.stat(source)
+        except FileNotFoundError:
+            return EventFrame.empty(log_type, log_date)
+        signature = [st.st_size, st.st_mtime_ns]
+
+        key = (log_type, log_date)
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        frame = self._load(log_type, log_date, signature)
+        if frame is None:
+            frame = EventFrame.from_columns(self.store.columns(log_type, log_date))
+            self._save(frame, signature)
+
+        with self._lock:
+            if len(self._cache) >= _FRAME_CACHE_SIZE:
+                self._cache.pop(next(iter(self._cache)))
+            self._cache[key] = (signature, frame)
+        return frame
+
+    def result_counts(self, log_type: str, log_date: date) -> Counter[str]:
+        """Number of events per result for one day's log file."""
+        segment = self.store.segment(log_type, log_date)
+        if segment is not None:
+            return segment.result_counts()
+        return self.frame(log_type, log_date).result_counts()
+
+    def _load(
+        self, log_type: str, log_date: date, signature: list[int]
+    ) -> EventFrame | None:
+        path = self._index_path(log_type, log_date)
+        try:
+            with open(path / "meta.json") as f:
+                meta = json.load(f)
+            if meta["version"] != _INDEX_VERSION or meta["source"] != signature:
+                return None
+            return EventFrame(
+                log_type,
+                log_date,
+                np.load(path / "epoch.npy", mmap_mode="r"),
+                {
+                    name: np.load(path / f"{name}.npy", mmap_mode="r")
+                    for name in STRING_COLUMNS
+                },
+                meta["values"],
+                meta["result_by_message"],
+                meta["command_by_message"],
+            )
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as exc:
+            logger.warning("Ignoring unreadable log index %s: %s", path, exc)
+            return None
+
+    def _save(self, frame: EventFrame, signature: list[int]) -> None:
+        """Write the index to a temp directory, then swap it into place."""
+        path = self._index_path(frame.log_type, frame.log_date)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}")
+        try:
+            tmp.mkdir(parents=True, exist_ok=True)
+            np.save(tmp / "epoch.npy", frame.epoch)
+            for name in STRING_COLUMNS:
+                np.save(tmp / f"{name}.npy", frame.codes[name])
+            with open(tmp / "meta.json", "w") as f:
+                json.dump(
+                    {
+                        "version": _INDEX_VERSION,
+                        "source": signature,
+                        "values": frame.values,
+                        "result_by_message": frame.result_by_message,
+                        "command_by_message": frame.command_by_message,
+                    },
+                    f,
+                )
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp, path)
+        except OSError as exc:
+            # Another worker may have won the race, or the directory is read-only;
+            # the frame is still served from memory.
+            logger.warning("Could not write log index %s: %s", path, exc)
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _newest_first(
+    frame: EventFrame, source: int, rows: np.ndarray | None
+) -> Iterator[tuple[int, int, int]]:
+    """
+    Yield (-epoch, source, row) for the given rows (None = all rows) from newest
+    to oldest — ascending order for heapq.merge.
+    """
+    epoch = frame.epoch
+    if frame.ordered:
+        ordered_rows: Iterable[int] = (
+            range(len(frame) - 1, -1, -1) if rows is None else rows[::-1]
+        )
+    else:
+        rows = np.arange(len(frame)) if rows is None else rows
+        # Stable on the reversed rows, so equal timestamps keep later lines first.
+        reversed_rows = rows[::-1]
+        order = np.argsort(-np.asarray(epoch)[reversed_rows], kind="stable")
+        ordered_rows = reversed_rows[order].tolist()
+    for row in ordered_rows:
+        yield -int(epoch[row]), source, row
+
+
+def page_events(
+    frames: list[EventFrame], flt: EventFilter, skip: int, limit: int
+) -> tuple[int, list[TacacsLogEvent]]:
+    """
+    Return (total matching rows, one page of events newest-first) across frames.
+
+    Each frame is already in timestamp order, so the page is taken from a lazy
+    k-way heap merge of per-frame newest-first iterators that stops after
+    skip + limit rows. The total comes from the row masks (or frame lengths when
+    unfiltered); no other rows are visited. Ties keep frame order, and within a
+    frame the later line comes first.
+    """
+    count = 0
+    streams = []
+    for i, frame in enumerate(frames):
+        rows = np.flatnonzero(frame.matches(flt)) if flt else None
+        count += len(frame) if rows is None else len(rows)
+        streams.append(_newest_first(frame, i, rows))
+
+    merged = heapq.merge(*streams, key=itemgetter(0, 1))
+    page = [
+        frames[i].event(row) for _neg_ts, i, row in islice(merged, skip, skip + limit)
+    ]
+    return count, page
+
+
+event_index = LogEventIndex(event_store, settings.TACACS_LOG_INDEX_DIRECTORY)
@@ -0,0 +1,567 @@
+"""
+In-process store of parsed TACACS+ log events.
+
+Every log line is parsed once, when it is first tailed, into append-only
+dictionary-encoded columns (timestamp, username, nas_ip, client_ip, port,
+message). The outcome and command are derived once per distinct message and
+today's statistics Counters are maintained as lines arrive. The live dashboard,
+the alert evaluator, the log viewer and the internal collect-stats endpoint all
+read from the shared ``event_store`` instead of re-parsing the same files.
+"""
+
+import logging
+import math
+import threading
+import uuid
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from dataclasses import field as dataclass_field
+from datetime import date, datetime, timedelta, timezone
+from typing import Generic, NamedTuple, TypeVar
+
+from app.core.config import settings
+from app.models import TacacsLogEvent
+from scripts._log_stats_base import (
+    LineKey,
+    LogTail,
+    _parse_log_counters,
+    build_log_file_path,
+    classify_result,
+    extract_command,
+    iter_lines_between,
+    parse_log_line,
+    statistics_slot,
+    timestamp_epoch,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+V = TypeVar("V", str, str | None)
+
+# Segments kept in memory: today and yesterday (UTC). Older days are parsed on demand.
+_RETAINED_DAYS = 2
+
+# Fields that window counts can be grouped by; None counts events by result only.
+WINDOW_FIELDS = ("username", "nas_ip", "client_ip", "command")
+
+WindowCounts = Counter[tuple[str, str | None]]  # (result, field value) -> events
+# Statistics Counters keyed by (username, nas_ip, client_ip): slot 0, slot 1.
+StatsCounters = tuple[Counter[LineKey], Counter[LineKey]]
+
+
+@dataclass
+class RunningWindow:
+    """Event counts of one field from minute ``first_minute`` onwards."""
+
+    first_minute: int
+    counts: WindowCounts = dataclass_field(default_factory=Counter)
+
+
+class StringColumn(Generic[V]):
+    """Append-only string column: one uint32 code per row, each distinct value stored once."""
+
+    def __init__(self) -> None:
+        self.codes = array("I")
+        self.values: list[V] = []
+        self._index: dict[V, int] = {}
+
+    def append(self, value: V) -> int:
+        code = self._index.get(value)
+        if code is None:
+            code = len(self.values)
+            self._index[value] = code
+            self.values.append(value)
+        self.codes.append(code)
+        return code
+
+    def __getitem__(self, row: int) -> V:
+        return self.values[self.codes[row]]
+
+
+class LogEventColumns:
+    """
+    Parsed events of one log file. Rows are only ever appended; a rotated or
+    truncated file gets a fresh instance, so readers holding a reference keep a
+    consistent view. Capture ``len()`` once before iterating.
+    """
+
+    def __init__(self, log_type: str, log_date: date) -> None:
+        self.log_type = log_type
+        self.log_date = log_date
+        self._date_prefix = log_date.strftime("%Y-%m-%d")
+
+        self.timestamp: StringColumn[str] = StringColumn()
+        self.username: StringColumn[str] = StringColumn()
+        self.nas_ip: StringColumn[str] = StringColumn()
+        self.client_ip: StringColumn[str] = StringColumn()
+        self.port: StringColumn[str | None] = StringColumn()
+        self.message: StringColumn[str] = StringColumn()
+
+        # Derived once per distinct timestamp / message, indexed by its code.
+        self.epoch_by_timestamp: list[int] = []
+        self.result_by_message: list[str] = []
+        self.command_by_message: list[str | None] = []
+
+        # Statistics Counters keyed by (username, nas_ip, client_ip) for lines of
+        # log_date (slot 0 success/permit/start, slot 1 failed/deny/stop).
+        self.counters: StatsCounters = (Counter(), Counter())
+        self.result_counts: Counter[str] = Counter()
+        # Per-minute aggregates for windowed queries (alert rules), kept only for
+        # the fields that were queried: field -> minute (epoch // 60) -> event
+        # counts by (result, value). Minutes more than ``bucket_minutes`` before
+        # the newest line are dropped; older parts of a window count rows.
+        self.minutes: dict[str | None, dict[int, WindowCounts]] = {}
+        self.bucket_minutes = 0
+        self._bucket_floor = 0  # first minute still bucketed
+        # Running totals of the alert windows, (field, minutes) -> window: new
+        # lines are added as they arrive and minutes that leave the window are
+        # subtracted from the buckets, so a query does not re-sum the window.
+        self.windows: dict[tuple[str | None, int], RunningWindow] = {}
+        # False once a line is older than its predecessor; disables bisect lookups.
+        self.ordered = True
+        self._last_epoch = 0
+
+    def __len__(self) -> int:
+        return len(self.timestamp.codes)
+
+    def append_lines(self, lines: Iterable[str]) -> None:
+        for line in lines:
+            parsed = parse_log_line(self.log_type, line)
+            if parsed is None:
+                continue
+
+            ts_code = self.timestamp.append(parsed.timestamp)
+            if ts_code == len(self.epoch_by_timestamp):
+                self.epoch_by_timestamp.append(timestamp_epoch(parsed.timestamp))
+            epoch = self.epoch_by_timestamp[ts_code]
+            if epoch < self._last_epoch:
+                self.ordered = False
+            else:
+                self._last_epoch = epoch
+
+            self.username.append(parsed.username)
+            self.nas_ip.append(parsed.nas_ip)
+            self.client_ip.append(parsed.client_ip)
+            self.port.append(parsed.port)
+            msg_code = self.message.append(parsed.message)
+            if msg_code == len(self.result_by_message):
+                self.result_by_message.append(
+                    classify_result(self.log_type, parsed.message)
+                )
+                self.command_by_message.append(
+                    extract_command(self.log_type, parsed.message)
+                )
+
+            result = self.result_by_message[msg_code]
+            self.result_counts[result] += 1
+            minute = epoch // 60
+            if self.minutes and minute >= self._bucket_floor:
+                row = len(self) - 1
+                for field, buckets in self.minutes.items():
+                    bucket = buckets.get(minute)
+                    if bucket is None:
+                        bucket = buckets[minute] = Counter()
+                    bucket[(result, self.value(field, row))] += 1
+                for (field, _), window in self.windows.items():
+                    if minute >= window.first_minute:
+                        window.counts[(result, self.value(field, row))] += 1
+            if parsed.timestamp.startswith(self._date_prefix):
+                slot = statistics_slot(self.log_type, parsed, result)
+                if slot is not None:
+                    key = (parsed.username, parsed.nas_ip, parsed.client_ip)
+                    self.counters[slot][key] += 1
+
+        self._prune_buckets()
+
+    def _prune_buckets(self) -> None:
+        floor = self._bucket_start()
+        if not self.minutes or floor <= self._bucket_floor:
+            return
+        self._bucket_floor = floor
+        for buckets in self.minutes.values():
+            for minute in [m for m in buckets if m < floor]:
+                del buckets[minute]
+        self._drop_stale_windows()
+
+    def _bucket_start(self) -> int:
+        # One spare minute, so windows ending at "now" stay covered when lines
+        # are stamped slightly ahead of this host's clock.
+        return self._last_epoch // 60 - self.bucket_minutes - 1
+
+    def _drop_stale_windows(self) -> None:
+        # A window starting before the buckets can no longer subtract the minutes
+        # that leave it (or is no longer queried); it is rebuilt on next use.
+        for key, window in list(self.windows.items()):
+            if window.first_minute < self._bucket_floor:
+                del self.windows[key]
+
+    def track(self, field: str | None, window_minutes: int) -> None:
+        """
+        Keep per-minute buckets of ``field`` covering at least the last
+        ``window_minutes`` minutes; builds them from the rows on first use.
+        """
+        if window_minutes > self.bucket_minutes:
+            self.bucket_minutes = window_minutes
+            fields = list(self.minutes)
+            self.minutes = {}
+        elif field in self.minutes:
+            return
+        else:
+            fields = []
+        if field not in fields:
+            fields.append(field)
+        self._bucket_floor = self._bucket_start()
+        self._drop_stale_windows()
+        for name in fields:
+            buckets: dict[int, WindowCounts] = {}
+            for row in self.rows_between(self._bucket_floor * 60, math.inf):
+                bucket = buckets.get(self.epoch(row) // 60)
+                if bucket is None:
+                    bucket = buckets[self.epoch(row) // 60] = Counter()
+                bucket[(self.result(row), self.value(name, row))] += 1
+            self.minutes[name] = buckets
+
+    def running_counts(
+        self,
+        field: str | None,
+        window_minutes: int,
+        start_epoch: float,
+        end_epoch: float,
+    ) -> WindowCounts:
+        """
+        window_counts() of a tracked field from the running total of its
+        ``window_minutes`` window. The total advances by the minutes that left
+        the window since the last query; only the rows before ``start_epoch`` in
+        its first minute and after ``end_epoch`` are counted one by one.
+        """
+        first = math.floor(start_epoch / 60)
+        buckets = self.minutes.get(field)
+        if buckets is None or first < self._bucket_floor:
+            return self.window_counts(field, start_epoch, end_epoch)
+        window = self.windows.get((field, window_minutes))
+        if (
+            window is None
+            or first < window.first_minute
+            or first - window.first_minute > window_minutes
+        ):
+            window = RunningWindow(first)
+            for minute, bucket in buckets.items():
+                if minute >= first:
+                    window.counts.update(bucket)
+            self.windows[(field, window_minutes)] = window
+        else:
+            for minute in range(window.first_minute, first):
+                for key, n in buckets.get(minute, {}).items():
+                    left = window.counts[key] - n
+                    if left:
+                        window.counts[key] = left
+                    else:
+                        del window.counts[key]
+            window.first_minute = first
+
+        counts = Counter(window.counts)
+        before = (first * 60, math.ceil(start_epoch) - 1)
+        after = (math.floor(end_epoch) + 1, math.inf)
+        for lo, hi in (before, after):
+            for row in self.rows_between(lo, hi):
+                key = (self.result(row), self.value(field, row))
+                counts[key] -= 1
+                if not counts[key]:
+                    del counts[key]
+        return counts
+
+    def value(self, field: str | None, row: int) -> str | None:
+        """The ``field`` (a WINDOW_FIELDS name, or None) of a row."""
+        if field is None:
+            return None
+        if field == "command":
+            return self.command(row)
+        column: StringColumn[str] = getattr(self, field)
+        return column[row]
+
+    def epoch(self, row: int) -> int:
+        return self.epoch_by_timestamp[self.timestamp.codes[row]]
+
+    def result(self, row: int) -> str:
+        return self.result_by_message[self.message.codes[row]]
+
+    def command(self, row: int) -> str | None:
+        return self.command_by_message[self.message.codes[row]]
+
+    def rows_between(self, start_epoch: float, end_epoch: float) -> Iterable[int]:
+        """Row numbers whose timestamp falls within [start_epoch, end_epoch]."""
+        n = len(self)
+        if self.ordered:
+            codes = self.timestamp.codes
+            epochs = self.epoch_by_timestamp
+            lo = bisect_left(codes, start_epoch, 0, n, key=epochs.__getitem__)
+            hi = bisect_right(codes, end_epoch, lo, n, key=epochs.__getitem__)
+            return range(lo, hi)
+        return (row for row in range(n) if start_epoch <= self.epoch(row) <= end_epoch)
+
+    def window_counts(
+        self, field: str | None, start_epoch: float, end_epoch: float
+    ) -> WindowCounts:
+        """
+        Event counts by (result, ``field`` value) within [start_epoch,
+        end_epoch]: whole minutes from the field's per-minute buckets (if it is
+        tracked), the partial minutes at either edge and minutes older than the
+        buckets row by row.
+        """
+        counts: WindowCounts = Counter()
+        buckets = self.minutes.get(field)
+        first = math.ceil(start_epoch / 60)  # first minute wholly inside
+        stop = math.floor((end_epoch + 1) / 60)  # minute after the last one
+        if buckets is not None:
+            first = max(first, self._bucket_floor)
+        if buckets is None or first >= stop:
+            edges = [(start_epoch, end_epoch)]
+        else:
+            edges = [(start_epoch, first * 60 - 1), (stop * 60, end_epoch)]
+            for minute in range(first, stop):
+                bucket = buckets.get(minute)
+                if bucket is not None:
+                    counts.update(bucket)
+        for lo, hi in edges:
+            for row in self.rows_between(lo, hi):
+                counts[(self.result(row), self.value(field, row))] += 1
+        return counts
+
+    def event(self, row: int) -> TacacsLogEvent:
+        username = self.username[row]
+        nas_ip = self.nas_ip[row]
+        client_ip = self.client_ip[row]
+        port = self.port[row]
+        return TacacsLogEvent(
+            timestamp=self.timestamp[row],
+            log_type=self.log_type,
+            username=username,
+            nas_ip=nas_ip,
+            client_ip=client_ip,
+            result=self.result(row),
+            message=self.message[row],
+            command=self.command(row),
+            port=port,
+            session_id="|".join([username, nas_ip, client_ip, port or ""]),
+        )
+
+
+class CounterChanges(NamedTuple):
+    """
+    A day's statistics relative to a cursor: the current counts of the keys
+    seen since the cursor (every key when ``delta`` is False), the whole-day
+    sums of both slots, and the cursor to pass back next time (None for days
+    that are not retained in memory).
+    """
+
+    counters: StatsCounters
+    totals: tuple[int, int]
+    cursor: str | None
+    delta: bool
+
+
+def _totals(counters: StatsCounters) -> tuple[int, int]:
+    return counters[0].total(), counters[1].total()
+
+
+class LogEventSegment:
+    """A LogEventColumns kept up to date with its log file through a LogTail."""
+
+    def __init__(self, log_type: str, log_date: date, path: str) -> None:
+        self.log_type = log_type
+        self.log_date = log_date
+        self._tail = LogTail(path)
+        self._lock = threading.Lock()
+        self.columns = LogEventColumns(log_type, log_date)
+        # Bumped whenever the columns are rebuilt from byte 0.
+        self.generation = 0
+        # Distinguishes cursors of this segment from those of an earlier process
+        # or an evicted segment of the same file.
+        self._cursor_prefix = uuid.uuid4().hex[:16]
+
+    def _reset(self) -> None:
+        self.columns = LogEventColumns(self.log_type, self.log_date)
+        self.generation += 1
+
+    def _refresh_locked(self) -> LogEventColumns:
+        try:
+            self._tail.read_new_lines(self._append, self._reset)
+        except OSError as exc:
+            logger.warning("Failed to tail %s: %s", self._tail.path, exc)
+        return self.columns
+
+    def _append(self, lines: list[str]) -> None:
+        self.columns.append_lines(lines)
+
+    def refresh(self) -> LogEventColumns:
+        """Ingest lines appended since the last refresh and return the current columns."""
+        with self._lock:
+            return self._refresh_locked()
+
+    def read(self, reader: Callable[[LogEventColumns], T]) -> T:
+        """Refresh, then call ``reader`` on the columns while holding the segment lock."""
+        with self._lock:
+            return reader(self._refresh_locked())
+
+    def counters(self) -> StatsCounters:
+        """Refresh, then return copies of the statistics Counters."""
+        with self._lock:
+            counters = self._refresh_locked().counters
+            return Counter(counters[0]), Counter(counters[1])
+
+    def result_counts(self) -> Counter[str]:
+        """Refresh, then return a copy of the per-result event counts."""
+        with self._lock:
+            return Counter(self._refresh_locked().result_counts)
+
+    def totals(self) -> tuple[int, int]:
+        """Refresh, then return the sums of both statistics Counters."""
+        with self._lock:
+            return _totals(self._refresh_locked().counters)
+
+    def changes(self, since: str | None = None) -> CounterChanges:
+        """
+        Refresh, then return the Counters restricted to the keys of rows appended
+        after the ``since`` cursor. An unknown or outdated cursor (another
+        process, a rotated file) yields every key with ``delta=False``.
+        """
+        with self._lock:
+            columns = self._refresh_locked()
+            rows = len(columns)
+            cursor = f"{self._cursor_prefix}.{self.generation}:{rows}"
+            start = None
+            if since:
+                prefix, _, position = since.rpartition(":")
+                if prefix == cursor.rpartition(":")[0] and position.isdigit():
+                    start = int(position) if int(position) <= rows else None
+            if start is None:
+                counters = columns.counters
+                changed = (Counter(counters[0]), Counter(counters[1]))
+            else:
+                keys = {
+                    (columns.username[r], columns.nas_ip[r], columns.client_ip[r])
+                    for r in range(start, rows)
+                }
+                first, second = columns.counters
+                changed = (
+                    Counter({k: first[k] for k in keys if k in first}),
+                    Counter({k: second[k] for k in keys if k in second}),
+                )
+            return CounterChanges(
+                changed, _totals(columns.counters), cursor, start is not None
+            )
+
+
+class LogEventStore:
+    """Registry of segments for the recent days of each log type."""
+
+    def __init__(self, log_directory: str, retained_days: int = _RETAINED_DAYS):
+        self.log_directory = log_directory
+        self.retained_days = retained_days
+        self._segments: dict[tuple[str, date], LogEventSegment] = {}
+        self._lock = threading.Lock()
+
+    def _is_retained(self, log_date: date) -> bool:
+        today = datetime.now(timezone.utc).date()
+        return today - timedelta(days=self.retained_days - 1) <= log_date <= today
+
+    def segment(self, log_type: str, log_date: date) -> LogEventSegment | None:
+        """Return the live segment for a retained day, or None for older days."""
+        if not self._is_retained(log_date):
+            return None
+        with self._lock:
+            for key in [k for k in self._segments if not self._is_retained(k[1])]:
+                del self._segments[key]
+            seg = self._segments.get((log_type, log_date))
+            if seg is None:
+                path = build_log_file_path(log_date, log_type, self.log_directory)
+                seg = LogEventSegment(log_type, log_date, path)
+                self._segments[(log_type, log_date)] = seg
+            return seg
+
+    def columns(self, log_type: str, log_date: date) -> LogEventColumns:
+        """Parsed events of one day's log file; older days are parsed on demand."""
+        seg = self.segment(log_type, log_date)
+        if seg is not None:
+            return seg.refresh()
+        columns = LogEventColumns(log_type, log_date)
+        path = build_log_file_path(log_date, log_type, self.log_directory)
+        try:
+            with open(path, errors="ignore") as f:
+                columns.append_lines(f)
+        except FileNotFoundError:
+            pass
+        except OSError as exc:
+            logger.warning("Failed to read %s: %s", path, exc)
+        return columns
+
+    def counters(self, log_type: str, log_date: date) -> StatsCounters:
+        """Statistics Counters for one day — same result as _parse_log_counters()."""
+        seg = self.segment(log_type, log_date)
+        if seg is None:
+            return _parse_log_counters(log_date, log_type, self.log_directory)
+        return seg.counters()
+
+    def totals(self, log_type: str, log_date: date) -> tuple[int, int]:
+        """Sums of both statistics Counters for one day."""
+        seg = self.segment(log_type, log_date)
+        if seg is None:
+            return _totals(self.counters(log_type, log_date))
+        return seg.totals()
+
+    def changes(
+        self, log_type: str, log_date: date, since: str | None = None
+    ) -> CounterChanges:
+        """Counters of one day relative to a cursor; unretained days are always whole."""
+        seg = self.segment(log_type, log_date)
+        if seg is None:
+            counters = self.counters(log_type, log_date)
+            return CounterChanges(counters, _totals(counters), None, False)
+        return seg.changes(since)
+
+    def window_counts(
+        self,
+        log_type: str,
+        log_date: date,
+        field: str | None,
+        start_epoch: float,
+        end_epoch: float,
+    ) -> WindowCounts:
+        """
+        LogEventColumns.window_counts() of one day's log file. Retained days
+        keep per-minute buckets of ``field`` for windows up to the longest one
+        queried; for other days only the lines inside the window are read and
+        parsed.
+        """
+        seg = self.segment(log_type, log_date)
+        if seg is None:
+            columns = LogEventColumns(log_type, log_date)
+            path = build_log_file_path(log_date, log_type, self.log_directory)
+            try:
+                columns.append_lines(iter_lines_between(path, start_epoch, end_epoch))
+            except FileNotFoundError:
+                pass
+            except OSError as exc:
+                logger.warning("Failed to read %s: %s", path, exc)
+            return columns.window_counts(field, start_epoch, end_epoch)
+        window_minutes = math.ceil((end_epoch - start_epoch) / 60)
+
+        def read(columns: LogEventColumns) -> WindowCounts:
+            columns.track(field, window_minutes)
+            return columns.running_counts(field, window_minutes, start_epoch, end_epoch)
+
+        return seg.read(read)
+
+    def result_counts(self, log_type: str, log_date: date) -> Counter[str]:
+        """Number of parsed events per result for one day's log file."""
+        seg = self.segment(log_type, log_date)
+        if seg is None:
+            return Counter(self.columns(log_type, log_date).result_counts)
+        return seg.result_counts()
+
+
+event_store = LogEventStore(settings.TACACS_LOG_DIRECTORY)
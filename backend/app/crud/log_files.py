@@ -0,0 +1,187 @@
+"""
+Random access to raw TACACS+ log files for the log file viewer.
+
+Files are memory-mapped instead of read with readlines(): a sparse line-offset
+index (the byte offset of every _LINE_INDEX_STRIDE-th line, built on first
+access and extended as the file grows) turns a line-number page into a single
+slice, and searches run a bytes regex over the mapping so only matching lines
+are decoded.
+"""
+
+import mmap
+import os
+import re
+import threading
+import zlib
+from array import array
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+import numpy as np
+
+_LINE_INDEX_STRIDE = 1024
+_SCAN_CHUNK = 8 * 1024 * 1024
+_STREAM_CHUNK = 256 * 1024
+_MAX_INDEXES = 32
+
+
+class LineOffsetIndex:
+    """Byte offset of every _LINE_INDEX_STRIDE-th line start of one (growing) file."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        self._restart(None)
+
+    def _restart(self, inode: int | None) -> None:
+        self.inode = inode
+        self.size = 0  # bytes indexed so far
+        self.newlines = 0  # newlines within those bytes
+        self.marks = array("Q", [0])  # marks[k] = byte offset of line k * stride
+        self.ends_with_newline = True
+
+    def refresh(self, mm: mmap.mmap | None, st: os.stat_result) -> None:
+        """Index the bytes appended since the last call; restart on rotation/truncation."""
+        if st.st_ino != self.inode or st.st_size < self.size:
+            self._restart(st.st_ino)
+        if mm is None:
+            return
+        end = len(mm)
+        while self.size < end:
+            chunk_end = min(self.size + _SCAN_CHUNK, end)
+            positions = np.flatnonzero(
+                np.frombuffer(mm[self.size : chunk_end], dtype=np.uint8) == 0x0A
+            )
+            # Newline j of this chunk ends line (newlines + j); the next line starts after it.
+            first = -(self.newlines + 1) % _LINE_INDEX_STRIDE
+            self.marks.extend(
+                (positions[first::_LINE_INDEX_STRIDE] + self.size + 1).tolist()
+            )
+            self.newlines += len(positions)
+            self.size = chunk_end
+        self.ends_with_newline = end == 0 or mm[end - 1] == 0x0A
+
+    @property
+    def line_count(self) -> int:
+        """Number of lines, counting an unterminated last line."""
+        return self.newlines + (0 if self.ends_with_newline else 1)
+
+    def line_start(self, mm: mmap.mmap, line: int) -> int:
+        """Byte offset where ``line`` (0-based) starts, or len(mm) past the end."""
+        block = min(line // _LINE_INDEX_STRIDE, len(self.marks) - 1)
+        pos = self.marks[block]
+        for _ in range(line - block * _LINE_INDEX_STRIDE):
+            nl = mm.find(b"\n", pos)
+            if nl == -1:
+                return len(mm)
+            pos = nl + 1
+        return pos
+
+
+_indexes: dict[str, LineOffsetIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def _line_index(path: str) -> LineOffsetIndex:
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            if len(_indexes) >= _MAX_INDEXES:
+                _indexes.pop(next(iter(_indexes)))
+            index = _indexes[path] = LineOffsetIndex(path)
+        return index
+
+
+@contextmanager
+def _mapped(path: str) -> Iterator[tuple[mmap.mmap | None, os.stat_result]]:
+    """Read-only mapping of the file as it is now (None for an empty file)."""
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        if st.st_size == 0:
+            yield None, st
+            return
+        with mmap.mmap(f.fileno(), st.st_size, access=mmap.ACCESS_READ) as mm:
+            yield mm, st
+
+
+def _search_regex(search: str) -> re.Pattern[bytes]:
+    # Case-insensitive for ASCII, which is what tac_plus-ng writes.
+    return re.compile(re.escape(search.encode()), re.IGNORECASE)
+
+
+def _matching_lines(
+    mm: mmap.mmap, pattern: re.Pattern[bytes]
+) -> Iterator[tuple[int, int]]:
+    """Yield (start, end) byte ranges of lines containing the pattern, without newlines."""
+    size = len(mm)
+    pos = 0
+    while match := pattern.search(mm, pos):
+        start = mm.rfind(b"\n", 0, match.start()) + 1
+        end = mm.find(b"\n", match.end())
+        if end == -1:
+            end = size
+        yield start, end
+        pos = end + 1
+
+
+def read_line_range(path: str, offset: int, limit: int | None) -> tuple[str, int]:
+    """Return (lines offset..offset+limit as text, total line count)."""
+    index = _line_index(path)
+    with _mapped(path) as (mm, st), index.lock:
+        index.refresh(mm, st)
+        if mm is None:
+            return "", 0
+        start = index.line_start(mm, offset)
+        end = len(mm) if limit is None else index.line_start(mm, offset + limit)
+        return mm[start:end].decode("utf-8", errors="ignore"), index.line_count
+
+
+def search_line_range(
+    path: str, search: str, offset: int, limit: int | None
+) -> tuple[str, int]:
+    """Return (matching lines offset..offset+limit as text, total matching lines)."""
+    with _mapped(path) as (mm, _st):
+        if mm is None:
+            return "", 0
+        stop = None if limit is None else offset + limit
+        lines: list[str] = []
+        total = 0
+        for start, end in _matching_lines(mm, _search_regex(search)):
+            if offset <= total and (stop is None or total < stop):
+                lines.append(mm[start:end].decode("utf-8", errors="ignore") + "\n")
+            total += 1
+        return "".join(lines), total
+
+
+def stream_log_file(
+    path: str, search: str | None = None, compress: bool = False
+) -> Iterator[bytes]:
+    """
+    Yield the file (or only its lines matching ``search``) in chunks, optionally
+    as one gzip stream so large files never sit in memory whole.
+    """
+    gzip = zlib.compressobj(wbits=16 + zlib.MAX_WBITS) if compress else None
+
+    def _emit(data: bytes) -> bytes:
+        return gzip.compress(data) if gzip else data
+
+    with _mapped(path) as (mm, _st):
+        if mm is not None:
+            if search:
+                pattern = _search_regex(search)
+                buf = bytearray()
+                for start, end in _matching_lines(mm, pattern):
+                    buf += mm[start:end]
+                    buf += b"\n"
+                    if len(buf) >= _STREAM_CHUNK:
+                        if out := _emit(bytes(buf)):
+                            yield out
+                        buf.clear()
+                if buf and (out := _emit(bytes(buf))):
+                    yield out
+            else:
+                for pos in range(0, len(mm), _STREAM_CHUNK):
+                    if out := _emit(mm[pos : pos + _STREAM_CHUNK]):
+                        yield out
+    if gzip:
+        yield gzip.flush()
@@ -0,0 +1,142 @@
+"""Per-node daily totals of TACACS+ log events for /tacacs_logs/events/summary."""
+
+import os
+from collections.abc import Iterable
+from datetime import date, datetime, timedelta
+from datetime import time as time_
+
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.crud.log_event_index import event_index
+from app.models import TacacsLogDailyTotals, TacacsLogTypeSummary
+from scripts._log_stats_base import LOG_TYPES, _get_local_tz, build_log_file_path
+
+NodeSummary = dict[str, TacacsLogTypeSummary]  # log_type -> totals
+SourceSignature = tuple[int, int] | None  # (size, mtime_ns); None: no file
+
+# Log files are named by the configured local day; tac_plus-ng may still flush
+# lines of a day shortly after local midnight.
+CLOSE_GRACE = timedelta(minutes=15)
+
+_RESULT_FIELDS = ("success", "failed", "permit", "deny", "start", "stop")
+
+
+def empty_summary() -> NodeSummary:
+    return {lt: TacacsLogTypeSummary() for lt in LOG_TYPES}
+
+
+def add_summary(into: NodeSummary, other: NodeSummary) -> None:
+    for lt, totals in other.items():
+        target = into[lt]
+        for field in (*_RESULT_FIELDS, "total"):
+            setattr(target, field, getattr(target, field) + getattr(totals, field))
+
+
+def is_closed(log_date: date, now: datetime | None = None) -> bool:
+    """True once the local day ``log_date`` ended at least CLOSE_GRACE ago."""
+    tz = _get_local_tz()
+    day_end = datetime.combine(log_date + timedelta(days=1), time_.min, tzinfo=tz)
+    return (now or datetime.now(tz)) >= day_end + CLOSE_GRACE
+
+
+def source_signatures(log_date: date) -> dict[str, SourceSignature]:
+    """Size and mtime of this node's log file of each log type for ``log_date``."""
+    signatures: dict[str, SourceSignature] = {}
+    for lt in LOG_TYPES:
+        path = build_log_file_path(log_date, lt, settings.TACACS_LOG_DIRECTORY)
+        try:
+            st = os.stat(path)
+        except OSError:
+            signatures[lt] = None
+        else:
+            signatures[lt] = (st.st_size, st.st_mtime_ns)
+    return signatures
+
+
+def local_summary(log_date: date) -> NodeSummary:
+    """Totals of this node's log files, from the event store / columnar index."""
+    summary = empty_summary()
+    for lt in LOG_TYPES:
+        counts = event_index.result_counts(lt, log_date)
+        totals = summary[lt]
+        totals.total = counts.total()
+        for field in _RESULT_FIELDS:
+            setattr(totals, field, counts[field])
+    return summary
+
+
+def summary_from_stats(
+    authentication: Iterable[tuple[int, int]],
+    authorization: Iterable[tuple[int, int]],
+    accounting: Iterable[tuple[int, int]],
+) -> NodeSummary:
+    """Totals from statistics rows given as (success, fail), (permit, deny), (start, stop)."""
+    summary = empty_summary()
+    for lt, rows, (first, second) in (
+        ("authentication", authentication, ("success", "failed")),
+        ("authorization", authorization, ("permit", "deny")),
+        ("accounting", accounting, ("start", "stop")),
+    ):
+        totals = summary[lt]
+        for a, b in rows:
+            setattr(totals, first, getattr(totals, first) + a)
+            setattr(totals, second, getattr(totals, second) + b)
+            totals.total += a + b
+    return summary
+
+
+def get_daily_totals(
+    session: Session,
+    log_date: date,
+    local_node: str | None = None,
+    local_sources: dict[str, SourceSignature] | None = None,
+) -> dict[str, NodeSummary]:
+    """
+    Stored totals of a closed day, keyed by node name (primary-key lookup).
+    ``local_node`` is left out unless its rows were counted from log files
+    matching ``local_sources`` (see source_signatures()), so late writes are
+    recounted.
+    """
+    rows = session.exec(
+        select(TacacsLogDailyTotals).where(TacacsLogDailyTotals.log_date == log_date)
+    ).all()
+    by_node: dict[str, NodeSummary] = {}
+    outdated: set[str] = set()
+    for row in rows:
+        if row.node_name == local_node:
+            signature = None
+            if row.source_size is not None and row.source_mtime_ns is not None:
+                signature = (row.source_size, row.source_mtime_ns)
+            if (local_sources or {}).get(row.log_type) != signature:
+                outdated.add(row.node_name)
+        summary = by_node.setdefault(row.node_name, empty_summary())
+        if row.log_type in summary:
+            summary[row.log_type] = TacacsLogTypeSummary.model_validate(row)
+    for node_name in outdated:
+        del by_node[node_name]
+    return by_node
+
+
+def save_daily_totals(
+    session: Session,
+    log_date: date,
+    node_name: str,
+    summary: NodeSummary,
+    sources: dict[str, SourceSignature] | None = None,
+) -> None:
+    """
+    Store (or overwrite) one node's totals for a closed day, with the
+    signatures of the log files they were counted from for this node's own.
+    """
+    for lt, totals in summary.items():
+        row = session.get(TacacsLogDailyTotals, (log_date, node_name, lt))
+        if row is None:
+            row = TacacsLogDailyTotals(
+                log_date=log_date, node_name=node_name, log_type=lt
+            )
+        row.sqlmodel_update(totals.model_dump())
+        signature = (sources or {}).get(lt)
+        row.source_size, row.source_mtime_ns = signature or (None, None)
+        session.add(row)
+    session.commit()
@@ -0,0 +1,99 @@
+"""
+Change notification for today's TACACS+ log files.
+
+LogWatcher.wait() returns once today's authentication or authorization log has
+been appended to (or rotated) since the previous call. It watches the log
+directory with watchfiles, which uses inotify on Linux, so waiting costs
+nothing between events and a burst of appends arrives as one debounced batch.
+If watchfiles is missing or watching fails (directory absent, inotify watch
+limit reached), it falls back to polling the files' inode and size.
+
+Reading the new lines is left to the event store, which parses only the bytes
+appended since its last refresh.
+"""
+
+import asyncio
+import logging
+import os
+from collections.abc import AsyncIterator
+from datetime import datetime, timezone
+from typing import Any
+
+from scripts._log_stats_base import build_log_file_path
+
+try:
+    import watchfiles
+except ImportError:  # pragma: no cover - installed with fastapi[standard]
+    watchfiles = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+_WATCHED_LOG_TYPES = ("authentication", "authorization")
+_DEBOUNCE_MS = 300
+_POLL_SECONDS = 2.0
+
+
+class LogWatcher:
+    def __init__(
+        self,
+        log_directory: str,
+        log_types: tuple[str, ...] = _WATCHED_LOG_TYPES,
+        poll_seconds: float = _POLL_SECONDS,
+    ) -> None:
+        self.log_directory = log_directory
+        self.log_types = log_types
+        self.poll_seconds = poll_seconds
+        self.polling = watchfiles is None
+        self._changes: AsyncIterator[Any] | None = None
+        self._last: dict[str, tuple[int, int]] = {}  # path -> (inode, size)
+
+    def _paths(self) -> set[str]:
+        today = datetime.now(timezone.utc).date()
+        return {
+            os.path.abspath(build_log_file_path(today, log_type, self.log_directory))
+            for log_type in self.log_types
+        }
+
+    def _is_watched(self, _change: Any, path: str) -> bool:
+        return os.path.abspath(path) in self._paths()
+
+    def _snapshot(self) -> dict[str, tuple[int, int]]:
+        snapshot = {}
+        for path in self._paths():
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            snapshot[path] = (st.st_ino, st.st_size)
+        return snapshot
+
+    async def wait(self) -> None:
+        """Return once a watched log file has changed since the previous call."""
+        if not self.polling:
+            try:
+                if self._changes is None:
+                    self._changes = watchfiles.awatch(
+                        self.log_directory,
+                        watch_filter=self._is_watched,
+                        debounce=_DEBOUNCE_MS,
+                    )
+                await anext(self._changes)
+                return
+            except Exception as exc:
+                logger.warning(
+                    "Watching %s failed (%s); polling every %.0fs instead",
+                    self.log_directory,
+                    exc,
+                    self.poll_seconds,
+                )
+                self.polling = True
+                self._changes = None
+        await self._poll()
+
+    async def _poll(self) -> None:
+        while True:
+            snapshot = self._snapshot()
+            if snapshot != self._last:
+                self._last = snapshot
+                return
+            await asyncio.sleep(self.poll_seconds)
@@ -0,0 +1,236 @@
+"""
+Concurrent collect-stats fan-out to peer nodes for the live dashboards.
+
+All peers are queried at once from a private event-loop thread over one pooled,
+keep-alive httpx.AsyncClient, under a single overall deadline. Callers asking
+for the same date while a fan-out is running, or within _SNAPSHOT_TTL after it,
+share its result, so one dashboard load costs about one round trip no matter
+how many peers there are or how many widgets ask. A peer that fails or misses
+the deadline is returned with its last good payload (if any) marked stale.
+
+Row-level requests pass the cursor of the previous response, so a peer only
+sends the (username, nas_ip, client_ip) rows that changed since; they are merged
+into the rows kept here for that peer and date.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Literal
+
+import httpx
+
+from app.core.config import settings
+from app.crud.stats_transport import STATS_ACCEPT, decode_stats_response
+
+logger = logging.getLogger(__name__)
+
+_DEADLINE = 3.0  # seconds for the whole fan-out
+_SNAPSHOT_TTL = 5.0
+_MAX_REMEMBERED = 64  # (url, date) payloads / merged rows kept per peer
+
+Level = Literal["rows", "totals"]
+
+
+@dataclass
+class PeerStats:
+    """One peer's collect-stats payload for a date."""
+
+    url: str
+    data: dict[str, Any] | None = None
+    fetched_at: float | None = None  # time.time() when ``data`` was received
+    error: str | None = None  # set when this round's fetch failed
+
+    @property
+    def node_name(self) -> str | None:
+        return self.data.get("node_name") if self.data else None
+
+    def rows(self, log_type: str) -> list[dict[str, Any]]:
+        """The payload's statistics rows of one log type (empty for level=totals)."""
+        return self.data.get(log_type, []) if self.data else []
+
+    def totals(self, log_type: str) -> tuple[int, int]:
+        """Whole-day sums of one log type: (success, fail), (permit, deny) or (start, stop)."""
+        if not self.data:
+            return 0, 0
+        totals = self.data.get("totals", {}).get(log_type)
+        if totals is not None:
+            first, second = totals.values()
+            return first, second
+        from app.crud.aaa_statistics import STATISTICS_TABLES
+
+        # Peers predating "totals": sum the rows.
+        _model, first_col, second_col = STATISTICS_TABLES[log_type]
+        rows = self.rows(log_type)
+        return (
+            sum(r.get(first_col, 0) for r in rows),
+            sum(r.get(second_col, 0) for r in rows),
+        )
+
+    @property
+    def stale(self) -> bool:
+        """True when ``data`` is a previous round's payload, or missing."""
+        return self.error is not None
+
+    @property
+    def age(self) -> float | None:
+        """Seconds since ``data`` was received, None without data."""
+        return None if self.fetched_at is None else time.time() - self.fetched_at
+
+
+@dataclass
+class _PeerRows:
+    """A peer's rows for one date, kept current by merging delta responses."""
+
+    cursor: str | None = None
+    by_key: dict[str, dict[tuple[str, str, str], dict[str, Any]]] = field(
+        default_factory=dict
+    )
+
+    def merge(self, data: dict[str, Any]) -> None:
+        """Apply a rows-level response and replace its row lists with the merged rows."""
+        delta = data.get("delta", {})
+        for log_type, rows in data.items():
+            if not isinstance(rows, list):
+                continue
+            if not delta.get(log_type) or log_type not in self.by_key:
+                self.by_key[log_type] = {}
+            merged = self.by_key[log_type]
+            for row in rows:
+                merged[(row["username"], row["nas_ip"], row["user_source_ip"])] = row
+            data[log_type] = list(merged.values())
+        self.cursor = data.get("cursor")
+
+
+class PeerStatsCollector:
+    def __init__(
+        self,
+        deadline: float = _DEADLINE,
+        snapshot_ttl: float = _SNAPSHOT_TTL,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self.deadline = deadline
+        self.snapshot_ttl = snapshot_ttl
+        self.transport = transport
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        # Only touched from the loop thread:
+        self._client: httpx.AsyncClient | None = None
+        self._inflight: dict[tuple[str, Level], asyncio.Task[list[PeerStats]]] = {}
+        self._snapshots: dict[tuple[str, Level], tuple[float, list[PeerStats]]] = {}
+        self._last_good: dict[tuple[str, str, Level], PeerStats] = {}
+        self._peer_rows: dict[tuple[str, str], _PeerRows] = {}
+
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever, name="peer-stats", daemon=True
+                ).start()
+            return self._loop
+
+    def collect(self, date_str: str, level: Level = "rows") -> list[PeerStats]:
+        """All peers' collect-stats results for ``date_str`` (blocks up to the deadline)."""
+        if not settings.peer_urls or not settings.INTERNAL_SYNC_TOKEN:
+            return []
+        future = asyncio.run_coroutine_threadsafe(
+            self._collect((date_str, level)), self._event_loop()
+        )
+        return future.result()
+
+    def collect_by_node(
+        self, date_str: str, level: Level = "rows"
+    ) -> dict[str, PeerStats]:
+        """Results that carry a payload (live or stale), keyed by peer node name."""
+        return {
+            peer.node_name: peer
+            for peer in self.collect(date_str, level)
+            if peer.node_name is not None
+        }
+
+    async def _collect(self, query: tuple[str, Level]) -> list[PeerStats]:
+        snapshot = self._snapshots.get(query)
+        if snapshot and time.monotonic() - snapshot[0] < self.snapshot_ttl:
+            return snapshot[1]
+        task = self._inflight.get(query)
+        if task is None:
+            task = self._inflight[query] = asyncio.create_task(self._fan_out(query))
+            task.add_done_callback(lambda _t: self._inflight.pop(query, None))
+        return await task
+
+    async def _fan_out(self, query: tuple[str, Level]) -> list[PeerStats]:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.deadline, transport=self.transport
+            )
+        tasks = {
+            url: asyncio.create_task(self._fetch(url, *query))
+            for url in settings.peer_urls
+        }
+        done, _pending = await asyncio.wait(tasks.values(), timeout=self.deadline)
+
+        results = []
+        for url, task in tasks.items():
+            if task in done:
+                peer = task.result()
+            else:
+                task.cancel()
+                peer = PeerStats(url, error="deadline exceeded")
+            if peer.error is None:
+                self._remember(self._last_good, (url, *query), peer)
+            else:
+                logger.warning(
+                    "Failed to fetch live stats from peer %s: %s", url, peer.error
+                )
+                previous = self._last_good.get((url, *query))
+                if previous is not None:
+                    peer.data, peer.fetched_at = previous.data, previous.fetched_at
+            results.append(peer)
+
+        now = time.monotonic()
+        self._snapshots = {
+            q: s for q, s in self._snapshots.items() if now - s[0] < self.snapshot_ttl
+        }
+        self._snapshots[query] = (now, results)
+        return results
+
+    async def _fetch(self, url: str, date_str: str, level: Level) -> PeerStats:
+        assert self._client is not None
+        endpoint = f"{url.rstrip('/')}/api/v1/sync/internal/collect-stats"
+        params = {"date": date_str, "level": level}
+        peer_rows = self._peer_rows.get((url, date_str)) if level == "rows" else None
+        if peer_rows is not None and peer_rows.cursor:
+            params["since"] = peer_rows.cursor
+        try:
+            resp = await self._client.post(
+                endpoint,
+                params=params,
+                headers={
+                    "X-Internal-Token": settings.INTERNAL_SYNC_TOKEN,
+                    "Accept": STATS_ACCEPT,
+                },
+            )
+            if resp.status_code != 200:
+                return PeerStats(url, error=f"HTTP {resp.status_code}")
+            data = decode_stats_response(resp)
+        except (httpx.HTTPError, ValueError) as e:
+            return PeerStats(url, error=str(e) or type(e).__name__)
+        if level == "rows":
+            if peer_rows is None:
+                peer_rows = _PeerRows()
+                self._remember(self._peer_rows, (url, date_str), peer_rows)
+            peer_rows.merge(data)
+        return PeerStats(url, data=data, fetched_at=time.time())
+
+    @staticmethod
+    def _remember(cache: dict[Any, Any], key: Any, value: Any) -> None:
+        cache.pop(key, None)
+        cache[key] = value
+        while len(cache) > _MAX_REMEMBERED:
+            cache.pop(next(iter(cache)))
+
+
+peer_stats = PeerStatsCollector()
@@ -0,0 +1,163 @@
+"""
+Monthly range partitions of the raw AAA statistics tables.
+
+AuthenticationStatistics, AuthorizationStatistics and AccountingStatistics are
+partitioned by RANGE (log_date), one partition per calendar month named
+``<table>_pYYYYMM``. Partitions are created:
+
+- ahead of time by maintain_partitions(), which the scheduler runs daily for
+  the current month and the next STATS_PARTITIONS_AHEAD months;
+- on demand by upsert_statistics() through ensure_partitions(), for writes
+  into months that have none yet (backfill of old logs).
+
+Retention drops whole partitions older than STATS_RETENTION_MONTHS instead of
+deleting rows. The rollup tables are not partitioned and keep their history.
+"""
+
+import re
+from collections.abc import Iterable
+from datetime import date, datetime, timezone
+
+import sqlalchemy as sa
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.models import (
+    AccountingStatistics,
+    AuthenticationStatistics,
+    AuthorizationStatistics,
+)
+
+PARTITIONED_TABLES: tuple[str, ...] = tuple(
+    str(model.__tablename__)
+    for model in (
+        AuthenticationStatistics,
+        AuthorizationStatistics,
+        AccountingStatistics,
+    )
+)
+
+# Serialises partition DDL between workers and nodes sharing the database.
+_LOCK_KEY = "aaa_statistics_partitions"
+
+_SUFFIX = re.compile(r"_p(\d{4})(\d{2})$")
+
+# Partitions known to exist (committed), so writes into covered months issue
+# no extra statement. Filled from the catalog on the first miss.
+_known: set[str] = set()
+
+
+def month_start(day: date) -> date:
+    return date(day.year, day.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def partition_month(table: str, name: str) -> date | None:
+    """The month of partition ``name`` of ``table``, or None if not one of ours."""
+    match = _SUFFIX.search(name)
+    if not match or name[: match.start()] != table:
+        return None
+    return date(int(match[1]), int(match[2]), 1)
+
+
+def _existing_partitions(session: Session) -> dict[str, list[str]]:
+    """Partition names of each partitioned statistics table, from the catalog."""
+    rows = session.execute(
+        sa.text(
+            "SELECT parent.relname, child.relname FROM pg_inherits"
+            " JOIN pg_class parent ON parent.oid = pg_inherits.inhparent"
+            " JOIN pg_class child ON child.oid = pg_inherits.inhrelid"
+            " WHERE parent.relname = ANY(:tables)"
+        ),
+        {"tables": list(PARTITIONED_TABLES)},
+    ).all()
+    existing: dict[str, list[str]] = {table: [] for table in PARTITIONED_TABLES}
+    for parent, child in rows:
+        existing[parent].append(child)
+    return existing
+
+
+def ensure_partitions(session: Session, months: Iterable[date]) -> list[str]:
+    """
+    Create the missing partitions covering ``months`` in every statistics table,
+    inside the session's transaction (the caller commits). Returns the names of
+    the partitions created.
+    """
+    wanted = {
+        partition_name(table, month_start(day)): (table, month_start(day))
+        for day in months
+        for table in PARTITIONED_TABLES
+    }
+    missing = wanted.keys() - _known
+    if not missing:
+        return []
+    session.execute(
+        sa.text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": _LOCK_KEY}
+    )
+    _known.update(
+        name for names in _existing_partitions(session).values() for name in names
+    )
+    created = []
+    for name in sorted(missing - _known):
+        table, month = wanted[name]
+        session.execute(
+            sa.text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table}"
+                f" FOR VALUES FROM ('{month.isoformat()}')"
+                f" TO ('{add_months(month, 1).isoformat()}')"
+            )
+        )
+        created.append(name)
+    return created
+
+
+def drop_expired_partitions(
+    session: Session, retention_months: int, today: date | None = None
+) -> list[str]:
+    """
+    Drop the partitions of months that ended more than ``retention_months``
+    months before the current one (0 keeps everything). Returns their names;
+    the caller commits.
+    """
+    if retention_months <= 0:
+        return []
+    today = today or datetime.now(timezone.utc).date()
+    cutoff = add_months(month_start(today), -retention_months)
+    session.execute(
+        sa.text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": _LOCK_KEY}
+    )
+    dropped = []
+    for table, names in _existing_partitions(session).items():
+        for name in sorted(names):
+            month = partition_month(table, name)
+            if month is not None and month < cutoff:
+                session.execute(sa.text(f"DROP TABLE {name}"))
+                _known.discard(name)
+                dropped.append(name)
+    return dropped
+
+
+def maintain_partitions(
+    session: Session, today: date | None = None
+) -> tuple[list[str], list[str]]:
+    """
+    Create this month's and the next STATS_PARTITIONS_AHEAD months' partitions
+    and drop those past STATS_RETENTION_MONTHS. Commits and returns the
+    (created, dropped) partition names.
+    """
+    current = month_start(today or datetime.now(timezone.utc).date())
+    created = ensure_partitions(
+        session,
+        (add_months(current, n) for n in range(settings.STATS_PARTITIONS_AHEAD + 1)),
+    )
+    dropped = drop_expired_partitions(session, settings.STATS_RETENTION_MONTHS, current)
+    session.commit()
+    return created, dropped
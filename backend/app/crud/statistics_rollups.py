@@ -0,0 +1,433 @@
+"""
+Rollups of the AAA statistics tables for long-range dashboard queries.
+
+The raw tables hold one row per (username, nas_ip, user_source_ip, day, node).
+Two derived tables are kept next to them:
+
+- AaaStatisticsNodeDaily: per-(day, node) sums of all three tables, for the
+  trend charts;
+- AaaStatisticsKeyRollup: per-day and per-month sums grouped by one key column
+  (username, nas_ip or user_source_ip), for the top-N lists.
+- AaaStatisticsNode: the registry of node names with statistics, so node
+  lists do not scan the raw tables.
+
+upsert_statistics() calls register_nodes() and refresh_rollups() for the
+(day, node) pairs it wrote, which recomputes just those days and applies each
+day's old/new difference to its month rows in place. Refreshes of the same
+(log_type, day, node) from concurrent writers (the scheduler, the /run
+endpoint, the scripts, peer ingest) are serialised by a transaction-level
+advisory lock, so each applies its difference on top of the previous one's
+committed rows. Range queries read whole months from the monthly rows and only
+the partial months at the edges from the daily rows.
+"""
+
+from collections.abc import Collection, Iterable, Mapping
+from datetime import date, timedelta
+from typing import Any, NamedTuple
+
+import sqlalchemy as sa
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel import Session, col, delete, select
+
+from app.models import (
+    AaaStatisticsKeyRollup,
+    AaaStatisticsNode,
+    AaaStatisticsNodeDaily,
+)
+from scripts._log_stats_base import to_log_datetime
+
+DIMENSIONS = ("username", "nas_ip", "user_source_ip")
+
+# log_type -> AaaStatisticsNodeDaily columns for the raw table's two counts
+NODE_DAILY_COLUMNS = {
+    "authentication": ("auth_success", "auth_fail"),
+    "authorization": ("authz_permit", "authz_deny"),
+    "accounting": ("acct_start", "acct_stop"),
+}
+
+_KEY_ROLLUP_COLUMNS = [
+    "grain",
+    "log_type",
+    "dimension",
+    "period",
+    "node_name",
+    "value",
+    "first_count",
+    "second_count",
+]
+
+
+def _const(value: Any, type_: Any) -> Any:
+    """A typed constant for the select list of an INSERT … SELECT."""
+    return sa.cast(sa.literal(value), type_)
+
+
+def _month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def _next_month(day: date) -> date:
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def rollup_periods(
+    start: date, end: date
+) -> tuple[tuple[date, date] | None, list[tuple[date, date]]]:
+    """
+    Split [start, end] into the coarsest rollup rows covering it: the first and
+    last month lying wholly inside (None if there is none), and the day ranges
+    left over at the edges.
+    """
+    if end < start:
+        return None, []
+    first_month = start if start.day == 1 else _next_month(start)
+    last_month = _month_start(end + timedelta(days=1)) - timedelta(days=1)
+    if first_month > last_month:
+        return None, [(start, end)]
+    days = []
+    if start < first_month:
+        days.append((start, first_month - timedelta(days=1)))
+    if last_month < end:
+        days.append((last_month + timedelta(days=1), end))
+    return (first_month, _month_start(last_month)), days
+
+
+def register_nodes(session: Session, written: Iterable[tuple[date, str]]) -> bool:
+    """
+    Add the nodes of the written (day, node_name) pairs to the node registry and
+    widen their day spans. Runs in the caller's transaction; returns True if a
+    node was new.
+    """
+    spans: dict[str, tuple[date, date]] = {}
+    for day, node_name in written:
+        first, last = spans.get(node_name, (day, day))
+        spans[node_name] = (min(first, day), max(last, day))
+    if not spans:
+        return False
+    stmt = pg_insert(AaaStatisticsNode).values(
+        [
+            {"node_name": node, "first_log_date": first, "last_log_date": last}
+            for node, (first, last) in sorted(spans.items())
+        ]
+    )
+    node = AaaStatisticsNode
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["node_name"],
+        set_={
+            "first_log_date": func.least(
+                col(node.first_log_date), stmt.excluded.first_log_date
+            ),
+            "last_log_date": func.greatest(
+                col(node.last_log_date), stmt.excluded.last_log_date
+            ),
+        },
+        where=(stmt.excluded.first_log_date < node.first_log_date)
+        | (stmt.excluded.last_log_date > node.last_log_date),
+    )
+    # xmax is 0 only on rows this statement inserted rather than updated.
+    inserted = session.execute(stmt.returning(sa.literal_column("xmax = 0"))).all()
+    return any(row[0] for row in inserted)
+
+
+def refresh_rollups(
+    session: Session, log_type: str, written: Iterable[tuple[date, str]]
+) -> None:
+    """
+    Recompute the rollups of the (day, node_name) pairs whose ``log_type``
+    statistics were just written. Runs in the caller's transaction, holding a
+    lock per pair until it ends; pairs are locked in sorted order.
+    """
+    from app.crud.aaa_statistics import STATISTICS_TABLES
+
+    model, first, second = STATISTICS_TABLES[log_type]
+    daily_first, daily_second = NODE_DAILY_COLUMNS[log_type]
+    for day, node_name in sorted(set(written)):
+        session.execute(
+            sa.text("SELECT pg_advisory_xact_lock(hashtext(:key))"),
+            {"key": f"aaa_rollups {log_type} {day.isoformat()} {node_name}"},
+        )
+        raw = (model.log_date == to_log_datetime(day), model.node_name == node_name)
+
+        totals = select(
+            _const(day, sa.Date),
+            _const(node_name, sa.String),
+            func.coalesce(func.sum(getattr(model, first)), 0),
+            func.coalesce(func.sum(getattr(model, second)), 0),
+        ).where(*raw)
+        stmt = pg_insert(AaaStatisticsNodeDaily).from_select(
+            ["log_date", "node_name", daily_first, daily_second], totals
+        )
+        session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["log_date", "node_name"],
+                set_={
+                    daily_first: stmt.excluded[daily_first],
+                    daily_second: stmt.excluded[daily_second],
+                },
+            )
+        )
+
+        # The month rows are kept as the sum of their day rows by taking the
+        # day's old rows out of them and adding its new ones back.
+        _apply_day_to_month(session, log_type, day, node_name, -1)
+        _delete_key_rollups(session, "day", log_type, day, node_name)
+        by_key = sa.union_all(
+            *(
+                sa.select(
+                    _const("day", sa.String),
+                    _const(log_type, sa.String),
+                    _const(dimension, sa.String),
+                    _const(day, sa.Date),
+                    _const(node_name, sa.String),
+                    getattr(model, dimension),
+                    func.sum(getattr(model, first)),
+                    func.sum(getattr(model, second)),
+                )
+                .where(*raw)
+                .group_by(getattr(model, dimension))
+                for dimension in DIMENSIONS
+            )
+        )
+        session.execute(
+            sa.insert(AaaStatisticsKeyRollup).from_select(_KEY_ROLLUP_COLUMNS, by_key)
+        )
+
+        _apply_day_to_month(session, log_type, day, node_name, 1)
+
+
+def _apply_day_to_month(
+    session: Session, log_type: str, day: date, node_name: str, sign: int
+) -> None:
+    """
+    Add (``sign`` 1) or subtract (-1) the day key rollups of one (day, node) to
+    or from their month rows. Month rows left at zero are deleted.
+    """
+    month_t: sa.Table = AaaStatisticsKeyRollup.__table__  # type: ignore[attr-defined]
+    day_t = month_t.alias("day_rollup")
+    month = _month_start(day)
+    day_rows = (
+        day_t.c.grain == "day",
+        day_t.c.log_type == log_type,
+        day_t.c.period == day,
+        day_t.c.node_name == node_name,
+    )
+    if sign < 0:
+        session.execute(
+            sa.update(month_t)
+            .where(
+                month_t.c.grain == "month",
+                month_t.c.log_type == log_type,
+                month_t.c.period == month,
+                month_t.c.node_name == node_name,
+                month_t.c.dimension == day_t.c.dimension,
+                month_t.c.value == day_t.c.value,
+                *day_rows,
+            )
+            .values(
+                first_count=month_t.c.first_count - day_t.c.first_count,
+                second_count=month_t.c.second_count - day_t.c.second_count,
+            )
+        )
+        session.execute(
+            sa.delete(month_t).where(
+                month_t.c.grain == "month",
+                month_t.c.log_type == log_type,
+                month_t.c.period == month,
+                month_t.c.node_name == node_name,
+                month_t.c.first_count == 0,
+                month_t.c.second_count == 0,
+            )
+        )
+        return
+
+    day_keys = sa.select(
+        _const("month", sa.String),
+        day_t.c.log_type,
+        day_t.c.dimension,
+        _const(month, sa.Date),
+        day_t.c.node_name,
+        day_t.c.value,
+        day_t.c.first_count,
+        day_t.c.second_count,
+    ).where(*day_rows)
+    stmt = pg_insert(AaaStatisticsKeyRollup).from_select(_KEY_ROLLUP_COLUMNS, day_keys)
+    session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[c.name for c in month_t.primary_key.columns],
+            set_={
+                "first_count": month_t.c.first_count + stmt.excluded.first_count,
+                "second_count": month_t.c.second_count + stmt.excluded.second_count,
+            },
+        )
+    )
+
+
+def _delete_key_rollups(
+    session: Session, grain: str, log_type: str, period: date, node_name: str
+) -> None:
+    session.exec(
+        delete(AaaStatisticsKeyRollup).where(
+            col(AaaStatisticsKeyRollup.grain) == grain,
+            col(AaaStatisticsKeyRollup.log_type) == log_type,
+            col(AaaStatisticsKeyRollup.period) == period,
+            col(AaaStatisticsKeyRollup.node_name) == node_name,
+        )
+    )
+
+
+def _daily_totals_select(start: date, end: date, node_name: str | None) -> Any:
+    daily = AaaStatisticsNodeDaily
+    stmt = (
+        sa.select(
+            col(daily.log_date).label("date"),
+            *(
+                func.sum(getattr(daily, column)).label(column)
+                for columns in NODE_DAILY_COLUMNS.values()
+                for column in columns
+            ),
+        )
+        .where(col(daily.log_date).between(start, end))
+        .group_by(col(daily.log_date))
+    )
+    if node_name:
+        stmt = stmt.where(col(daily.node_name) == node_name)
+    return stmt
+
+
+def daily_totals(
+    session: Session, start: date, end: date, node_name: str | None = None
+) -> list[Any]:
+    """
+    Per-day sums over all nodes (or ``node_name``) between ``start`` and ``end``:
+    rows with ``date`` and the six AaaStatisticsNodeDaily count columns.
+    """
+    stmt = _daily_totals_select(start, end, node_name)
+    return list(session.exec(stmt.order_by(AaaStatisticsNodeDaily.log_date)).all())
+
+
+class TopList(NamedTuple):
+    """One top-N list: a key column of a log type, ranked by one count column."""
+
+    log_type: str
+    dimension: str  # "username", "nas_ip" or "user_source_ip"
+    count_column: str  # "first_count" or "second_count"
+    start: date
+    end: date
+
+
+def _top_keys_select(top: TopList, node_name: str | None) -> Any | None:
+    """(value, total, rank) of every key with a positive total; None for an empty range."""
+    rollup = AaaStatisticsKeyRollup
+    months, day_ranges = rollup_periods(top.start, top.end)
+    periods = [
+        sa.and_(col(rollup.grain) == "day", col(rollup.period).between(lo, hi))
+        for lo, hi in day_ranges
+    ]
+    if months is not None:
+        periods.append(
+            sa.and_(col(rollup.grain) == "month", col(rollup.period).between(*months))
+        )
+    if not periods:
+        return None
+    total = func.sum(getattr(rollup, top.count_column))
+    stmt = (
+        select(
+            rollup.value,
+            total.label("total"),
+            func.row_number().over(order_by=(total.desc(), rollup.value)).label("rank"),
+        )
+        .where(
+            rollup.log_type == top.log_type,
+            rollup.dimension == top.dimension,
+            sa.or_(*periods),
+        )
+        .group_by(rollup.value)
+        .having(total > 0)
+    )
+    if node_name:
+        stmt = stmt.where(rollup.node_name == node_name)
+    return stmt
+
+
+def top_keys(
+    session: Session,
+    log_type: str,
+    dimension: str,
+    count: str,
+    start: date,
+    end: date,
+    node_name: str | None = None,
+) -> list[tuple[str, int]]:
+    """
+    (key, total) pairs of one ``dimension`` with a positive sum of ``count``
+    ("first_count" or "second_count") between ``start`` and ``end``, largest
+    first. Whole months are read from the monthly rollup.
+    """
+    stmt = _top_keys_select(TopList(log_type, dimension, count, start, end), node_name)
+    if stmt is None:
+        return []
+    ranked = stmt.subquery()
+    rows = session.exec(select(ranked.c.value, ranked.c.total).order_by(ranked.c.rank))
+    return [(value, total) for value, total in rows.all()]
+
+
+class RangeOverview(NamedTuple):
+    daily: list[Any]  # as returned by daily_totals()
+    top: dict[str, list[tuple[str, int]]]  # name -> (key, total), largest first
+
+
+def range_overview(
+    session: Session,
+    start: date,
+    end: date,
+    top_lists: dict[str, TopList],
+    node_name: str | None = None,
+    limit: int | None = None,
+    extra_keys: Mapping[str, Collection[str]] | None = None,
+) -> RangeOverview:
+    """
+    daily_totals() for [start, end] and top_keys() for every entry of
+    ``top_lists`` (at most ``limit`` keys each, plus the keys of that list in
+    ``extra_keys`` wherever they rank), fetched with one UNION ALL statement.
+    """
+    counts = [column for columns in NODE_DAILY_COLUMNS.values() for column in columns]
+    daily = _daily_totals_select(start, end, node_name).subquery()
+    parts = [
+        select(
+            _const("", sa.String).label("top_list"),
+            daily.c.date,
+            sa.cast(sa.null(), sa.String).label("key"),
+            *(daily.c[column] for column in counts),
+        )
+    ]
+    for name, top in top_lists.items():
+        stmt = _top_keys_select(top, node_name)
+        if stmt is None:
+            continue
+        ranked = stmt.subquery()
+        part = select(
+            _const(name, sa.String),
+            sa.cast(sa.null(), sa.Date),
+            ranked.c.value,
+            ranked.c.total,
+            *(_const(0, sa.BigInteger) for _ in counts[1:]),
+        )
+        if limit is not None:
+            keys = (extra_keys or {}).get(name)
+            in_top = ranked.c.rank <= limit
+            part = part.where(
+                sa.or_(in_top, ranked.c.value.in_(list(keys))) if keys else in_top
+            )
+        parts.append(part)
+
+    overview = RangeOverview(daily=[], top={name: [] for name in top_lists})
+    for row in session.execute(sa.union_all(*parts)).all():
+        if row.top_list:
+            overview.top[row.top_list].append((row.key, row[3]))
+        else:
+            overview.daily.append(row)
+    overview.daily.sort(key=lambda r: r.date)
+    for entries in overview.top.values():
+        entries.sort(key=lambda e: (-e[1], e[0]))
+    return overview
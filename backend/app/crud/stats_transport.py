@@ -0,0 +1,83 @@
+"""
+Compact node-to-node encoding of collect-stats payloads.
+
+A JSON collect-stats response repeats every key name and the log date on each
+row. When the caller's Accept header lists COLUMNAR_MEDIA_TYPE the peer instead
+sends the rows column by column: string columns (username, nas_ip,
+user_source_ip, log_date) as integer codes into one shared string table, count
+columns as plain integer arrays, the whole document gzip-compressed. Callers
+that do not ask for it, and peers that do not support it, keep using JSON.
+"""
+
+import gzip
+import json
+from typing import Any
+
+import httpx
+from fastapi import Response
+
+COLUMNAR_MEDIA_TYPE = "application/vnd.tacacs-ng-ui.stats-columnar+json"
+# Sent by callers: prefer the columnar form, accept plain JSON from older peers.
+STATS_ACCEPT = f"{COLUMNAR_MEDIA_TYPE}, application/json;q=0.5"
+
+_STRING_COLUMNS = ("username", "nas_ip", "user_source_ip", "log_date")
+
+
+def wants_columnar(accept: str | None) -> bool:
+    return COLUMNAR_MEDIA_TYPE in (accept or "")
+
+
+def to_columnar(payload: dict[str, Any]) -> dict[str, Any]:
+    """Turn every list of row dicts in ``payload`` into dictionary-encoded columns."""
+    strings: dict[str, int] = {}
+    encoded: dict[str, Any] = {}
+    columns: dict[str, dict[str, list[Any]]] = {}
+    for key, value in payload.items():
+        if not isinstance(value, list):
+            encoded[key] = value
+            continue
+        table: dict[str, list[Any]] = {name: [] for name in value[0]} if value else {}
+        for row in value:
+            for name, item in row.items():
+                if name in _STRING_COLUMNS:
+                    item = strings.setdefault(item, len(strings))
+                table[name].append(item)
+        columns[key] = table
+    encoded["strings"] = list(strings)
+    encoded["columns"] = columns
+    return encoded
+
+
+def from_columnar(encoded: dict[str, Any]) -> dict[str, Any]:
+    """Inverse of to_columnar()."""
+    payload = dict(encoded)
+    strings = payload.pop("strings")
+    for key, table in payload.pop("columns").items():
+        names = list(table)
+        values = [
+            [strings[code] for code in table[name]]
+            if name in _STRING_COLUMNS
+            else table[name]
+            for name in names
+        ]
+        payload[key] = [
+            dict(zip(names, row, strict=True)) for row in zip(*values, strict=True)
+        ]
+    return payload
+
+
+def columnar_response(payload: dict[str, Any]) -> Response:
+    body = json.dumps(to_columnar(payload), separators=(",", ":")).encode()
+    return Response(
+        content=gzip.compress(body, compresslevel=6),
+        media_type=COLUMNAR_MEDIA_TYPE,
+        headers={"Content-Encoding": "gzip"},
+    )
+
+
+def decode_stats_response(resp: httpx.Response) -> dict[str, Any]:
+    """The collect-stats payload of a peer response, in either encoding."""
+    data: dict[str, Any] = resp.json()  # httpx has already undone the Content-Encoding
+    if resp.headers.get("content-type", "").startswith(COLUMNAR_MEDIA_TYPE):
+        return from_columnar(data)
+    return data
@@ -1,7 +1,4 @@
-import asyncio
 import logging
-import subprocess
-import sys
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
 from datetime import date
@@ -17,16 +14,23 @@ from starlette.middleware.cors import CORSMiddleware
 from app.api.main import api_router
 from app.core.config import settings
 from app.core.db import engine
-from app.crud.alert_evaluator import evaluate_all_rules
+from app.core.scheduler import Scheduler
+from app.crud.aaa_statistics import collect_local_statistics
+from app.crud.alert_evaluator import evaluate_all_rules, evaluate_realtime_rules
 from app.crud.audit_logs import purge_old_audit_logs
+from app.crud.log_watcher import LogWatcher
 from app.crud.ml_anomaly_scorer import run_daily_anomaly_scoring
+from app.crud.statistics_partitions import maintain_partitions
 from app.models import HaConfig, HaPeerNode
 
 logger = logging.getLogger(__name__)
 
 _PURGE_INTERVAL_SECONDS = 24 * 60 * 60  # 24 hours
 _ALERT_EVAL_INTERVAL_SECONDS = 5 * 60  # 5 minutes
+_REALTIME_ALERT_MIN_SECONDS = 2  # at most one realtime evaluation per 2 s
 _ML_SCORING_INTERVAL_SECONDS = 24 * 60 * 60  # 24 hours
+_PARTITION_INTERVAL_SECONDS = 24 * 60 * 60  # 24 hours
+_JOB_JITTER_SECONDS = 10
 
 
 def _seed_ha_config(session: Session) -> None:
@@ -58,83 +62,104 @@ def _seed_ha_config(session: Session) -> None:
         session.commit()
 
 
-async def _audit_purge_loop() -> None:
-    while True:
-        await asyncio.sleep(_PURGE_INTERVAL_SECONDS)
-        try:
-            with Session(engine) as session:
-                deleted = purge_old_audit_logs(session=session)
-            if deleted:
-                logger.info("Audit log purge: removed %d rows", deleted)
-        except Exception:
-            logger.exception("Audit log purge failed")
+def _purge_audit_logs() -> None:
+    with Session(engine) as session:
+        deleted = purge_old_audit_logs(session=session)
+    if deleted:
+        logger.info("Audit log purge: removed %d rows", deleted)
 
 
-async def _alert_evaluation_loop() -> None:
-    while True:
-        await asyncio.sleep(_ALERT_EVAL_INTERVAL_SECONDS)
-        try:
-            with Session(engine) as session:
-                evaluate_all_rules(session=session)
-        except Exception:
-            logger.exception("Alert evaluation failed")
+def _maintain_stats_partitions() -> None:
+    with Session(engine) as session:
+        created, dropped = maintain_partitions(session)
+    if created:
+        logger.info("Statistics partitions created: %s", ", ".join(created))
+    if dropped:
+        logger.info("Statistics partitions dropped: %s", ", ".join(dropped))
 
 
-async def _ml_scoring_loop() -> None:
-    await asyncio.sleep(60)  # brief startup delay
-    while True:
-        try:
-            with Session(engine) as session:
-                run_daily_anomaly_scoring(session=session)
-        except Exception:
-            logger.exception("ML anomaly scoring failed")
-        await asyncio.sleep(_ML_SCORING_INTERVAL_SECONDS)
-
-
-async def _stats_collection_loop() -> None:
-    await asyncio.sleep(30)  # brief startup delay
-    while True:
-        with Session(engine) as s:
-            cfg = s.get(HaConfig, 1)
-        interval = (cfg.stats_interval_minutes if cfg else settings.STATS_INTERVAL_MINUTES) * 60
-        if interval <= 0:
-            await asyncio.sleep(60)
-            continue
-        today_str = date.today().isoformat()
-        scripts = [
-            "/app/scripts/tacacs_logs_authentication.py",
-            "/app/scripts/tacacs_logs_authorization.py",
-            "/app/scripts/tacacs_logs_accounting.py",
-        ]
-        for script in scripts:
-            try:
-                proc = subprocess.run(
-                    [sys.executable, script, today_str],
-                    capture_output=True,
-                    text=True,
-                    timeout=120,
-                )
-                if proc.returncode != 0:
-                    logger.warning(
-                        "Stats script %s exited %s: %s",
-                        script,
-                        proc.returncode,
-                        proc.stderr[-500:],
-                    )
-            except subprocess.TimeoutExpired:
-                logger.warning("Stats script %s timed out", script)
-            except Exception:
-                logger.exception("Stats script %s failed", script)
-
-        # collect from peer nodes
-        try:
-            from app.api.routes.aaa_statistics import _collect_from_peers
+def _evaluate_alert_rules() -> None:
+    with Session(engine) as session:
+        evaluate_all_rules(session=session)
+
+
+def _evaluate_realtime_alert_rules() -> None:
+    with Session(engine) as session:
+        evaluate_realtime_rules(session=session)
+
+
+def _score_anomalies() -> None:
+    # Runs in the scheduler's worker process (IsolationForest training).
+    with Session(engine) as session:
+        run_daily_anomaly_scoring(session=session)
 
-            _collect_from_peers(today_str)
-        except Exception:
-            logger.exception("Peer stats collection failed")
 
-        await asyncio.sleep(interval)
+def _stats_interval_seconds() -> float:
+    with Session(engine) as session:
+        cfg = session.get(HaConfig, 1)
+    minutes = cfg.stats_interval_minutes if cfg else settings.STATS_INTERVAL_MINUTES
+    return minutes * 60
+
+
+def _collect_statistics() -> None:
+    today = date.today()
+    try:
+        with Session(engine) as session:
+            collect_local_statistics(session, today)
+    except Exception:
+        logger.exception("Local stats collection failed")
+
+    # collect from peer nodes
+    from app.api.routes.aaa_statistics import _collect_from_peers
+
+    _collect_from_peers(today.isoformat(), incremental=True)
+
+
+def _build_scheduler() -> Scheduler:
+    scheduler = Scheduler()
+    scheduler.add_job(
+        "audit_purge",
+        _purge_audit_logs,
+        _PURGE_INTERVAL_SECONDS,
+        initial_delay=_PURGE_INTERVAL_SECONDS,
+        jitter=_JOB_JITTER_SECONDS,
+    )
+    scheduler.add_job(
+        "stats_partitions",
+        _maintain_stats_partitions,
+        _PARTITION_INTERVAL_SECONDS,
+        jitter=_JOB_JITTER_SECONDS,
+    )
+    scheduler.add_job(
+        "alert_evaluation",
+        _evaluate_alert_rules,
+        _ALERT_EVAL_INTERVAL_SECONDS,
+        initial_delay=_ALERT_EVAL_INTERVAL_SECONDS,
+        jitter=_JOB_JITTER_SECONDS,
+    )
+    if settings.ALERT_REALTIME_ENABLED:
+        scheduler.add_job(
+            "alert_realtime",
+            _evaluate_realtime_alert_rules,
+            _REALTIME_ALERT_MIN_SECONDS,
+            trigger=LogWatcher(settings.TACACS_LOG_DIRECTORY).wait,
+        )
+    scheduler.add_job(
+        "ml_scoring",
+        _score_anomalies,
+        _ML_SCORING_INTERVAL_SECONDS,
+        initial_delay=60,  # brief startup delay
+        jitter=_JOB_JITTER_SECONDS,
+        executor="process",
+    )
+    scheduler.add_job(
+        "stats_collection",
+        _collect_statistics,
+        _stats_interval_seconds,
+        initial_delay=30,  # brief startup delay
+        jitter=_JOB_JITTER_SECONDS,
+    )
+    return scheduler
 
 
 @asynccontextmanager
@@ -146,20 +171,13 @@ async def lifespan(_app: FastAPI) -> AsyncGenerator[None, None]:
     with Session(engine) as session:
         cfg = session.get(HaConfig, 1)
     scheduler_on = cfg.scheduler_enabled if cfg else settings.SCHEDULER_ENABLED
-    stats_interval = (cfg.stats_interval_minutes if cfg else settings.STATS_INTERVAL_MINUTES)
-
-    tasks = []
-    if scheduler_on:
-        tasks = [
-            asyncio.create_task(_audit_purge_loop()),
-            asyncio.create_task(_alert_evaluation_loop()),
-            asyncio.create_task(_ml_scoring_loop()),
-        ]
-        if stats_interval > 0:
-            tasks.append(asyncio.create_task(_stats_collection_loop()))
+
+    scheduler = _build_scheduler() if scheduler_on else None
+    if scheduler:
+        scheduler.start()
     yield
-    for t in tasks:
-        t.cancel()
+    if scheduler:
+        await scheduler.stop()
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
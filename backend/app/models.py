@@ -1,10 +1,10 @@
 import uuid
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from typing import Literal
 
 import sqlalchemy as sa
 from pydantic import EmailStr
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import Index, UniqueConstraint
 from sqlmodel import Column, Field, Relationship, SQLModel
 
 from app.core.config import settings
@@ -740,6 +740,7 @@ class TacacsLogPublic(TacacsLogBase):
     id: uuid.UUID
     updated_at: datetime
     data: str | None = None
+    line_count: int | None = None  # total (matching) lines when paged by offset/limit
 
 
 class TacacsLogsPublic(SQLModel):
@@ -784,12 +785,27 @@ class TacacsLogDailySummary(SQLModel):
     authentication: TacacsLogTypeSummary
     authorization: TacacsLogTypeSummary
     accounting: TacacsLogTypeSummary
+    # Peer nodes whose totals are not live: seconds since their last good
+    # payload, or null when stored statistics were used instead.
+    stale_nodes: dict[str, float | None] = {}
 
 
 class TacacsLogLatestDate(SQLModel):
     date: str
 
 
+class TacacsLogDailyTotals(TacacsLogTypeSummary, TimestampModel, table=True):
+    """Event totals of one closed log day for one node and log type."""
+
+    log_date: date = Field(primary_key=True)
+    node_name: str = Field(primary_key=True, max_length=255)
+    log_type: str = Field(primary_key=True, max_length=32)
+    # Size and mtime of this node's log file the totals were counted from, so a
+    # late write is noticed; None for totals reported by a peer.
+    source_size: int | None = Field(default=None, sa_column=Column(sa.BigInteger))
+    source_mtime_ns: int | None = Field(default=None, sa_column=Column(sa.BigInteger))
+
+
 # -- Tacacs Custom Section Table ---
 class ConfigurationOptionBase(SQLModel):
     name: str = Field(index=True, unique=True, max_length=255)
@@ -826,10 +842,10 @@ class ConfigurationOptionsPublic(SQLModel):
 
 # -- Authentication Statistics Table ---
 class AuthenticationStatisticsBase(SQLModel):
-    node_name: str = Field(default="primary", index=True, max_length=255)
-    username: str = Field(index=True, max_length=255)
-    nas_ip: str = Field(index=True, max_length=1024)
-    user_source_ip: str = Field(index=True, max_length=1024)
+    node_name: str = Field(default="primary", max_length=255)
+    username: str = Field(max_length=255)
+    nas_ip: str = Field(max_length=1024)
+    user_source_ip: str = Field(max_length=1024)
     success_count: int = Field(default=0)
     fail_count: int = Field(default=0)
     log_date: datetime = Field(default_factory=_utc_now)
@@ -856,8 +872,23 @@ class AuthenticationStatistics(
             "node_name",
             name="uq_authenticationstatistics_username_nas_ip_src_ip_log_date_nod",
         ),
+        Index(
+            "ix_authenticationstatistics_log_date_node_name",
+            "log_date",
+            "node_name",
+            postgresql_include=[
+                "username",
+                "user_source_ip",
+                "success_count",
+                "fail_count",
+            ],
+        ),
+        {"postgresql_partition_by": "RANGE (log_date)"},
     )
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    # Monthly range partitions on log_date; PostgreSQL requires the partition
+    # key in every unique constraint, the primary key included.
+    log_date: datetime = Field(default_factory=_utc_now, primary_key=True)
 
 
 # Properties to return via API, id is always required
@@ -873,10 +904,10 @@ class AuthenticationStatisticsPublic(SQLModel):
 
 # -- Authrorization Statistics Table ---
 class AuthorizationStatisticsBase(SQLModel):
-    node_name: str = Field(default="primary", index=True, max_length=255)
-    username: str = Field(index=True, max_length=255)
-    nas_ip: str = Field(index=True, max_length=1024)
-    user_source_ip: str = Field(index=True, max_length=1024)
+    node_name: str = Field(default="primary", max_length=255)
+    username: str = Field(max_length=255)
+    nas_ip: str = Field(max_length=1024)
+    user_source_ip: str = Field(max_length=1024)
     permit_count: int = Field(default=0)
     deny_count: int = Field(default=0)
     log_date: datetime = Field(default_factory=_utc_now)
@@ -901,8 +932,18 @@ class AuthorizationStatistics(AuthorizationStatisticsBase, TimestampModel, table
             "node_name",
             name="uq_authorizationstatistics_username_nas_ip_src_ip_log_date_node",
         ),
+        Index(
+            "ix_authorizationstatistics_log_date_node_name",
+            "log_date",
+            "node_name",
+            postgresql_include=["username", "permit_count", "deny_count"],
+        ),
+        {"postgresql_partition_by": "RANGE (log_date)"},
     )
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    # Monthly range partitions on log_date; PostgreSQL requires the partition
+    # key in every unique constraint, the primary key included.
+    log_date: datetime = Field(default_factory=_utc_now, primary_key=True)
 
 
 # Properties to return via API, id is always required
@@ -918,10 +959,10 @@ class AuthorizationStatisticsPublic(SQLModel):
 
 # --- Accounting Statistics Table ---
 class AccountingStatisticsBase(SQLModel):
-    node_name: str = Field(default="primary", index=True, max_length=255)
-    username: str = Field(index=True, max_length=255)
-    nas_ip: str = Field(index=True, max_length=1024)
-    user_source_ip: str = Field(index=True, max_length=1024)
+    node_name: str = Field(default="primary", max_length=255)
+    username: str = Field(max_length=255)
+    nas_ip: str = Field(max_length=1024)
+    user_source_ip: str = Field(max_length=1024)
     start_count: int = Field(default=0)
     stop_count: int = Field(default=0)
     log_date: datetime = Field(default_factory=_utc_now)
@@ -946,8 +987,18 @@ class AccountingStatistics(AccountingStatisticsBase, TimestampModel, table=True)
             "node_name",
             name="uq_accountingstatistics_username_nas_ip_src_ip_log_date_node",
         ),
+        Index(
+            "ix_accountingstatistics_log_date_node_name",
+            "log_date",
+            "node_name",
+            postgresql_include=["start_count", "stop_count"],
+        ),
+        {"postgresql_partition_by": "RANGE (log_date)"},
     )
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    # Monthly range partitions on log_date; PostgreSQL requires the partition
+    # key in every unique constraint, the primary key included.
+    log_date: datetime = Field(default_factory=_utc_now, primary_key=True)
 
 
 # Properties to return via API, id is always required
@@ -964,6 +1015,44 @@ class AccountingStatisticsPublic(SQLModel):
 # --- End of Accounting Statistics Table ---
 
 
+# --- AAA statistics rollups (maintained by app.crud.statistics_rollups) ---
+class AaaStatisticsNodeDaily(SQLModel, table=True):
+    """Per-node daily sums of the three statistics tables (trend charts)."""
+
+    log_date: date = Field(primary_key=True)
+    node_name: str = Field(primary_key=True, max_length=255)
+    auth_success: int = 0
+    auth_fail: int = 0
+    authz_permit: int = 0
+    authz_deny: int = 0
+    acct_start: int = 0
+    acct_stop: int = 0
+
+
+class AaaStatisticsKeyRollup(SQLModel, table=True):
+    """
+    Per-day or per-month sums of one statistics table grouped by one key column
+    (username, nas_ip or user_source_ip), for the top-N lists.
+    """
+
+    grain: str = Field(primary_key=True, max_length=8)  # "day" | "month"
+    log_type: str = Field(primary_key=True, max_length=32)
+    dimension: str = Field(primary_key=True, max_length=32)
+    period: date = Field(primary_key=True)  # the day, or the 1st of the month
+    node_name: str = Field(primary_key=True, max_length=255)
+    value: str = Field(primary_key=True, max_length=1024)
+    first_count: int = 0  # success / permit / start
+    second_count: int = 0  # fail / deny / stop
+
+
+class AaaStatisticsNode(SQLModel, table=True):
+    """Every node_name that has statistics, with the span of days it covers."""
+
+    node_name: str = Field(primary_key=True, max_length=255)
+    first_log_date: date
+    last_log_date: date
+
+
 class AaaStatisticsTodayPublic(SQLModel):
     authentication_failed_count_by_user: list[dict] = []
     authentication_success_count_by_user: list[dict] = []
@@ -988,6 +1077,9 @@ class AaaStatisticsTodayPublic(SQLModel):
     today_authentication_success_count_by_user: list[dict] = []
     today_authentication_success_count_by_user_source_ip: list[dict] = []
     today_authentication_success_count_by_nas_ip: list[dict] = []
+    # Peer nodes whose today figures are not live: seconds since their last good
+    # payload, or null when stored statistics were used instead.
+    today_stale_nodes: dict[str, float | None] = {}
 
 
 class AaaStatisticsDateRangePublic(SQLModel):
@@ -1,9 +1,14 @@
+import calendar
+import mmap
 import os
 import re
 import sys
 from collections import Counter
+from collections.abc import Callable, Iterator
 from datetime import date, datetime, timedelta, timezone
 from datetime import time as time_
+from functools import lru_cache
+from typing import NamedTuple
 from zoneinfo import ZoneInfo
 
 # IPv4 or IPv6 — requires dots or colons so plain port/session numbers (e.g. "39001") don't match.
@@ -13,7 +18,7 @@ from zoneinfo import ZoneInfo
 _IP = r"(?:[0-9]{1,3}\.){3}[0-9]{1,3}|[a-fA-F0-9]{0,4}(?::[a-fA-F0-9]{0,4})+"
 
 # Optional non-IP field (tty/port/flag) — skipped only when it is NOT a valid IP.
-_NON_IP_FIELD = rf"(?:\t(?!(?:{_IP})(?:\t|$))[^\t]*)?"
+_NON_IP_FIELD = rf"(?:\t(?!(?:{_IP})(?:\t|$))(?P<port>[^\t]*))?"
 
 AUTH_LOG_REGEX = re.compile(
     r"^(?P<timestamp>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2} [+-]\d{4})\s+"
@@ -21,7 +26,7 @@ AUTH_LOG_REGEX = re.compile(
     r"(?P<username>[\w.-]+)"
     + _NON_IP_FIELD  # optional tty / port / flag (not an IP)
     + rf"(?:\t(?P<client_ip>{_IP}))?"  # optional real client IP
-    + r"\t(?P<message>[^\n]+)$"
+    + r"\t(?P<rest>(?P<message>[^\n]+))$"
 )
 
 _AUTHZ_IP = r"([a-fA-F0-9:.]+|[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3})"
@@ -31,16 +36,61 @@ AUTHZ_LOG_REGEX = re.compile(
     r"(?P<username>[\w.-]+)\s+"
     r"(?P<tty>[\w/.-]+)\s+"
     rf"(?P<client_ip>{_AUTHZ_IP})\s+"
-    r"(?:(?P<profile>[\w.-]+)\s+)?(?P<message>.*)$"
+    r"(?P<rest>(?:(?P<profile>[\w.-]+)\s+)?(?P<message>.*))$"
 )
 
+# Lines without a start/stop action (e.g. watchdog updates) still match so the
+# log viewer shows them; the statistics classifier ignores them.
 ACCT_LOG_REGEX = re.compile(
     r"^(?P<timestamp>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2} [+-]\d{4})\s+"
     rf"(?P<nas_ip>{_AUTHZ_IP})\s+"
     r"(?P<username>[\w.-]+)\s+"
     r"(?P<tty>[\w/.-]+)\s+"
     rf"(?P<client_ip>{_AUTHZ_IP})\s+"
-    r"(?P<action>start|stop)\s*(?P<message>.*)$"
+    r"(?P<rest>(?:(?P<action>start|stop)\b)?\s*(?P<message>.*))$"
+)
+
+LOG_TYPES = ("authentication", "authorization", "accounting")
+
+_LINE_REGEX = {
+    "authentication": AUTH_LOG_REGEX,
+    "authorization": AUTHZ_LOG_REGEX,
+    "accounting": ACCT_LOG_REGEX,
+}
+
+# First whole-word outcome keyword in the message decides the event result.
+# Authorization messages start with an optional profile name, which may itself
+# contain "permit" / "deny" (e.g. "permit-all"), so the outcome is the token
+# right after it.
+_RESULT_REGEX = {
+    "authentication": re.compile(r"\b(succeeded|failed|denied)\b", re.IGNORECASE),
+    "authorization": re.compile(r"^\s*(?:[\w.-]+\s+)?(permit|deny)\b", re.IGNORECASE),
+    "accounting": re.compile(r"^(start|stop)\b", re.IGNORECASE),
+}
+_RESULT_MAP = {
+    "succeeded": "success",
+    "failed": "failed",
+    "denied": "failed",
+    "permit": "permit",
+    "deny": "deny",
+    "start": "start",
+    "stop": "stop",
+}
+
+# Strip the leading profile name from authorization messages:
+# e.g. "tacacs_super_user_profile permit shell show ip route" → "show ip route"
+_AUTHZ_CMD_REGEX = re.compile(
+    r"^(?:[\w.-]+\s+)?"
+    r"(?:permit|deny)\s+"
+    r"(?:[\w.-]+\s+)?"  # optional service token (shell, junos-exec, …)
+    r"(?P<command>.+?)\s*$",
+    re.IGNORECASE,
+)
+_ACCT_CMD_REGEX = re.compile(
+    r"(?:start|stop)\s+"
+    r"(?:[\w.-]+\s+)?"  # optional service token
+    r"(?P<command>.+?)\s*$",
+    re.IGNORECASE,
 )
 
 
@@ -73,6 +123,11 @@ def get_target_date() -> date:
             print(
                 f"Invalid date argument '{sys.argv[1]}'. Expected YYYY-MM-DD. Using yesterday."
             )
+    return previous_local_date()
+
+
+def previous_local_date() -> date:
+    """Yesterday in the configured local timezone (the default statistics date)."""
     return (datetime.now(_get_local_tz()) - timedelta(days=1)).date()
 
 
@@ -86,124 +141,357 @@ def build_log_file_path(target_date: date, log_type: str, log_directory: str) ->
     return target_date.strftime(f"{log_directory}%Y/%m/{log_type}-%Y-%m-%d.log")
 
 
+# ---------------------------------------------------------------------------
+# Timestamps — every line starts with "YYYY-MM-DD HH:MM:SS +ZZZZ".
+# ---------------------------------------------------------------------------
+
+_TIMESTAMP_WIDTH = 25
+_TIMESTAMP_PREFIX = re.compile(rb"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2} [+-]\d{4}")
+
+
+@lru_cache(maxsize=64)
+def _utc_offset_seconds(offset: str) -> int:
+    """Seconds east of UTC of a "+HHMM" / "-HHMM" offset."""
+    seconds = int(offset[1:3]) * 3600 + int(offset[3:5]) * 60
+    return -seconds if offset[0] == "-" else seconds
+
+
+@lru_cache(maxsize=1024)
+def _day_epoch(day: str) -> int:
+    return calendar.timegm(date.fromisoformat(day).timetuple())
+
+
+def timestamp_epoch(timestamp: str) -> int:
+    """
+    Epoch seconds of a log timestamp. Same result as strptime() with
+    "%Y-%m-%d %H:%M:%S %z", but only the day and the UTC offset go through
+    a (memoized) conversion; the time of day is sliced out of the fixed-width
+    string.
+    """
+    return (
+        _day_epoch(timestamp[:10])
+        + int(timestamp[11:13]) * 3600
+        + int(timestamp[14:16]) * 60
+        + int(timestamp[17:19])
+        - _utc_offset_seconds(timestamp[20:25])
+    )
+
+
+def _timestamp_prefix(epoch: float, offset: str) -> bytes:
+    """ "YYYY-MM-DD HH:MM:SS" of ``epoch`` in the given UTC offset."""
+    local = datetime.fromtimestamp(
+        int(epoch) + _utc_offset_seconds(offset), timezone.utc
+    )
+    return local.strftime("%Y-%m-%d %H:%M:%S").encode()
+
+
+# ---------------------------------------------------------------------------
+# Line parsing — the single place that turns a raw TACACS+ log line into fields.
+# Used by the statistics parsers below, the in-process event store
+# (app/crud/log_events.py), the log viewer and the alert evaluator.
+# ---------------------------------------------------------------------------
+
+
+class LogLine(NamedTuple):
+    timestamp: str  # "YYYY-MM-DD HH:MM:SS +ZZZZ", as written by tac_plus-ng
+    username: str
+    nas_ip: str
+    client_ip: str  # falls back to nas_ip when the line carries no client IP
+    port: str | None  # tty / port (e.g. vty14, tty0)
+    message: str  # everything after the client IP (profile + outcome + command)
+    action: str | None  # accounting start/stop; None for other log types
+
+
+def parse_log_line(log_type: str, line: str) -> LogLine | None:
+    """Parse one log line of the given type, or return None if it does not match."""
+    match = _LINE_REGEX[log_type].search(line)
+    if not match:
+        return None
+    groups = match.groupdict()
+    nas_ip = groups["nas_ip"]
+    return LogLine(
+        timestamp=groups["timestamp"],
+        username=groups["username"],
+        nas_ip=nas_ip,
+        client_ip=groups["client_ip"] or nas_ip,
+        port=groups.get("port") or groups.get("tty") or None,
+        message=groups["rest"].rstrip(),
+        action=groups.get("action"),
+    )
+
+
+def classify_result(log_type: str, message: str) -> str:
+    """Return success/failed, permit/deny or start/stop for a log message, else "unknown"."""
+    match = _RESULT_REGEX[log_type].search(message)
+    if not match:
+        return "unknown"
+    return _RESULT_MAP[match.group(1).lower()]
+
+
+def extract_command(log_type: str, message: str) -> str | None:
+    """Best-effort extraction of a human-readable command from the raw log message."""
+    if log_type == "authorization":
+        m = _AUTHZ_CMD_REGEX.match(message.strip())
+    elif log_type == "accounting":
+        m = _ACCT_CMD_REGEX.search(message.strip())
+    else:
+        return None
+    if not m:
+        return None
+    # Strip trailing <cr> artifact common in TACACS+ authz messages
+    return m.group("command").strip().removesuffix("<cr>").strip() or None
+
+
+def statistics_slot(log_type: str, parsed: LogLine, result: str) -> int | None:
+    """
+    Map a parsed line to the statistics Counter it increments: slot 0 is
+    success/permit/start, slot 1 is failed/deny/stop, None means not counted.
+    """
+    if log_type == "authentication":
+        if "login" not in parsed.message:
+            return None
+        return 0 if result == "success" else 1
+    if log_type == "authorization":
+        return {"permit": 0, "deny": 1}.get(result)
+    return {"start": 0, "stop": 1}.get(parsed.action or "")
+
+
+LineKey = tuple[str, str, str]
+
+
+def classify_line(log_type: str, line: str) -> tuple[LineKey, int] | None:
+    """Return ((username, nas_ip, client_ip), slot) for a counted line, else None."""
+    parsed = parse_log_line(log_type, line)
+    if parsed is None:
+        return None
+    slot = statistics_slot(log_type, parsed, classify_result(log_type, parsed.message))
+    if slot is None:
+        return None
+    return (parsed.username, parsed.nas_ip, parsed.client_ip), slot
+
+
 # ---------------------------------------------------------------------------
 # Pure-parse functions — read log file, return Counters, NO DB access.
 # Used by cron scripts and by the internal collect-stats API endpoint.
 # ---------------------------------------------------------------------------
 
 
-def parse_authentication_logs(
-    target_date: date, log_directory: str
-) -> tuple[Counter, Counter]:
-    """Return (successful_logins, failed_logins) Counters keyed by (username, nas_ip, client_ip)."""
+def count_log_file(
+    target_date: date, log_type: str, path: str
+) -> tuple[tuple[Counter, Counter], int]:
+    """Return the statistics Counters of one log file and the number of lines read."""
     target_date_str = target_date.strftime("%Y-%m-%d")
-    log_file_path = build_log_file_path(target_date, "authentication", log_directory)
+    counters: tuple[Counter, Counter] = (Counter(), Counter())
+    lines_read = 0
 
-    successful_logins: Counter = Counter()
-    failed_logins: Counter = Counter()
-
-    if not os.path.exists(log_file_path):
-        return successful_logins, failed_logins
+    if not os.path.exists(path):
+        return counters, lines_read
 
     try:
-        with open(log_file_path, errors="ignore") as f:
+        with open(path, errors="ignore") as f:
             for line in f:
+                lines_read += 1
                 if not line.startswith(target_date_str):
                     continue
-                match = AUTH_LOG_REGEX.search(line)
-                if not match:
-                    continue
-                log_data = match.groupdict()
-                message = log_data["message"]
-                if "login" not in message:
-                    continue
-                username = log_data["username"]
-                nas_ip = log_data["nas_ip"]
-                client_ip = log_data["client_ip"] or nas_ip
-                key = (username, nas_ip, client_ip)
-                if "succeeded" in message:
-                    successful_logins[key] += 1
-                else:
-                    failed_logins[key] += 1
+                classified = classify_line(log_type, line)
+                if classified is not None:
+                    key, slot = classified
+                    counters[slot][key] += 1
     except OSError:
         pass
 
-    return successful_logins, failed_logins
+    return counters, lines_read
 
 
-def parse_authorization_logs(
-    target_date: date, log_directory: str
+def _parse_log_counters(
+    target_date: date, log_type: str, log_directory: str
 ) -> tuple[Counter, Counter]:
-    """Return (permitted, denied) Counters keyed by (username, nas_ip, client_ip)."""
-    target_date_str = target_date.strftime("%Y-%m-%d")
-    log_file_path = build_log_file_path(target_date, "authorization", log_directory)
+    log_file_path = build_log_file_path(target_date, log_type, log_directory)
+    return count_log_file(target_date, log_type, log_file_path)[0]
 
-    permitted: Counter = Counter()
-    denied: Counter = Counter()
 
-    if not os.path.exists(log_file_path):
-        return permitted, denied
+def parse_authentication_logs(
+    target_date: date, log_directory: str
+) -> tuple[Counter, Counter]:
+    """Return (successful_logins, failed_logins) Counters keyed by (username, nas_ip, client_ip)."""
+    return _parse_log_counters(target_date, "authentication", log_directory)
 
-    try:
-        with open(log_file_path, errors="ignore") as f:
-            for line in f:
-                if not line.startswith(target_date_str):
-                    continue
-                match = AUTHZ_LOG_REGEX.search(line)
-                if not match:
-                    continue
-                log_data = match.groupdict()
-                message = log_data["message"].strip()
-                if "permit" not in message and "deny" not in message:
-                    continue
-                username = log_data["username"]
-                nas_ip = log_data["nas_ip"]
-                client_ip = log_data["client_ip"]
-                key = (username, nas_ip, client_ip)
-                if "permit" in message:
-                    permitted[key] += 1
-                elif "deny" in message:
-                    denied[key] += 1
-    except OSError:
-        pass
 
-    return permitted, denied
+def parse_authorization_logs(
+    target_date: date, log_directory: str
+) -> tuple[Counter, Counter]:
+    """Return (permitted, denied) Counters keyed by (username, nas_ip, client_ip)."""
+    return _parse_log_counters(target_date, "authorization", log_directory)
 
 
 def parse_accounting_logs(
     target_date: date, log_directory: str
 ) -> tuple[Counter, Counter]:
     """Return (start_events, stop_events) Counters keyed by (username, nas_ip, client_ip)."""
-    target_date_str = target_date.strftime("%Y-%m-%d")
-    log_file_path = build_log_file_path(target_date, "accounting", log_directory)
+    return _parse_log_counters(target_date, "accounting", log_directory)
 
-    start_events: Counter = Counter()
-    stop_events: Counter = Counter()
 
-    if not os.path.exists(log_file_path):
-        return start_events, stop_events
-
-    try:
-        with open(log_file_path, errors="ignore") as f:
-            for line in f:
-                if not line.startswith(target_date_str):
-                    continue
-                match = ACCT_LOG_REGEX.search(line)
-                if not match:
-                    continue
-                log_data = match.groupdict()
-                action = log_data.get("action")
-                if not action:
-                    continue
-                username = log_data["username"]
-                nas_ip = log_data["nas_ip"]
-                client_ip = log_data["client_ip"]
-                key = (username, nas_ip, client_ip)
-                if action == "start":
-                    start_events[key] += 1
-                elif action == "stop":
-                    stop_events[key] += 1
-    except OSError:
-        pass
+# ---------------------------------------------------------------------------
+# Incremental tail reader — remembers (inode, byte offset, partial trailing line)
+# so repeated reads of a growing log file only see the bytes appended since the
+# previous call.
+# ---------------------------------------------------------------------------
 
-    return start_events, stop_events
+_TAIL_READ_CHUNK = 1024 * 1024
+
+
+class LogTail:
+    """
+    Byte-offset tail of one log file path.
+
+    read_new_lines() hands the complete lines appended since the previous call to
+    ``consume`` in batches of at most one read chunk. A changed inode (rotation),
+    a file shorter than the saved offset (truncation) or a vanished file restarts
+    from byte 0 and calls ``on_reset`` first, so the caller can drop whatever it
+    derived from the old content. Not thread-safe — callers hold their own lock.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.inode: int | None = None
+        self.offset = 0
+        self._partial = b""
+
+    def _restart(self) -> None:
+        self.inode = None
+        self.offset = 0
+        self._partial = b""
+
+    def read_new_lines(
+        self,
+        consume: Callable[[list[str]], None],
+        on_reset: Callable[[], None],
+    ) -> None:
+        """Feed newly appended complete lines to ``consume``."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            # File not written yet (or rotated away) — nothing to read.
+            if self.inode is not None:
+                self._restart()
+                on_reset()
+            return
+
+        if self.inode is not None and (
+            st.st_ino != self.inode or st.st_size < self.offset
+        ):
+            self._restart()
+            on_reset()
+        self.inode = st.st_ino
+
+        if st.st_size == self.offset:
+            return
+
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            while chunk := f.read(_TAIL_READ_CHUNK):
+                self.offset += len(chunk)
+                raw_lines = (self._partial + chunk).split(b"\n")
+                # Last element is an incomplete line (or b"" after a trailing newline).
+                self._partial = raw_lines.pop()
+                consume([raw.decode("utf-8", errors="ignore") for raw in raw_lines])
+
+
+def _line_after(mm: mmap.mmap, pos: int) -> int:
+    """Start of the first line beginning at or after byte ``pos``."""
+    if pos == 0 or mm[pos - 1] == ord("\n"):
+        return pos
+    newline = mm.find(b"\n", pos)
+    return len(mm) if newline < 0 else newline + 1
+
+
+def _next_timestamp(mm: mmap.mmap, pos: int) -> tuple[int, int | None]:
+    """(start, epoch) of the first timestamped line at or after line start ``pos``."""
+    size = len(mm)
+    while pos < size:
+        head = mm[pos : pos + _TIMESTAMP_WIDTH]
+        if _TIMESTAMP_PREFIX.match(head):
+            return pos, timestamp_epoch(head.decode())
+        pos = _line_after(mm, pos + 1)
+    return size, None
+
+
+def _first_line_from(mm: mmap.mmap, start_epoch: float) -> int:
+    """
+    Byte offset of the first line stamped at or after ``start_epoch``, found by
+    binary search over byte offsets (log lines are appended in time order).
+    """
+    lo, hi = 0, len(mm)
+    while lo < hi:
+        probe, epoch = _next_timestamp(mm, _line_after(mm, (lo + hi) // 2))
+        if probe >= hi:
+            # No timestamped line starts in the upper half; settle the lower end.
+            probe, epoch = _next_timestamp(mm, lo)
+            if epoch is None or probe >= hi or epoch >= start_epoch:
+                return lo
+            lo = _line_after(mm, probe + 1)
+        elif epoch is not None and epoch >= start_epoch:
+            hi = probe
+        else:
+            lo = _line_after(mm, probe + 1)
+    return lo
+
+
+def iter_lines_between(
+    path: str, start_epoch: float, end_epoch: float
+) -> Iterator[str]:
+    """
+    Yield the lines of a log file stamped within [start_epoch, end_epoch],
+    without their newlines, reading only the bytes of that window: the first
+    line is found by binary search over byte offsets, and reading stops at the
+    first line whose fixed-width timestamp prefix sorts after the end of the
+    window (compared as bytes, per UTC offset, without parsing). Lines without a
+    timestamp inside the window are yielded as well.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mm:
+            end_prefixes: dict[bytes, bytes] = {}  # UTC offset -> end of window
+            pos = _first_line_from(mm, start_epoch)
+            while pos < size:
+                newline = mm.find(b"\n", pos)
+                stop = size if newline < 0 else newline
+                head = mm[pos : pos + _TIMESTAMP_WIDTH]
+                if _TIMESTAMP_PREFIX.match(head):
+                    offset = head[20:25]
+                    end_prefix = end_prefixes.get(offset)
+                    if end_prefix is None:
+                        end_prefix = end_prefixes[offset] = _timestamp_prefix(
+                            end_epoch, offset.decode()
+                        )
+                    if head[:19] > end_prefix:
+                        return
+                yield mm[pos:stop].decode("utf-8", errors="ignore")
+                pos = stop + 1
+
+
+def iter_lines_reversed(path: str) -> Iterator[str]:
+    """
+    Yield the lines of a file from last to first, without their newlines.
+
+    The file is memory-mapped and each line is located with a backwards search
+    from the previous one, so reading the newest N lines only touches the pages
+    that hold them, however large the file is.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mm:
+            end = size
+            # A trailing newline terminates the last line; it does not start a new one.
+            if mm[end - 1] == ord("\n"):
+                end -= 1
+            while end >= 0:
+                start = mm.rfind(b"\n", 0, end) + 1
+                yield mm[start:end].decode("utf-8", errors="ignore")
+                if start == 0:
+                    return
+                end = start - 1
@@ -0,0 +1,167 @@
+"""
+Backfill AAA statistics for a range of past days.
+
+    python scripts/backfill_statistics.py 2025-01-01 2025-12-31 --workers 8
+
+Every (log_type, date) log file is parsed in a worker process. The Counters
+stream back to this process as files finish and are bulk-upserted, and each
+written file is appended to a checkpoint so an interrupted run resumes where it
+stopped. At most 2 x workers files are in flight, so parsed Counters waiting to
+be written never pile up when the database is slower than the workers. Historical events are not forwarded to the SIEM.
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from datetime import date, timedelta
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import engine
+from app.crud.aaa_statistics import statistics_rows, upsert_statistics
+from scripts._log_stats_base import (
+    LOG_TYPES,
+    build_log_file_path,
+    count_log_file,
+    to_log_datetime,
+)
+
+_Parsed = tuple[str, date, tuple[Counter, Counter], int]
+
+
+def _parse_file(log_type: str, day: date, path: str) -> _Parsed:
+    """Worker: parse one log file."""
+    counters, lines_read = count_log_file(day, log_type, path)
+    return log_type, day, counters, lines_read
+
+
+def _checkpoint_key(log_type: str, day: date) -> str:
+    return f"{log_type} {day.isoformat()}"
+
+
+def _load_checkpoint(path: str) -> set[str]:
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def backfill(
+    start: date,
+    end: date,
+    log_types: list[str],
+    workers: int,
+    checkpoint: str,
+    node_name: str,
+) -> None:
+    done = _load_checkpoint(checkpoint)
+
+    tasks: list[tuple[str, date, str, int]] = []
+    day = start
+    while day <= end:
+        for log_type in log_types:
+            if _checkpoint_key(log_type, day) in done:
+                continue
+            path = build_log_file_path(day, log_type, settings.TACACS_LOG_DIRECTORY)
+            if os.path.exists(path):
+                tasks.append((log_type, day, path, os.path.getsize(path)))
+        day += timedelta(days=1)
+
+    total_bytes = sum(size for *_, size in tasks)
+    print(
+        f"Backfilling {len(tasks)} log files ({total_bytes / 1e6:.1f} MB) "
+        f"for node {node_name} with {workers} workers; "
+        f"{len(done)} files already done per {checkpoint}"
+    )
+    if not tasks:
+        return
+
+    started = time.monotonic()
+    lines_total = bytes_total = rows_total = 0
+    with (
+        ProcessPoolExecutor(max_workers=workers) as pool,
+        Session(engine) as session,
+        open(checkpoint, "a") as checkpoint_file,
+    ):
+        pending = iter(tasks)
+        futures: dict[Future[_Parsed], int] = {}
+        n = 0
+
+        def submit() -> None:
+            for log_type, day, path, size in pending:
+                futures[pool.submit(_parse_file, log_type, day, path)] = size
+                if len(futures) >= 2 * workers:
+                    return
+
+        submit()
+        while futures:
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            future = finished.pop()
+            size = futures.pop(future)
+            submit()
+            n += 1
+            log_type, day, counters, lines_read = future.result()
+            rows = statistics_rows(log_type, counters, to_log_datetime(day), node_name)
+            rows_total += upsert_statistics(session, log_type, rows)
+            checkpoint_file.write(_checkpoint_key(log_type, day) + "\n")
+            checkpoint_file.flush()
+
+            lines_total += lines_read
+            bytes_total += size
+            elapsed = max(time.monotonic() - started, 1e-6)
+            print(
+                f"[{n}/{len(tasks)}] {log_type} {day}: {lines_read} lines, "
+                f"{len(rows)} keys | {lines_total / elapsed:,.0f} lines/s, "
+                f"{bytes_total / elapsed / 1e6:.1f} MB/s"
+            )
+
+    elapsed = time.monotonic() - started
+    print(
+        f"\nDone: {len(tasks)} files, {lines_total} lines, {rows_total} rows "
+        f"in {elapsed:.1f}s"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Backfill AAA statistics from TACACS+ logs for a date range."
+    )
+    parser.add_argument("start", type=date.fromisoformat, help="first day, YYYY-MM-DD")
+    parser.add_argument(
+        "end",
+        type=date.fromisoformat,
+        nargs="?",
+        help="last day, YYYY-MM-DD (default: start)",
+    )
+    parser.add_argument(
+        "--log-types",
+        nargs="+",
+        choices=LOG_TYPES,
+        default=list(LOG_TYPES),
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--checkpoint",
+        default="backfill_statistics.checkpoint",
+        help="file recording completed (log_type, date) files",
+    )
+    parser.add_argument("--node-name", default=settings.NODE_NAME)
+    args = parser.parse_args()
+
+    end = args.end or args.start
+    if end < args.start:
+        parser.error("end must be on or after start")
+    backfill(
+        args.start, end, args.log_types, args.workers, args.checkpoint, args.node_name
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Compare the /aaa_statistics/range/ query plan against the per-table plan it replaced.
+
+    python scripts/benchmark_range_statistics.py --days 365 --repeat 5
+
+"raw" runs what the endpoint used to run against the raw statistics tables:
+three grouped daily queries and five top-N queries. "rollup" runs
+get_date_range_statistics(), which answers the same from the rollup tables in
+one statement. The range ends yesterday so that no live log parsing or peer
+fan-out is timed. Reports statements issued and median wall time of each plan.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from collections.abc import Callable
+from datetime import date, datetime, timedelta, timezone
+from typing import Any
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, func
+from sqlmodel import Session, select
+
+from app.core.db import engine
+from app.crud.aaa_statistics import STATISTICS_TABLES, get_date_range_statistics
+from scripts._log_stats_base import to_log_datetime
+
+# (log_type, key column, count column) of the top-N lists on the range page
+_TOP_LISTS = (
+    ("authentication", "username", "fail_count"),
+    ("authentication", "username", "success_count"),
+    ("authentication", "user_source_ip", "success_count"),
+    ("authentication", "nas_ip", "success_count"),
+    ("authorization", "username", "deny_count"),
+)
+
+
+def _raw_plan(
+    session: Session,
+    start: date,
+    end: date,
+    node_name: str | None,
+    _limit: int,  # the old plan fetched every key and sliced in Python
+) -> None:
+    start_dt, end_dt = to_log_datetime(start), to_log_datetime(end)
+    for model, first, second in STATISTICS_TABLES.values():
+        stmt = (
+            select(
+                model.log_date,
+                func.sum(getattr(model, first)),
+                func.sum(getattr(model, second)),
+            )
+            .where(model.log_date.between(start_dt, end_dt))
+            .group_by(model.log_date)
+        )
+        if node_name:
+            stmt = stmt.where(model.node_name == node_name)
+        session.exec(stmt).all()
+    for log_type, key, count in _TOP_LISTS:
+        model = STATISTICS_TABLES[log_type][0]
+        total = func.sum(getattr(model, count))
+        stmt = (
+            select(getattr(model, key), total)
+            .where(model.log_date.between(start_dt, end_dt))
+            .group_by(getattr(model, key))
+            .having(total > 0)
+            .order_by(total.desc())
+        )
+        if node_name:
+            stmt = stmt.where(model.node_name == node_name)
+        session.exec(stmt).all()
+
+
+def _rollup_plan(
+    session: Session, start: date, end: date, node_name: str | None, limit: int
+) -> None:
+    get_date_range_statistics(
+        session=session,
+        start_date=datetime.combine(start, datetime.min.time()),
+        end_date=datetime.combine(end, datetime.min.time()),
+        limit=limit,
+        node_name=node_name,
+    )
+
+
+def _measure(plan: Callable[..., None], repeat: int, *args: Any) -> tuple[int, float]:
+    statements = 0
+
+    def count(*_args: Any) -> None:
+        nonlocal statements
+        statements += 1
+
+    timings = []
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        for _ in range(repeat):
+            with Session(engine) as session:
+                started = time.perf_counter()
+                plan(session, *args)
+                timings.append(time.perf_counter() - started)
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return statements // repeat, statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the AAA statistics range query plans."
+    )
+    parser.add_argument("--days", type=int, default=365, help="range length")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=5, help="top-N list size")
+    parser.add_argument("--node-name", default=None, help="default: all nodes")
+    args = parser.parse_args()
+
+    end = datetime.now(timezone.utc).date() - timedelta(days=1)
+    start = end - timedelta(days=args.days - 1)
+    print(f"Range {start} .. {end}, node {args.node_name or 'all'}")
+    results = {}
+    for name, plan in (("raw", _raw_plan), ("rollup", _rollup_plan)):
+        results[name] = _measure(
+            plan, args.repeat, start, end, args.node_name, args.limit
+        )
+        statements, seconds = results[name]
+        print(f"{name:>6}: {statements} statements, {seconds * 1000:.1f} ms median")
+    speedup = results["raw"][1] / max(results["rollup"][1], 1e-9)
+    print(f"rollup plan is {speedup:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,12 +5,12 @@ from collections import Counter
 # Add the project root to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sqlmodel import Session, select
+from sqlmodel import Session
 
 from app.core.config import settings
 from app.core.db import engine
+from app.crud.aaa_statistics import statistics_rows, upsert_statistics
 from app.crud.tacacs_siem import forward_tacacs_event_to_siem
-from app.models import AccountingStatistics
 from scripts._log_stats_base import (
     get_target_date,
     parse_accounting_logs,
@@ -69,40 +69,10 @@ def save_statistics_to_db(
     """
     log_dt = to_log_datetime(summary_date)
     print("\nSaving accounting statistics to the database...")
+    rows = statistics_rows("accounting", (start_events, stop_events), log_dt, node_name)
     with Session(engine) as session:
-        for username, nas_ip, user_source_ip in sorted(all_keys):
-            key = (username, nas_ip, user_source_ip)
-            start_count = start_events.get(key, 0)
-            stop_count = stop_events.get(key, 0)
-
-            statement = select(AccountingStatistics).where(
-                AccountingStatistics.username == username,
-                AccountingStatistics.nas_ip == nas_ip,
-                AccountingStatistics.user_source_ip == user_source_ip,
-                AccountingStatistics.log_date == log_dt,
-                AccountingStatistics.node_name == node_name,
-            )
-            db_stat = session.exec(statement).first()
-
-            if db_stat:
-                print(f"Updating accounting stats for {username} on {nas_ip}")
-                db_stat.start_count = start_count
-                db_stat.stop_count = stop_count
-            else:
-                print(f"Creating new accounting stats for {username} on {nas_ip}")
-                db_stat = AccountingStatistics(
-                    username=username,
-                    nas_ip=nas_ip,
-                    user_source_ip=user_source_ip,
-                    start_count=start_count,
-                    stop_count=stop_count,
-                    log_date=log_dt,
-                    node_name=node_name,
-                )
-            session.add(db_stat)
-
-        session.commit()
-        print("\nAccounting statistics saved successfully.")
+        written = upsert_statistics(session, "accounting", rows)
+    print(f"\nAccounting statistics saved successfully ({written} rows).")
 
     if settings.SIEM_FORWARD_TACACS_EVENTS:
         ts = log_dt.timestamp()
@@ -5,12 +5,12 @@ from collections import Counter
 # Add the project root to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sqlmodel import Session, select
+from sqlmodel import Session
 
 from app.core.config import settings
 from app.core.db import engine
+from app.crud.aaa_statistics import statistics_rows, upsert_statistics
 from app.crud.tacacs_siem import forward_tacacs_event_to_siem
-from app.models import AuthenticationStatistics
 from scripts._log_stats_base import (
     get_target_date,
     parse_authentication_logs,
@@ -75,44 +75,12 @@ def save_statistics_to_db(
     """
     log_dt = to_log_datetime(summary_date)
     print("\nSaving authentication statistics to the database...")
+    rows = statistics_rows(
+        "authentication", (successful_logins, failed_logins), log_dt, node_name
+    )
     with Session(engine) as session:
-        for username, nas_ip, user_source_ip in sorted(all_keys):
-            key = (username, nas_ip, user_source_ip)
-            success_count = successful_logins.get(key, 0)
-            fail_count = failed_logins.get(key, 0)
-
-            statement = select(AuthenticationStatistics).where(
-                AuthenticationStatistics.username == username,
-                AuthenticationStatistics.nas_ip == nas_ip,
-                AuthenticationStatistics.user_source_ip == user_source_ip,
-                AuthenticationStatistics.log_date == log_dt,
-                AuthenticationStatistics.node_name == node_name,
-            )
-            db_stat = session.exec(statement).first()
-
-            if db_stat:
-                print(
-                    f"Updating stats for {username} on {nas_ip} from {user_source_ip}"
-                )
-                db_stat.success_count = success_count
-                db_stat.fail_count = fail_count
-            else:
-                print(
-                    f"Creating new stats for {username} on {nas_ip} from {user_source_ip}"
-                )
-                db_stat = AuthenticationStatistics(
-                    username=username,
-                    nas_ip=nas_ip,
-                    user_source_ip=user_source_ip,
-                    success_count=success_count,
-                    fail_count=fail_count,
-                    log_date=log_dt,
-                    node_name=node_name,
-                )
-            session.add(db_stat)
-
-        session.commit()
-        print("\nStatistics saved successfully.")
+        written = upsert_statistics(session, "authentication", rows)
+    print(f"\nStatistics saved successfully ({written} rows).")
 
     if settings.SIEM_FORWARD_TACACS_EVENTS:
         ts = log_dt.timestamp()
@@ -5,12 +5,12 @@ from collections import Counter
 # Add the project root to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sqlmodel import Session, select
+from sqlmodel import Session
 
 from app.core.config import settings
 from app.core.db import engine
+from app.crud.aaa_statistics import statistics_rows, upsert_statistics
 from app.crud.tacacs_siem import forward_tacacs_event_to_siem
-from app.models import AuthorizationStatistics
 from scripts._log_stats_base import (
     get_target_date,
     parse_authorization_logs,
@@ -75,40 +75,15 @@ def save_statistics_to_db(
     """
     log_dt = to_log_datetime(summary_date)
     print("\nSaving authorization statistics to the database...")
+    rows = statistics_rows(
+        "authorization",
+        (permitted_authorizations, denied_authorizations),
+        log_dt,
+        node_name,
+    )
     with Session(engine) as session:
-        for username, nas_ip, user_source_ip in sorted(all_keys):
-            key = (username, nas_ip, user_source_ip)
-            permit_count = permitted_authorizations.get(key, 0)
-            deny_count = denied_authorizations.get(key, 0)
-
-            statement = select(AuthorizationStatistics).where(
-                AuthorizationStatistics.username == username,
-                AuthorizationStatistics.nas_ip == nas_ip,
-                AuthorizationStatistics.user_source_ip == user_source_ip,
-                AuthorizationStatistics.log_date == log_dt,
-                AuthorizationStatistics.node_name == node_name,
-            )
-            db_stat = session.exec(statement).first()
-
-            if db_stat:
-                print(f"Updating authorization stats for {username} on {nas_ip}")
-                db_stat.permit_count = permit_count
-                db_stat.deny_count = deny_count
-            else:
-                print(f"Creating new authorization stats for {username} on {nas_ip}")
-                db_stat = AuthorizationStatistics(
-                    username=username,
-                    nas_ip=nas_ip,
-                    user_source_ip=user_source_ip,
-                    permit_count=permit_count,
-                    deny_count=deny_count,
-                    log_date=log_dt,
-                    node_name=node_name,
-                )
-            session.add(db_stat)
-
-        session.commit()
-        print("\nAuthorization statistics saved successfully.")
+        written = upsert_statistics(session, "authorization", rows)
+    print(f"\nAuthorization statistics saved successfully ({written} rows).")
 
     if settings.SIEM_FORWARD_TACACS_EVENTS:
         ts = log_dt.timestamp()
@@ -1,12 +1,19 @@
 from datetime import datetime, timezone
+from pathlib import Path
 from unittest.mock import patch
 from fastapi.testclient import TestClient
 from sqlmodel import Session, select
 
 from app.api.routes.sync import _get_or_create_ha_state
 from app.core.config import settings
+from app.crud.stats_transport import (
+    COLUMNAR_MEDIA_TYPE,
+    STATS_ACCEPT,
+    decode_stats_response,
+)
 from app.main import _seed_ha_config
 from app.models import HaPeerNode, HaState
+from scripts._log_stats_base import build_log_file_path
 
 
 def test_get_ha_info_primary(
@@ -137,3 +144,53 @@ def test_seed_ha_config_no_duplicate_peers(db: Session) -> None:
 
     peers = db.exec(select(HaPeerNode)).all()
     assert sum(1 for p in peers if p.url == "http://standby:8000") == 1
+
+
+def test_internal_collect_stats_levels_and_cursor(
+    client: TestClient, tmp_path: Path
+) -> None:
+    from app.crud.log_events import LogEventStore
+
+    today = datetime.now(timezone.utc).date()
+    ts = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S +0000")
+    line = f"{ts}\t10.0.0.1\talice\tvty0\t10.1.1.1\tprof permit shell show\n"
+    path = Path(build_log_file_path(today, "authorization", f"{tmp_path}/"))
+    path.parent.mkdir(parents=True)
+    path.write_text(line)
+    url = f"{settings.API_V1_STR}/sync/internal/collect-stats"
+    headers = {"X-Internal-Token": "secret"}
+
+    with (
+        patch("app.api.routes.sync.settings.INTERNAL_SYNC_TOKEN", "secret"),
+        patch("app.crud.log_events.event_store", LogEventStore(f"{tmp_path}/")),
+    ):
+        params = {"date": today.isoformat(), "log_types": "authorization"}
+        r = client.post(url, headers=headers, params={**params, "level": "totals"})
+        assert r.status_code == 200
+        data = r.json()
+        assert data["totals"] == {"authorization": {"permit_count": 1, "deny_count": 0}}
+        assert "authorization" not in data and "authentication" not in data["totals"]
+
+        first = client.post(url, headers=headers, params=params).json()
+        assert first["delta"] == {"authorization": False}
+        assert len(first["authorization"]) == 1
+
+        since = {**params, "since": first["cursor"]}
+        unchanged = client.post(url, headers=headers, params=since).json()
+        assert unchanged["authorization"] == []
+        with path.open("a") as f:
+            f.write(line.replace("alice", "bob"))
+        delta = client.post(url, headers=headers, params=since).json()
+        assert delta["delta"] == {"authorization": True}
+        assert [r["username"] for r in delta["authorization"]] == ["bob"]
+        assert delta["totals"]["authorization"]["permit_count"] == 2
+
+        r = client.post(
+            url, headers={**headers, "Accept": STATS_ACCEPT}, params=params
+        )
+        assert r.headers["content-type"] == COLUMNAR_MEDIA_TYPE
+        columnar = decode_stats_response(r)
+        assert sorted(r["username"] for r in columnar["authorization"]) == [
+            "alice",
+            "bob",
+        ]
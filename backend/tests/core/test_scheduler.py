@@ -0,0 +1,95 @@
+import asyncio
+import threading
+import time
+
+from app.core.scheduler import Scheduler
+
+
+def _run_for(scheduler: Scheduler, seconds: float) -> None:
+    async def main() -> None:
+        scheduler.start()
+        await asyncio.sleep(seconds)
+        await scheduler.stop()
+
+    asyncio.run(main())
+
+
+def test_jobs_run_off_the_event_loop_with_timing_metrics() -> None:
+    threads: list[str] = []
+    scheduler = Scheduler(lock_key=None)
+    job = scheduler.add_job(
+        "tick", lambda: threads.append(threading.current_thread().name), 0.05
+    )
+
+    _run_for(scheduler, 0.28)
+
+    assert job.stats.runs >= 3
+    assert job.stats.failures == 0
+    assert job.stats.last_duration is not None
+    assert all(name.startswith("scheduler") for name in threads)
+    assert scheduler.stats()["tick"]["runs"] == job.stats.runs
+
+
+def test_overrunning_job_never_overlaps_itself() -> None:
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def slow() -> None:
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.12)
+        with lock:
+            active -= 1
+
+    scheduler = Scheduler(lock_key=None)
+    job = scheduler.add_job("slow", slow, 0.05)
+
+    _run_for(scheduler, 0.4)
+
+    assert peak == 1
+    assert job.stats.runs >= 2
+    assert job.stats.skipped >= 2
+
+
+def test_failing_job_is_counted_and_keeps_its_schedule() -> None:
+    def boom() -> None:
+        raise RuntimeError("boom")
+
+    scheduler = Scheduler(lock_key=None)
+    job = scheduler.add_job("boom", boom, 0.05, initial_delay=0.02)
+
+    _run_for(scheduler, 0.2)
+
+    assert job.stats.runs >= 2
+    assert job.stats.failures == job.stats.runs
+
+
+def test_triggered_job_runs_per_trigger_and_is_rate_limited() -> None:
+    runs: list[float] = []
+
+    async def main() -> None:
+        fired = asyncio.Event()
+
+        async def trigger() -> None:
+            await fired.wait()
+            fired.clear()
+
+        scheduler = Scheduler(lock_key=None)
+        scheduler.add_job(
+            "on_change", lambda: runs.append(time.monotonic()), 0.5, trigger=trigger
+        )
+        scheduler.start()
+        await asyncio.sleep(0.1)
+        assert runs == []
+        for _ in range(5):  # a burst inside one rate-limit interval
+            fired.set()
+            await asyncio.sleep(0.02)
+        await asyncio.sleep(1.0)
+        await scheduler.stop()
+
+    asyncio.run(main())
+    assert len(runs) == 2
+    assert runs[1] - runs[0] >= 0.5
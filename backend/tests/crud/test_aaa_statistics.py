@@ -0,0 +1,102 @@
+from collections import Counter
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+import pytest
+from sqlmodel import Session, delete, select
+
+from app.crud import aaa_statistics
+from app.crud.aaa_statistics import statistics_rows
+from app.crud.log_events import LogEventStore
+from app.models import AuthorizationStatistics
+from scripts._log_stats_base import build_log_file_path
+
+_LOG_DATE = datetime(2026, 5, 4, tzinfo=timezone.utc)
+
+
+def test_statistics_rows_merges_both_counters() -> None:
+    permitted = Counter({("alice", "10.0.0.1", "10.1.1.1"): 3})
+    denied = Counter(
+        {("alice", "10.0.0.1", "10.1.1.1"): 1, ("bob", "10.0.0.2", "10.1.1.2"): 2}
+    )
+
+    rows = statistics_rows("authorization", (permitted, denied), _LOG_DATE, "node-a")
+
+    assert [(r["username"], r["permit_count"], r["deny_count"]) for r in rows] == [
+        ("alice", 3, 1),
+        ("bob", 0, 2),
+    ]
+    assert all(r["node_name"] == "node-a" and r["log_date"] == _LOG_DATE for r in rows)
+    assert len({r["id"] for r in rows}) == 2
+
+
+def test_collect_local_statistics_upserts_from_event_store(
+    db: Session, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    day = date(2020, 5, 4)
+    path = Path(build_log_file_path(day, "authorization", f"{tmp_path}/"))
+    path.parent.mkdir(parents=True)
+    path.write_text(
+        "2020-05-04 10:00:00 +0000\t10.0.0.1\talice\tvty0\t10.1.1.1\tprof permit shell show\n"
+        "2020-05-04 10:00:01 +0000\t10.0.0.1\talice\tvty0\t10.1.1.1\tprof deny shell conf\n"
+    )
+    monkeypatch.setattr(aaa_statistics, "event_store", LogEventStore(f"{tmp_path}/"))
+    where = (
+        AuthorizationStatistics.node_name == "test-collect",
+        AuthorizationStatistics.log_date == _LOG_DATE.replace(year=2020),
+    )
+
+    for _ in range(2):  # re-running overwrites instead of duplicating
+        results = aaa_statistics.collect_local_statistics(
+            db, day, node_name="test-collect", log_types=["authorization"]
+        )
+    assert results == {"authorization": {"events": 2, "rows": 1}}
+
+    stored = db.exec(select(AuthorizationStatistics).where(*where)).all()
+    assert [(s.username, s.permit_count, s.deny_count) for s in stored] == [
+        ("alice", 1, 1)
+    ]
+    db.exec(delete(AuthorizationStatistics).where(*where))
+    db.commit()
+
+
+def test_peer_statistics_rows_take_node_and_parse_dates() -> None:
+    payload = [
+        {
+            "username": "carol",
+            "nas_ip": "10.0.0.3",
+            "user_source_ip": "10.1.1.3",
+            "start_count": 5,
+            "stop_count": 4,
+            "log_date": _LOG_DATE.isoformat(),
+        }
+    ]
+
+    (row,) = aaa_statistics.peer_statistics_rows("accounting", payload, "node-b")
+
+    assert row["log_date"] == _LOG_DATE
+    assert (row["node_name"], row["start_count"], row["stop_count"]) == ("node-b", 5, 4)
+
+
+def test_upsert_statistics_chunks_and_dedupes_keys(db: Session) -> None:
+    where = AuthorizationStatistics.node_name == "test-upsert"
+    counters = (
+        Counter({("u1", "10.0.0.1", "10.1.1.1"): 1, ("u2", "10.0.0.1", "10.1.1.1"): 2}),
+        Counter({("u3", "10.0.0.1", "10.1.1.1"): 3}),
+    )
+    rows = statistics_rows("authorization", counters, _LOG_DATE, "test-upsert")
+    stale = dict(rows[0], permit_count=99)
+
+    written = aaa_statistics.upsert_statistics(
+        db, "authorization", [stale, *rows], chunk_size=2
+    )
+
+    assert written == 3
+    stored = db.exec(select(AuthorizationStatistics).where(where)).all()
+    assert sorted((s.username, s.permit_count, s.deny_count) for s in stored) == [
+        ("u1", 1, 0),
+        ("u2", 2, 0),
+        ("u3", 0, 3),
+    ]
+    db.exec(delete(AuthorizationStatistics).where(where))
+    db.commit()
@@ -0,0 +1,79 @@
+from collections import Counter
+from datetime import date
+
+from sqlmodel import Session, delete
+
+from app.crud import aaa_statistics
+from app.crud.alert_baselines import BaselineCache
+from app.models import (
+    AaaStatisticsKeyRollup,
+    AaaStatisticsNode,
+    AaaStatisticsNodeDaily,
+    AuthenticationStatistics,
+)
+from scripts._log_stats_base import to_log_datetime
+
+_NODE = "test-baseline"
+
+
+def _write(db: Session, day: date, username: str, source_ip: str) -> None:
+    counts = Counter({(username, "10.0.0.1", source_ip): 1})
+    rows = aaa_statistics.statistics_rows(
+        "authentication", (counts, Counter()), to_log_datetime(day), _NODE
+    )
+    aaa_statistics.upsert_statistics(db, "authentication", rows)
+
+
+def _cleanup(db: Session) -> None:
+    for model in (
+        AuthenticationStatistics,
+        AaaStatisticsNodeDaily,
+        AaaStatisticsKeyRollup,
+        AaaStatisticsNode,
+    ):
+        db.exec(delete(model).where(model.node_name == _NODE))
+    db.commit()
+
+
+def test_baseline_covers_previous_days_and_loads_once_per_day(db: Session) -> None:
+    _write(db, date(2021, 8, 20), "baseline-old", "10.9.0.1")  # before the window
+    _write(db, date(2021, 8, 31), "baseline-edge", "10.9.0.2")
+    for day in range(1, 30):
+        _write(db, date(2021, 9, day), "baseline-sep", "10.9.0.3")
+    _write(db, date(2021, 9, 30), "baseline-today", "10.9.0.4")
+
+    cache = BaselineCache(days=30)
+    usernames = cache.get(db, "username", date(2021, 9, 30))
+    assert {"baseline-edge", "baseline-sep"} <= usernames
+    assert "baseline-old" not in usernames
+    assert "baseline-today" not in usernames
+    ips = cache.get(db, "user_source_ip", date(2021, 9, 30))
+    assert {"10.9.0.2", "10.9.0.3"} <= ips
+    assert "10.9.0.4" not in ips
+
+    # Written after the day's load: not seen until the next day.
+    _write(db, date(2021, 9, 29), "baseline-late", "10.9.0.5")
+    assert "baseline-late" not in cache.get(db, "username", date(2021, 9, 30))
+    assert "baseline-late" in cache.get(db, "username", date(2021, 10, 1))
+
+    _cleanup(db)
+
+
+def test_report_new_reports_each_value_once_per_day(db: Session) -> None:
+    _write(db, date(2021, 9, 29), "baseline-known", "10.9.1.1")
+    cache = BaselineCache(days=30)
+    today = date(2021, 9, 30)
+    seen = {"baseline-known", "baseline-new"}
+
+    assert cache.report_new(db, 1, "username", seen, today) == {"baseline-new"}
+    # Fired once: not reported again after the cooldown, but another rule sees it.
+    assert cache.report_new(db, 1, "username", seen, today) == set()
+    assert cache.report_new(db, 2, "username", seen, today) == {"baseline-new"}
+    assert cache.report_new(
+        db, 1, "username", seen | {"baseline-newer"}, today
+    ) == {"baseline-newer"}
+    assert cache.report_new(db, 1, "username", seen, date(2021, 10, 1)) == {
+        "baseline-new"
+    }
+
+    _cleanup(db)
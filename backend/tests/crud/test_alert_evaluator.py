@@ -1,8 +1,8 @@
 import uuid
-from datetime import datetime, timedelta, timezone
+from collections import Counter
 from unittest.mock import patch
 
-from app.crud.alert_evaluator import _check_auth_stats, _format_body
+from app.crud.alert_evaluator import EvaluationPlan, Grouping, _format_body
 from app.models import AlertRule
 
 
@@ -22,24 +22,47 @@ def _make_rule(**overrides) -> AlertRule:
     return AlertRule(**defaults)
 
 
+def _auth(result: str, username: str, client_ip: str, nas_ip: str = "10.1.1.1"):
+    return (result, username, nas_ip, client_ip, None)
+
+
+_FIELD_INDEX = {"username": 1, "nas_ip": 2, "client_ip": 3, "command": 4}
+
+
+def _window_counts(events: Counter):
+    """
+    Stand-in for the evaluator's _window_counts: projects events keyed by
+    (result, username, nas_ip, client_ip, command) onto (result, field value).
+    """
+
+    def window_counts(_log_type, field, _start, _now) -> Counter:
+        counts: Counter = Counter()
+        for key, n in events.items():
+            counts[(key[0], key[_FIELD_INDEX[field]] if field else None)] += n
+        return counts
+
+    return window_counts
+
+
+def _evaluate(rule: AlertRule, window: Counter) -> tuple[bool, dict]:
+    with patch(
+        "app.crud.alert_evaluator._window_counts", side_effect=_window_counts(window)
+    ):
+        return EvaluationPlan([rule]).evaluate(rule, session=None)
+
+
 class TestClientIpFailThreshold:
     def test_triggers_and_includes_offending_ip(self) -> None:
         rule = _make_rule()
-        now = datetime.now(timezone.utc)
-        window_start = now - timedelta(minutes=rule.time_window_minutes)
+        window = Counter(
+            {
+                _auth("failed", "alice", "10.0.0.5"): 4,
+                _auth("failed", "bob", "10.0.0.9"): 1,
+                _auth("success", "bob", "10.0.0.5"): 7,
+            }
+        )
 
-        fail_by_user = {"alice": 4, "bob": 1}
-        fail_by_ip = {"10.0.0.5": 4, "10.0.0.9": 1}
-        seen_usernames = {"alice", "bob"}
-        seen_ips = {"10.0.0.5", "10.0.0.9"}
-
-        with patch(
-            "app.crud.alert_evaluator._parse_auth_log",
-            return_value=(fail_by_user, fail_by_ip, seen_usernames, seen_ips),
-        ):
-            triggered, payload = _check_auth_stats(
-                rule=rule, session=None, window_start=window_start, now=now
-            )
+        triggered, payload = _evaluate(rule, window)
 
         assert triggered is True
         assert payload["ip"] == "10.0.0.5"
@@ -48,34 +71,25 @@ class TestClientIpFailThreshold:
 
     def test_does_not_trigger_below_threshold(self) -> None:
         rule = _make_rule(threshold=10)
-        now = datetime.now(timezone.utc)
-        window_start = now - timedelta(minutes=rule.time_window_minutes)
 
-        with patch(
-            "app.crud.alert_evaluator._parse_auth_log",
-            return_value=({}, {"10.0.0.5": 4}, set(), {"10.0.0.5"}),
-        ):
-            triggered, payload = _check_auth_stats(
-                rule=rule, session=None, window_start=window_start, now=now
-            )
+        triggered, payload = _evaluate(
+            rule, Counter({_auth("failed", "alice", "10.0.0.5"): 4})
+        )
 
         assert triggered is False
         assert payload == {}
 
     def test_multiple_offending_ips_sorted_by_fail_count(self) -> None:
         rule = _make_rule(threshold=2)
-        now = datetime.now(timezone.utc)
-        window_start = now - timedelta(minutes=rule.time_window_minutes)
-
-        fail_by_ip = {"10.0.0.1": 3, "10.0.0.2": 9, "10.0.0.3": 1}
+        window = Counter(
+            {
+                _auth("failed", "alice", "10.0.0.1"): 3,
+                _auth("failed", "alice", "10.0.0.2"): 9,
+                _auth("failed", "alice", "10.0.0.3"): 1,
+            }
+        )
 
-        with patch(
-            "app.crud.alert_evaluator._parse_auth_log",
-            return_value=({}, fail_by_ip, set(), set(fail_by_ip)),
-        ):
-            triggered, payload = _check_auth_stats(
-                rule=rule, session=None, window_start=window_start, now=now
-            )
+        triggered, payload = _evaluate(rule, window)
 
         assert triggered is True
         assert payload["ip"] == "10.0.0.2"
@@ -97,3 +111,79 @@ class TestClientIpFailThreshold:
         assert "10.0.0.5 (4 fails)" in body
         # the raw "ip" field is webhook-only, not duplicated in the human-readable body
         assert body.count("10.0.0.5") == 1
+
+
+class TestGroupedThresholds:
+    def test_authz_denies_per_username_nas_and_command(self) -> None:
+        window = Counter(
+            {
+                ("deny", "alice", "10.1.1.1", "10.0.0.5", "reload"): 4,
+                ("deny", "alice", "10.1.1.2", "10.0.0.5", "configure"): 2,
+                ("deny", "bob", "10.1.1.1", "10.0.0.6", "reload"): 1,
+                ("permit", "bob", "10.1.1.2", "10.0.0.6", "show"): 50,
+                ("deny", "carol", "10.1.1.2", "10.0.0.7", None): 1,
+            }
+        )
+        expected = {
+            "username": ("triggered_usernames", [("alice", 6)]),
+            "nas_ip": ("triggered_nas_ips", [("10.1.1.1", 5)]),
+            "command": ("triggered_commands", [("reload", 5)]),
+        }
+        for field, (list_key, matches) in expected.items():
+            rule = _make_rule(log_type="authz", condition_field=field, threshold=4)
+            triggered, payload = _evaluate(rule, window)
+            assert triggered is True, field
+            assert [
+                (item[field], item["deny_count"]) for item in payload[list_key]
+            ] == matches
+
+    def test_authz_total_denies(self) -> None:
+        rule = _make_rule(log_type="authz", condition_field="deny_count", threshold=5)
+        window = Counter(
+            {
+                ("deny", "alice", "10.1.1.1", "10.0.0.5", "reload"): 4,
+                ("deny", "bob", "10.1.1.1", "10.0.0.6", "reload"): 2,
+                ("permit", "bob", "10.1.1.1", "10.0.0.6", "show"): 9,
+            }
+        )
+        triggered, payload = _evaluate(rule, window)
+        assert triggered is True
+        assert payload["deny_count"] == 6
+
+    def test_rules_sharing_a_grouping_read_it_once(self) -> None:
+        rules = [
+            _make_rule(condition_field="client_ip", threshold=3),
+            _make_rule(condition_field="client_ip", threshold=1),
+            _make_rule(condition_field="username", threshold=3),
+            _make_rule(condition_field="fail_count", threshold=3),
+            _make_rule(condition_field="nas_ip", threshold=3, time_window_minutes=60),
+        ]
+        window = Counter({_auth("failed", "alice", "10.0.0.5"): 4})
+        with patch(
+            "app.crud.alert_evaluator._window_counts",
+            side_effect=_window_counts(window),
+        ) as window_counts:
+            plan = EvaluationPlan(rules)
+            results = [plan.evaluate(rule, session=None)[0] for rule in rules]
+
+        assert results == [True] * 5
+        assert plan.groupings == {
+            Grouping("auth", 10, "client_ip"),
+            Grouping("auth", 10, "username"),
+            Grouping("auth", 10, None),
+            Grouping("auth", 60, "nas_ip"),
+        }
+        assert window_counts.call_count == 4  # one read per grouping
+
+    def test_body_formats_denies_per_username(self) -> None:
+        rule = _make_rule(log_type="authz", condition_field="username")
+        payload = {
+            "triggered_usernames": [{"username": "alice", "deny_count": 6}],
+            "username": "alice",
+            "deny_count": 6,
+            "window_minutes": 10,
+            "rule": rule.name,
+        }
+        body = _format_body(rule=rule, payload=payload)
+        assert "alice (6 denies)" in body
+        assert body.count("alice") == 1
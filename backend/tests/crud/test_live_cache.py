@@ -0,0 +1,89 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from app.crud.live_cache import LiveCache
+
+
+def test_missing_value_is_computed_once_for_concurrent_callers(tmp_path: Path) -> None:
+    cache = LiveCache(str(tmp_path / "cache.sqlite3"))
+    calls: list[int] = []
+
+    def compute() -> dict:
+        calls.append(1)
+        time.sleep(0.2)
+        return {"permit": 3, "deny": (1, 2)}
+
+    results: list = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get("k", compute, 60)))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    # Every caller sees the JSON form, the computing one included.
+    assert results == [{"permit": 3, "deny": [1, 2]}] * 8
+
+
+def test_stale_value_is_served_while_one_refresh_runs(tmp_path: Path) -> None:
+    cache = LiveCache(str(tmp_path / "cache.sqlite3"))
+    assert cache.get("k", lambda: 1, 0.1) == 1
+    time.sleep(0.15)
+
+    started = threading.Event()
+    release = threading.Event()
+    calls: list[int] = []
+
+    def slow() -> int:
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 2
+
+    assert cache.get("k", slow, 0.1) == 1
+    assert started.wait(5)
+    # The refresh holds the lease: later callers get the stale value and do not
+    # start another one.
+    assert cache.get("k", slow, 0.1) == 1
+    assert len(calls) == 1
+
+    release.set()
+    deadline = time.monotonic() + 5
+    while cache.get("k", slow, 60) != 2:
+        assert time.monotonic() < deadline
+        time.sleep(0.02)
+    assert len(calls) == 1
+
+
+def test_shared_between_instances_and_invalidate(tmp_path: Path) -> None:
+    path = str(tmp_path / "cache.sqlite3")
+    first, second = LiveCache(path), LiveCache(path)
+    assert first.get("k", lambda: "a", 60) == "a"
+    assert second.get("k", lambda: "b", 60) == "a"
+
+    second.invalidate("k")
+    assert first.get("k", lambda: "c", 60) == "c"
+
+
+def test_failed_compute_releases_the_lease(tmp_path: Path) -> None:
+    cache = LiveCache(str(tmp_path / "cache.sqlite3"))
+
+    def boom() -> int:
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        cache.get("k", boom, 60)
+    assert cache.get("k", lambda: 5, 60) == 5
+
+
+def test_unusable_path_falls_back_to_compute(tmp_path: Path) -> None:
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    cache = LiveCache(str(blocker / "cache.sqlite3"))
+    assert cache.get("k", lambda: 7, 60) == 7
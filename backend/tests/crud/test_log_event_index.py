@@ -0,0 +1,93 @@
+from datetime import date
+from pathlib import Path
+
+from app.crud.log_event_index import EventFilter, LogEventIndex, page_events
+from app.crud.log_events import LogEventStore
+from scripts._log_stats_base import build_log_file_path
+
+_DAY = date(2020, 5, 4)
+_LINES = (
+    "2020-05-04 10:00:00 +0000\t10.0.0.1\talice\tvty0\t10.1.1.1\tprof permit shell show version\n"
+    "2020-05-04 10:00:01 +0000\t10.0.0.2\tbob\tvty1\t10.1.1.2\tprof deny shell configure\n"
+    "2020-05-04 10:00:02 +0000\t10.0.0.1\talice\tvty0\t10.1.1.1\tprof permit shell show version\n"
+)
+
+
+def _index(tmp_path: Path) -> LogEventIndex:
+    log_dir = tmp_path / "logs"
+    path = Path(build_log_file_path(_DAY, "authorization", f"{log_dir}/"))
+    path.parent.mkdir(parents=True)
+    path.write_text(_LINES)
+    return LogEventIndex(LogEventStore(f"{log_dir}/"), str(tmp_path / "index"))
+
+
+def test_index_is_built_once_and_memory_mapped(tmp_path: Path) -> None:
+    index = _index(tmp_path)
+    frame = index.frame("authorization", _DAY)
+    assert len(frame) == 3
+    assert (tmp_path / "index/2020/05/authorization-2020-05-04/meta.json").exists()
+
+    # A fresh process (no in-memory cache) loads the .npy files instead of parsing.
+    reloaded = LogEventIndex(index.store, str(tmp_path / "index"))
+    frame = reloaded.frame("authorization", _DAY)
+    assert frame.epoch.__class__.__name__ == "memmap"
+    assert frame.event(1).username == "bob"
+    assert reloaded.result_counts("authorization", _DAY) == {"permit": 2, "deny": 1}
+
+
+def test_index_is_rebuilt_when_source_changes(tmp_path: Path) -> None:
+    index = _index(tmp_path)
+    assert len(index.frame("authorization", _DAY)) == 3
+
+    path = build_log_file_path(_DAY, "authorization", index.store.log_directory)
+    with open(path, "a") as f:
+        f.write(_LINES)
+    assert len(index.frame("authorization", _DAY)) == 6
+
+
+def test_page_events_filters_and_orders_newest_first(tmp_path: Path) -> None:
+    frame = _index(tmp_path).frame("authorization", _DAY)
+
+    count, page = page_events([frame], EventFilter(), skip=0, limit=2)
+    assert count == 3
+    assert [e.timestamp[-14:-6] for e in page] == ["10:00:02", "10:00:01"]
+
+    count, page = page_events([frame], EventFilter(username="ALI"), skip=1, limit=5)
+    assert count == 2
+    assert [e.timestamp[-14:-6] for e in page] == ["10:00:00"]
+
+    count, page = page_events([frame], EventFilter(search="configure"), 0, 20)
+    assert count == 1
+    assert page[0].result == "deny"
+    assert page_events([frame], EventFilter(result="permit"), 0, 20)[0] == 2
+    assert page_events([frame], EventFilter(nas_ip="10.0.0.9"), 0, 20) == (0, [])
+
+
+def test_page_events_merges_frames_by_time(tmp_path: Path) -> None:
+    index = _index(tmp_path)
+    acct = Path(build_log_file_path(_DAY, "accounting", index.store.log_directory))
+    acct.write_text(
+        # Out of order on purpose: the merge must still emit newest first.
+        "2020-05-04 10:00:03 +0000\t10.0.0.1\talice\tvty0\t10.1.1.1\tstop shell exit\n"
+        "2020-05-04 09:59:59 +0000\t10.0.0.1\talice\tvty0\t10.1.1.1\tstart shell\n"
+        "2020-05-04 10:00:01 +0000\t10.0.0.1\talice\tvty0\t10.1.1.1\tstop shell\n"
+    )
+    frames = [
+        index.frame("authorization", _DAY),
+        index.frame("accounting", _DAY),
+    ]
+    assert not frames[1].ordered
+
+    count, page = page_events(frames, EventFilter(), skip=0, limit=20)
+    assert count == 6
+    assert [(e.timestamp[11:19], e.log_type[:4]) for e in page] == [
+        ("10:00:03", "acco"),
+        ("10:00:02", "auth"),
+        ("10:00:01", "auth"),
+        ("10:00:01", "acco"),
+        ("10:00:00", "auth"),
+        ("09:59:59", "acco"),
+    ]
+    count, page = page_events(frames, EventFilter(result="stop"), skip=1, limit=1)
+    assert count == 2
+    assert page[0].timestamp[11:19] == "10:00:01"
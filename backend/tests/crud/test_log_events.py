@@ -0,0 +1,182 @@
+import os
+from collections import Counter
+from datetime import datetime, time, timedelta, timezone
+from pathlib import Path
+
+from app.crud.log_events import LogEventStore
+from scripts._log_stats_base import _parse_log_counters, build_log_file_path
+
+_PERMIT = "{ts}\t10.0.0.1\talice\tvty0\t10.1.1.1\tprof permit shell show version\n"
+_DENY = "{ts}\t10.0.0.1\tbob\tvty1\t10.1.1.2\tprof deny shell configure\n"
+
+
+def _today_lines(*templates: str, second: int = 0) -> str:
+    ts = (
+        datetime.now(timezone.utc)
+        .replace(second=second)
+        .strftime("%Y-%m-%d %H:%M:%S +0000")
+    )
+    return "".join(t.format(ts=ts) for t in templates)
+
+
+def _store(log_dir: Path) -> tuple[LogEventStore, Path]:
+    today = datetime.now(timezone.utc).date()
+    path = Path(build_log_file_path(today, "authorization", f"{log_dir}/"))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return LogEventStore(f"{log_dir}/"), path
+
+
+def test_store_counts_only_appended_lines(tmp_path: Path) -> None:
+    store, path = _store(tmp_path)
+    today = datetime.now(timezone.utc).date()
+    path.write_text(_today_lines(_PERMIT, _DENY))
+
+    permitted, denied = store.counters("authorization", today)
+    assert (sum(permitted.values()), sum(denied.values())) == (1, 1)
+
+    with path.open("a") as f:
+        f.write(_today_lines(_PERMIT, "garbage line\n"))
+    events = store.columns("authorization", today)
+    assert len(events) == 3
+    assert events.result(2) == "permit"
+    assert events.command(2) == "show version"
+    assert store.counters("authorization", today) == _parse_log_counters(
+        today, "authorization", f"{tmp_path}/"
+    )
+    # Repeated messages share one dictionary entry.
+    assert len(events.message.values) == 2
+
+
+def test_store_resets_on_rotation(tmp_path: Path) -> None:
+    store, path = _store(tmp_path)
+    today = datetime.now(timezone.utc).date()
+    path.write_text(_today_lines(_PERMIT, _PERMIT, _PERMIT))
+    assert store.result_counts("authorization", today)["permit"] == 3
+
+    os.rename(path, path.with_suffix(".old"))
+    path.write_text(_today_lines(_DENY))
+    assert store.result_counts("authorization", today) == {"deny": 1}
+    assert store.segment("authorization", today).generation == 1
+
+
+def test_rows_between_uses_timestamp_window(tmp_path: Path) -> None:
+    store, path = _store(tmp_path)
+    today = datetime.now(timezone.utc).date()
+    path.write_text(
+        _today_lines(_PERMIT, second=0)
+        + _today_lines(_DENY, second=30)
+        + _today_lines(_PERMIT, second=59)
+    )
+    events = store.columns("authorization", today)
+    first = events.epoch(0)
+    assert list(events.rows_between(first + 1, first + 30)) == [1]
+    assert list(events.rows_between(first, first + 59)) == [0, 1, 2]
+
+
+def test_changes_since_cursor_return_only_touched_keys(tmp_path: Path) -> None:
+    store, path = _store(tmp_path)
+    today = datetime.now(timezone.utc).date()
+    path.write_text(_today_lines(_PERMIT, _DENY))
+
+    full = store.changes("authorization", today)
+    assert not full.delta
+    assert full.totals == (1, 1)
+    assert len(full.counters[0]) == len(full.counters[1]) == 1
+
+    with path.open("a") as f:
+        f.write(_today_lines(_PERMIT))
+    changes = store.changes("authorization", today, full.cursor)
+    assert changes.delta
+    assert changes.totals == (2, 1)
+    assert changes.counters == ({("alice", "10.0.0.1", "10.1.1.1"): 2}, {})
+
+    unchanged = store.changes("authorization", today, changes.cursor)
+    assert unchanged.delta and unchanged.counters == ({}, {})
+
+    # A cursor from another segment (or process) falls back to every key.
+    other = LogEventStore(f"{tmp_path}/").changes("authorization", today, full.cursor)
+    assert not other.delta and other.totals == (2, 1)
+
+
+def test_window_counts_match_a_row_by_row_count(tmp_path: Path) -> None:
+    store, path = _store(tmp_path)
+    today = datetime.now(timezone.utc).date()
+    base = datetime.combine(today, time(1, 0), tzinfo=timezone.utc)
+    lines = []
+    for offset in range(0, 300, 7):  # five minutes, one event every 7 s
+        ts = (base + timedelta(seconds=offset)).strftime("%Y-%m-%d %H:%M:%S +0000")
+        lines.append((_DENY if offset % 3 else _PERMIT).format(ts=ts))
+    path.write_text("".join(lines))
+    events = store.columns("authorization", today)
+
+    start = base.timestamp()
+    for field in (None, "username", "command"):
+        for lo, hi in [(0, 299), (13, 250), (61, 119), (20, 40), (45, 45), (300, 400)]:
+            expected: Counter = Counter()
+            for row in events.rows_between(start + lo, start + hi):
+                expected[(events.result(row), events.value(field, row))] += 1
+            counts = store.window_counts(
+                "authorization", today, field, start + lo, start + hi
+            )
+            assert counts == expected, (field, lo, hi)
+    assert set(events.minutes) == {None, "username", "command"}
+
+
+def test_window_buckets_cover_only_the_longest_window(tmp_path: Path) -> None:
+    store, path = _store(tmp_path)
+    today = datetime.now(timezone.utc).date()
+    base = datetime.combine(today, time(1, 0), tzinfo=timezone.utc)
+    lines = []
+    for offset in range(0, 600, 5):  # ten minutes
+        ts = (base + timedelta(seconds=offset)).strftime("%Y-%m-%d %H:%M:%S +0000")
+        lines.append((_DENY if offset % 3 else _PERMIT).format(ts=ts))
+    path.write_text("".join(lines))
+    start = base.timestamp()
+
+    store.window_counts("authorization", today, "username", start + 480, start + 599)
+    events = store.columns("authorization", today)
+    assert events.bucket_minutes == 2
+    assert min(events.minutes["username"]) >= start // 60 + 6
+
+    # A longer window still counts exactly: the minutes before the buckets are
+    # counted row by row.
+    expected: Counter = Counter()
+    for row in events.rows_between(start, start + 599):
+        expected[(events.result(row), events.username[row])] += 1
+    assert events.window_counts("username", start, start + 599) == expected
+
+    with path.open("a") as f:
+        ts = (base + timedelta(seconds=900)).strftime("%Y-%m-%d %H:%M:%S +0000")
+        f.write(_PERMIT.format(ts=ts))
+    store.columns("authorization", today)
+    assert min(events.minutes["username"]) >= start // 60 + 12
+
+
+def test_running_window_matches_a_row_by_row_count(tmp_path: Path) -> None:
+    store, path = _store(tmp_path)
+    today = datetime.now(timezone.utc).date()
+    base = datetime.combine(today, time(1, 0), tzinfo=timezone.utc)
+    start = base.timestamp()
+
+    def lines(first: int, last: int) -> str:
+        out = []
+        for offset in range(first, last, 4):
+            ts = (base + timedelta(seconds=offset)).strftime("%Y-%m-%d %H:%M:%S +0000")
+            out.append((_DENY if offset % 3 else _PERMIT).format(ts=ts))
+        return "".join(out)
+
+    path.write_text(lines(0, 400))
+    written = 400
+    for end in range(300, 1500, 23):
+        # New lines arrive between queries, a few stamped after the window end.
+        with path.open("a") as f:
+            f.write(lines(written, end + 30))
+        written = end + 30
+        lo, hi = start + end - 300 + 0.5, start + end + 0.5
+        counts = store.window_counts("authorization", today, "username", lo, hi)
+        events = store.columns("authorization", today)
+        expected: Counter = Counter()
+        for row in events.rows_between(lo, hi):
+            expected[(events.result(row), events.username[row])] += 1
+        assert counts == expected, end
+    assert set(events.windows) == {("username", 5)}
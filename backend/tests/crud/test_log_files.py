@@ -0,0 +1,51 @@
+import gzip
+from pathlib import Path
+
+from app.crud import log_files
+from app.crud.log_files import read_line_range, search_line_range, stream_log_file
+
+
+def _write_lines(path: Path, n: int, trailing_newline: bool = True) -> list[str]:
+    lines = [f"line {i} {'deny' if i % 7 == 0 else 'permit'}" for i in range(n)]
+    path.write_text("\n".join(lines) + ("\n" if trailing_newline else ""))
+    return lines
+
+
+def test_read_line_range_uses_sparse_index(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(log_files, "_LINE_INDEX_STRIDE", 10)
+    path = tmp_path / "a.log"
+    lines = _write_lines(path, 95)
+
+    text, total = read_line_range(str(path), 42, 3)
+    assert total == 95
+    assert text == "".join(f"{line}\n" for line in lines[42:45])
+    assert read_line_range(str(path), 93, None)[0] == f"{lines[93]}\n{lines[94]}\n"
+    assert read_line_range(str(path), 500, 5) == ("", 95)
+
+    # Appended lines are indexed incrementally; an unterminated last line counts.
+    with path.open("a") as f:
+        f.write("tail without newline")
+    text, total = read_line_range(str(path), 95, 10)
+    assert (text, total) == ("tail without newline", 96)
+
+
+def test_search_line_range_pages_matches(tmp_path: Path) -> None:
+    path = tmp_path / "a.log"
+    lines = _write_lines(path, 50)
+    deny = [line for line in lines if "deny" in line]
+
+    text, total = search_line_range(str(path), "DENY", 1, 2)
+    assert total == len(deny)
+    assert text == f"{deny[1]}\n{deny[2]}\n"
+
+
+def test_stream_log_file_gzip(tmp_path: Path) -> None:
+    path = tmp_path / "a.log"
+    lines = _write_lines(path, 30, trailing_newline=False)
+
+    raw = b"".join(stream_log_file(str(path)))
+    assert raw.decode() == "\n".join(lines)
+    compressed = b"".join(stream_log_file(str(path), search="deny", compress=True))
+    assert gzip.decompress(compressed).decode() == "".join(
+        f"{line}\n" for line in lines if "deny" in line
+    )
@@ -0,0 +1,72 @@
+from datetime import date, datetime
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
+
+from sqlmodel import Session, delete
+
+from app.crud import log_summaries
+from app.models import TacacsLogDailyTotals
+
+_DAY = date(2020, 1, 2)
+
+
+def test_summary_from_stats_and_add() -> None:
+    node = log_summaries.summary_from_stats([(3, 1), (2, 0)], [(5, 2)], [])
+    assert node["authentication"].success == 5
+    assert node["authentication"].failed == 1
+    assert node["authentication"].total == 6
+    assert node["authorization"].deny == 2
+    assert node["accounting"].total == 0
+
+    total = log_summaries.empty_summary()
+    log_summaries.add_summary(total, node)
+    log_summaries.add_summary(total, node)
+    assert total["authorization"].total == 14
+
+
+def test_daily_totals_round_trip(db: Session) -> None:
+    db.exec(delete(TacacsLogDailyTotals).where(TacacsLogDailyTotals.log_date == _DAY))
+    node = log_summaries.summary_from_stats([(4, 1)], [(7, 0)], [(1, 1)])
+    log_summaries.save_daily_totals(db, _DAY, "node-a", node)
+    # Saving again overwrites instead of duplicating the (date, node, log_type) key.
+    log_summaries.save_daily_totals(db, _DAY, "node-a", node)
+
+    stored = log_summaries.get_daily_totals(db, _DAY)
+    assert set(stored) == {"node-a"}
+    assert stored["node-a"]["authentication"].total == 5
+    assert stored["node-a"]["authorization"].permit == 7
+
+    db.exec(delete(TacacsLogDailyTotals).where(TacacsLogDailyTotals.log_date == _DAY))
+    db.commit()
+
+
+def test_day_closes_at_local_midnight_plus_grace() -> None:
+    tz = ZoneInfo("America/New_York")  # UTC-5 in January
+    with patch("app.crud.log_summaries._get_local_tz", return_value=tz):
+        # Already the next day in UTC, but the local file is still written.
+        utc = ZoneInfo("UTC")
+        assert not log_summaries.is_closed(_DAY, datetime(2020, 1, 3, 3, 0, tzinfo=utc))
+        assert not log_summaries.is_closed(_DAY, datetime(2020, 1, 3, 0, 5, tzinfo=tz))
+        assert log_summaries.is_closed(_DAY, datetime(2020, 1, 3, 0, 20, tzinfo=tz))
+
+
+def test_local_totals_are_dropped_when_the_log_file_changed(db: Session) -> None:
+    db.exec(delete(TacacsLogDailyTotals).where(TacacsLogDailyTotals.log_date == _DAY))
+    node = log_summaries.summary_from_stats([(4, 1)], [(7, 0)], [(1, 1)])
+    sources = {
+        "authentication": (100, 1),
+        "authorization": (200, 2),
+        "accounting": None,
+    }
+    log_summaries.save_daily_totals(db, _DAY, "node-local", node, sources)
+    log_summaries.save_daily_totals(db, _DAY, "node-peer", node)
+
+    stored = log_summaries.get_daily_totals(db, _DAY, "node-local", sources)
+    assert set(stored) == {"node-local", "node-peer"}
+
+    grown = {**sources, "authorization": (250, 3)}
+    stored = log_summaries.get_daily_totals(db, _DAY, "node-local", grown)
+    assert set(stored) == {"node-peer"}
+
+    db.exec(delete(TacacsLogDailyTotals).where(TacacsLogDailyTotals.log_date == _DAY))
+    db.commit()
@@ -0,0 +1,52 @@
+import asyncio
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+from app.crud.log_watcher import LogWatcher
+from scripts._log_stats_base import build_log_file_path
+
+
+def _today_log(log_dir: Path, log_type: str) -> Path:
+    today = datetime.now(timezone.utc).date()
+    path = Path(build_log_file_path(today, log_type, f"{log_dir}/"))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+async def _changed(watcher: LogWatcher, timeout: float = 3.0) -> bool:
+    try:
+        await asyncio.wait_for(watcher.wait(), timeout)
+        return True
+    except TimeoutError:
+        return False
+
+
+@pytest.mark.parametrize("polling", [False, True])
+def test_wait_returns_on_appends_to_watched_logs_only(
+    tmp_path: Path, polling: bool
+) -> None:
+    auth = _today_log(tmp_path, "authentication")
+    acct = _today_log(tmp_path, "accounting")
+    auth.write_text("")
+    acct.write_text("")
+
+    async def main() -> None:
+        watcher = LogWatcher(f"{tmp_path}/", poll_seconds=0.05)
+        watcher.polling = polling
+        if polling:
+            await watcher.wait()  # first snapshot
+        pending = asyncio.create_task(_changed(watcher, timeout=0.8))
+        await asyncio.sleep(0.2)
+        with acct.open("a") as f:
+            f.write("accounting line\n")
+        assert not await pending
+
+        pending = asyncio.create_task(_changed(watcher))
+        await asyncio.sleep(0.2)
+        with auth.open("a") as f:
+            f.write("authentication line\n")
+        assert await pending
+
+    asyncio.run(main())
@@ -0,0 +1,116 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.crud.peer_stats import PeerStatsCollector
+
+
+def _payload(node: str) -> dict:
+    return {
+        "node_name": node,
+        "authorization": [
+            {
+                "username": "alice",
+                "nas_ip": "10.0.0.1",
+                "user_source_ip": "10.1.1.1",
+                "permit_count": 2,
+                "deny_count": 1,
+            }
+        ],
+    }
+
+
+@pytest.fixture(autouse=True)
+def _peers(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "PEER_NODES", "http://fast,http://slow")
+    monkeypatch.setattr(settings, "PEER_BACKEND_URL", "")
+    monkeypatch.setattr(settings, "INTERNAL_SYNC_TOKEN", "secret")
+
+
+def test_collect_queries_peers_concurrently_and_shares_results() -> None:
+    calls: list[str] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.host)
+        await asyncio.sleep(0.2)
+        return httpx.Response(200, json=_payload(request.url.host))
+
+    collector = PeerStatsCollector(transport=httpx.MockTransport(handler))
+    started = time.monotonic()
+    peers = collector.collect_by_node("2026-05-04")
+    assert time.monotonic() - started < 0.39  # both peers in ~one round trip
+
+    assert set(peers) == {"fast", "slow"}
+    assert not peers["fast"].stale
+    assert peers["fast"].rows("authorization")[0]["permit_count"] == 2
+
+    collector.collect("2026-05-04")  # served from the shared snapshot
+    assert sorted(calls) == ["fast", "slow"]
+
+
+def test_slow_peer_is_cut_at_deadline_and_reported_stale() -> None:
+    slow_delay = 0.0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "slow":
+            await asyncio.sleep(slow_delay)
+        return httpx.Response(200, json=_payload(request.url.host))
+
+    collector = PeerStatsCollector(
+        deadline=0.3, snapshot_ttl=0, transport=httpx.MockTransport(handler)
+    )
+    assert set(collector.collect_by_node("2026-05-04")) == {"fast", "slow"}
+
+    slow_delay = 5.0
+    started = time.monotonic()
+    peers = collector.collect_by_node("2026-05-04")
+    assert time.monotonic() - started < 1.0
+
+    assert not peers["fast"].stale
+    assert peers["slow"].stale  # the previous round's payload, marked stale
+    assert peers["slow"].error == "deadline exceeded"
+    assert peers["slow"].rows("authorization")
+
+    # A date without an earlier good payload has nothing to fall back to.
+    assert set(collector.collect_by_node("2026-05-05")) == {"fast"}
+
+
+def test_rows_are_requested_since_cursor_and_merged() -> None:
+    sent: list[dict] = []
+
+    def row(user: str, permit: int) -> dict:
+        return {
+            "username": user,
+            "nas_ip": "10.0.0.1",
+            "user_source_ip": "10.1.1.1",
+            "permit_count": permit,
+            "deny_count": 0,
+        }
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        params = dict(request.url.params)
+        sent.append(params)
+        since = params.get("since")
+        return httpx.Response(
+            200,
+            json={
+                "node_name": request.url.host,
+                "authorization": [row("bob", 4)] if since else [row("alice", 1)],
+                "totals": {"authorization": {"permit_count": 5, "deny_count": 0}},
+                "delta": {"authorization": bool(since)},
+                "cursor": "authorization=c1",
+            },
+        )
+
+    collector = PeerStatsCollector(
+        snapshot_ttl=0, transport=httpx.MockTransport(handler)
+    )
+    collector.collect("2026-05-04")
+    peer = collector.collect_by_node("2026-05-04")["fast"]
+
+    assert "since" not in sent[0] and sent[-1]["since"] == "authorization=c1"
+    assert sorted(r["username"] for r in peer.rows("authorization")) == ["alice", "bob"]
+    assert peer.totals("authorization") == (5, 0)
@@ -0,0 +1,101 @@
+from collections import Counter
+from datetime import date
+
+from sqlmodel import Session, delete, func, select
+
+from app.crud import aaa_statistics, statistics_partitions
+from app.crud.statistics_partitions import (
+    add_months,
+    partition_month,
+    partition_name,
+)
+from app.models import (
+    AaaStatisticsKeyRollup,
+    AaaStatisticsNode,
+    AaaStatisticsNodeDaily,
+    AuthenticationStatistics,
+)
+from scripts._log_stats_base import to_log_datetime
+
+_NODE = "test-partitions"
+
+
+def test_month_arithmetic_and_partition_names() -> None:
+    assert add_months(date(2025, 11, 1), 2) == date(2026, 1, 1)
+    assert add_months(date(2025, 1, 1), -1) == date(2024, 12, 1)
+    assert partition_name("authenticationstatistics", date(2025, 3, 1)) == (
+        "authenticationstatistics_p202503"
+    )
+    assert partition_month(
+        "authenticationstatistics", "authenticationstatistics_p202503"
+    ) == date(2025, 3, 1)
+    # Another table's partition, or a name without the suffix, is not ours.
+    assert (
+        partition_month("authenticationstatistics", "authorizationstatistics_p202503")
+        is None
+    )
+    assert (
+        partition_month("authenticationstatistics", "authenticationstatistics") is None
+    )
+
+
+def _partitions(db: Session) -> set[str]:
+    return {
+        name
+        for names in statistics_partitions._existing_partitions(db).values()
+        for name in names
+    }
+
+
+def test_writes_create_partitions_and_retention_drops_them(db: Session) -> None:
+    rows = aaa_statistics.statistics_rows(
+        "authentication",
+        (Counter({("alice", "10.0.0.1", "10.1.1.1"): 3}), Counter()),
+        to_log_datetime(date(2001, 1, 15)),
+        _NODE,
+    )
+    aaa_statistics.upsert_statistics(db, "authentication", rows)
+    assert {
+        "authenticationstatistics_p200101",
+        "authorizationstatistics_p200101",
+        "accountingstatistics_p200101",
+    } <= _partitions(db)
+
+    # A date range read only touches the partitions of its months.
+    plan = "\n".join(
+        row[0]
+        for row in db.connection().exec_driver_sql(
+            "EXPLAIN SELECT * FROM authenticationstatistics"
+            " WHERE log_date BETWEEN '2001-01-10' AND '2001-01-20'"
+        )
+    )
+    assert "authenticationstatistics_p200101" in plan
+    assert "authenticationstatistics_p2026" not in plan
+
+    dropped = statistics_partitions.drop_expired_partitions(
+        db, retention_months=2, today=date(2001, 4, 10)
+    )
+    db.commit()
+    assert "authenticationstatistics_p200101" in dropped
+    assert "authenticationstatistics_p200101" not in _partitions(db)
+    assert (
+        db.exec(
+            select(func.count()).where(AuthenticationStatistics.node_name == _NODE)
+        ).one()
+        == 0
+    )
+    # Rollups outlive the raw rows.
+    assert db.exec(
+        select(AaaStatisticsNodeDaily.auth_success).where(
+            AaaStatisticsNodeDaily.node_name == _NODE
+        )
+    ).all() == [3]
+
+    db.exec(
+        delete(AaaStatisticsNodeDaily).where(AaaStatisticsNodeDaily.node_name == _NODE)
+    )
+    db.exec(
+        delete(AaaStatisticsKeyRollup).where(AaaStatisticsKeyRollup.node_name == _NODE)
+    )
+    db.exec(delete(AaaStatisticsNode).where(AaaStatisticsNode.node_name == _NODE))
+    db.commit()
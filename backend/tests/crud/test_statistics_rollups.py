@@ -0,0 +1,256 @@
+import threading
+from collections import Counter
+from datetime import date, datetime
+from typing import Any
+
+from sqlalchemy import event, text
+from sqlmodel import Session, delete, select
+
+from app.core.db import engine
+from app.crud import aaa_statistics, statistics_rollups
+from app.crud.statistics_rollups import rollup_periods
+from app.models import (
+    AaaStatisticsKeyRollup,
+    AaaStatisticsNode,
+    AaaStatisticsNodeDaily,
+    AuthenticationStatistics,
+)
+from scripts._log_stats_base import to_log_datetime
+
+_NODE = "test-rollup"
+
+
+def test_rollup_periods_uses_whole_months_and_day_edges() -> None:
+    assert rollup_periods(date(2025, 1, 15), date(2025, 3, 3)) == (
+        (date(2025, 2, 1), date(2025, 2, 1)),
+        [(date(2025, 1, 15), date(2025, 1, 31)), (date(2025, 3, 1), date(2025, 3, 3))],
+    )
+    assert rollup_periods(date(2025, 1, 1), date(2025, 12, 31)) == (
+        (date(2025, 1, 1), date(2025, 12, 1)),
+        [],
+    )
+    assert rollup_periods(date(2025, 2, 3), date(2025, 2, 20)) == (
+        None,
+        [(date(2025, 2, 3), date(2025, 2, 20))],
+    )
+    assert rollup_periods(date(2025, 2, 3), date(2025, 2, 1)) == (None, [])
+
+
+def _write(db: Session, day: date, counts: dict[tuple[str, str, str], int]) -> None:
+    rows = aaa_statistics.statistics_rows(
+        "authentication", (Counter(counts), Counter()), to_log_datetime(day), _NODE
+    )
+    aaa_statistics.upsert_statistics(db, "authentication", rows)
+
+
+def _cleanup(db: Session) -> None:
+    db.exec(
+        delete(AuthenticationStatistics).where(
+            AuthenticationStatistics.node_name == _NODE
+        )
+    )
+    db.exec(
+        delete(AaaStatisticsNodeDaily).where(AaaStatisticsNodeDaily.node_name == _NODE)
+    )
+    db.exec(
+        delete(AaaStatisticsKeyRollup).where(AaaStatisticsKeyRollup.node_name == _NODE)
+    )
+    db.exec(delete(AaaStatisticsNode).where(AaaStatisticsNode.node_name == _NODE))
+    db.commit()
+
+
+def test_upsert_statistics_maintains_rollups(db: Session) -> None:
+    _write(db, date(2021, 1, 31), {("alice", "10.0.0.1", "10.1.1.1"): 1})
+    for day in range(1, 29):
+        _write(db, date(2021, 2, day), {("bob", "10.0.0.1", "10.1.1.2"): 2})
+    _write(db, date(2021, 3, 1), {("alice", "10.0.0.2", "10.1.1.1"): 9})
+    # Re-collecting a day replaces its rollups instead of adding to them.
+    _write(db, date(2021, 3, 1), {("alice", "10.0.0.2", "10.1.1.1"): 5})
+
+    daily = statistics_rollups.daily_totals(
+        db, date(2021, 2, 28), date(2021, 3, 1), _NODE
+    )
+    assert [(r.date, r.auth_success, r.auth_fail) for r in daily] == [
+        (date(2021, 2, 28), 2, 0),
+        (date(2021, 3, 1), 5, 0),
+    ]
+
+    top = statistics_rollups.top_keys(
+        db,
+        "authentication",
+        "username",
+        "first_count",
+        date(2021, 1, 31),
+        date(2021, 3, 1),
+        _NODE,
+    )
+    assert top == [("bob", 56), ("alice", 6)]
+    assert statistics_rollups.top_keys(
+        db,
+        "authentication",
+        "nas_ip",
+        "first_count",
+        date(2021, 2, 15),
+        date(2021, 3, 1),
+        _NODE,
+    ) == [("10.0.0.1", 28), ("10.0.0.2", 5)]
+
+    _cleanup(db)
+
+
+def test_month_rollup_tracks_rewritten_days(db: Session) -> None:
+    _write(db, date(2021, 4, 1), {("alice", "10.0.0.1", "10.1.1.1"): 3})
+    _write(db, date(2021, 4, 2), {("alice", "10.0.0.1", "10.1.1.1"): 4})
+    _write(db, date(2021, 4, 2), {("carol", "10.0.0.1", "10.1.1.3"): 1})
+    # Re-collecting a day replaces its share of the month instead of adding to it.
+    _write(db, date(2021, 4, 2), {("alice", "10.0.0.1", "10.1.1.1"): 2})
+
+    month = {
+        (row.dimension, row.value): (row.first_count, row.second_count)
+        for row in db.exec(
+            select(AaaStatisticsKeyRollup).where(
+                AaaStatisticsKeyRollup.grain == "month",
+                AaaStatisticsKeyRollup.period == date(2021, 4, 1),
+                AaaStatisticsKeyRollup.node_name == _NODE,
+            )
+        ).all()
+    }
+    assert month == {
+        ("username", "alice"): (5, 0),
+        ("username", "carol"): (1, 0),
+        ("nas_ip", "10.0.0.1"): (6, 0),
+        ("user_source_ip", "10.1.1.1"): (5, 0),
+        ("user_source_ip", "10.1.1.3"): (1, 0),
+    }
+
+    _cleanup(db)
+
+
+def _month_counts(db: Session, month: date) -> dict[tuple[str, str], int]:
+    rows = db.exec(
+        select(AaaStatisticsKeyRollup).where(
+            AaaStatisticsKeyRollup.grain == "month",
+            AaaStatisticsKeyRollup.period == month,
+            AaaStatisticsKeyRollup.node_name == _NODE,
+        )
+    ).all()
+    return {(row.dimension, row.value): row.first_count for row in rows}
+
+
+def test_concurrent_refreshes_of_a_day_are_serialised(db: Session) -> None:
+    day = date(2021, 5, 3)
+    _write(db, day, {("alice", "10.0.0.1", "10.1.1.1"): 3})
+
+    with Session(engine) as first:
+        # An uncommitted refresh of the same (log_type, day, node) holds its lock.
+        statistics_rollups.refresh_rollups(first, "authentication", [(day, _NODE)])
+
+        def second() -> None:
+            with Session(engine) as session:
+                _write(session, day, {("alice", "10.0.0.1", "10.1.1.1"): 7})
+
+        writer = threading.Thread(target=second)
+        writer.start()
+        writer.join(timeout=1)
+        assert writer.is_alive()  # waiting for the first refresh to commit
+        waits = db.execute(
+            text(
+                "SELECT count(*) FROM pg_stat_activity"
+                " WHERE wait_event_type = 'Lock' AND wait_event = 'advisory'"
+            )
+        ).scalar_one()
+        assert waits == 1
+        first.commit()
+    writer.join(timeout=10)
+    assert not writer.is_alive()
+
+    _write(db, day, {("alice", "10.0.0.1", "10.1.1.1"): 7})  # the same day again
+    db.expire_all()
+    assert _month_counts(db, date(2021, 5, 1)) == {
+        ("username", "alice"): 7,
+        ("nas_ip", "10.0.0.1"): 7,
+        ("user_source_ip", "10.1.1.1"): 7,
+    }
+
+    _cleanup(db)
+
+
+def test_date_range_statistics_is_one_statement(db: Session) -> None:
+    _write(db, date(2021, 6, 1), {("alice", "10.0.0.1", "10.1.1.1"): 4})
+    _write(db, date(2021, 6, 2), {("bob", "10.0.0.2", "10.1.1.2"): 7})
+    statements: list[str] = []
+
+    def count(_conn: Any, _cursor: Any, statement: str, *_args: Any) -> None:
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        result = aaa_statistics.get_date_range_statistics(
+            session=db,
+            start_date=datetime(2021, 6, 1),
+            end_date=datetime(2021, 6, 3),
+            limit=1,
+            node_name=_NODE,
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    assert len(statements) == 1
+    assert [d["count"] for d in result["last_range_days_authentication_success"]] == [
+        4,
+        7,
+        0,
+    ]
+    assert result["authentication_success_count_by_user"] == [
+        {"username": "bob", "success_count": 7}
+    ]
+    assert result["authorization_deny_count_by_user"] == []
+
+    _cleanup(db)
+
+
+def test_range_overview_adds_extra_keys_to_the_top(db: Session) -> None:
+    _write(db, date(2021, 7, 1), {("alice", "10.0.0.1", "10.1.1.1"): 9})
+    _write(db, date(2021, 7, 2), {("bob", "10.0.0.1", "10.1.1.2"): 5})
+    _write(db, date(2021, 7, 2), {("carol", "10.0.0.1", "10.1.1.3"): 1})
+    top_lists = {
+        "users": statistics_rollups.TopList(
+            "authentication",
+            "username",
+            "first_count",
+            date(2021, 7, 1),
+            date(2021, 7, 2),
+        )
+    }
+
+    overview = statistics_rollups.range_overview(
+        db,
+        date(2021, 7, 1),
+        date(2021, 7, 2),
+        top_lists,
+        _NODE,
+        limit=1,
+        extra_keys={"users": ["carol", "dave"]},
+    )
+    assert overview.top["users"] == [("alice", 9), ("carol", 1)]
+
+    _cleanup(db)
+
+
+def test_upsert_statistics_registers_nodes(db: Session) -> None:
+    _write(db, date(2021, 9, 10), {("alice", "10.0.0.1", "10.1.1.1"): 1})
+    assert _NODE in aaa_statistics.get_distinct_node_names()
+
+    _write(db, date(2021, 9, 3), {("alice", "10.0.0.1", "10.1.1.1"): 1})
+    _write(db, date(2021, 9, 20), {("alice", "10.0.0.1", "10.1.1.1"): 1})
+    node = db.get(AaaStatisticsNode, _NODE)
+    assert node is not None
+    assert (node.first_log_date, node.last_log_date) == (
+        date(2021, 9, 3),
+        date(2021, 9, 20),
+    )
+    # Known nodes with days inside their span do not count as new.
+    assert not statistics_rollups.register_nodes(db, [(date(2021, 9, 15), _NODE)])
+    db.rollback()
+
+    _cleanup(db)
@@ -0,0 +1,64 @@
+import json
+
+import httpx
+
+from app.crud.stats_transport import (
+    COLUMNAR_MEDIA_TYPE,
+    columnar_response,
+    decode_stats_response,
+    from_columnar,
+    to_columnar,
+    wants_columnar,
+)
+
+_PAYLOAD = {
+    "node_name": "node-b",
+    "date": "2026-05-04",
+    "totals": {"authorization": {"permit_count": 3, "deny_count": 1}},
+    "authorization": [
+        {
+            "username": f"user{i % 3}",
+            "nas_ip": "10.0.0.1",
+            "user_source_ip": f"10.1.1.{i}",
+            "permit_count": i,
+            "deny_count": 1,
+            "log_date": "2026-05-04T00:00:00+00:00",
+        }
+        for i in range(200)
+    ],
+    "accounting": [],
+}
+
+
+def test_columnar_round_trip_and_dictionary_encoding() -> None:
+    encoded = to_columnar(_PAYLOAD)
+
+    assert encoded["columns"]["accounting"] == {}
+    assert encoded["columns"]["authorization"]["permit_count"][:3] == [0, 1, 2]
+    # 3 usernames + 1 NAS + 200 clients + 1 date, each stored once
+    assert len(encoded["strings"]) == 205
+    assert from_columnar(encoded) == _PAYLOAD
+
+
+def test_response_is_gzipped_and_decoded_transparently() -> None:
+    response = columnar_response(_PAYLOAD)
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.body) < len(json.dumps(_PAYLOAD)) / 10
+
+    resp = httpx.Response(
+        200,
+        content=response.body,
+        headers={
+            "content-type": COLUMNAR_MEDIA_TYPE,
+            "content-encoding": "gzip",
+        },
+    )
+    assert decode_stats_response(resp) == _PAYLOAD
+    # Peers without the columnar encoding answer with plain JSON.
+    assert decode_stats_response(httpx.Response(200, json=_PAYLOAD)) == _PAYLOAD
+
+
+def test_wants_columnar() -> None:
+    assert wants_columnar(f"{COLUMNAR_MEDIA_TYPE}, application/json;q=0.5")
+    assert not wants_columnar("application/json")
+    assert not wants_columnar(None)
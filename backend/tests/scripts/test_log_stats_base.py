@@ -0,0 +1,191 @@
+import os
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+from scripts._log_stats_base import (
+    LogTail,
+    build_log_file_path,
+    classify_line,
+    classify_result,
+    count_log_file,
+    extract_command,
+    iter_lines_between,
+    iter_lines_reversed,
+    parse_log_line,
+    timestamp_epoch,
+)
+
+_DAY = date(2026, 5, 4)
+_PERMIT = "2026-05-04 10:00:00 +0000\t10.0.0.1\talice\tvty0\t10.1.1.1\tprof permit shell show version\n"
+_DENY = "2026-05-04 10:00:01 +0000\t10.0.0.1\tbob\tvty1\t10.1.1.2\tprof deny shell configure\n"
+
+
+def _log_path(log_dir: Path) -> Path:
+    path = Path(build_log_file_path(_DAY, "authorization", f"{log_dir}/"))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+class _Collector:
+    def __init__(self) -> None:
+        self.lines: list[str] = []
+        self.resets = 0
+
+    def consume(self, lines: list[str]) -> None:
+        self.lines.extend(lines)
+
+    def reset(self) -> None:
+        self.lines.clear()
+        self.resets += 1
+
+
+def test_parse_log_line_fields() -> None:
+    parsed = parse_log_line("authorization", _PERMIT)
+    assert parsed is not None
+    assert parsed.username == "alice"
+    assert parsed.nas_ip == "10.0.0.1"
+    assert parsed.client_ip == "10.1.1.1"
+    assert parsed.port == "vty0"
+    assert parsed.message == "prof permit shell show version"
+    assert classify_result("authorization", parsed.message) == "permit"
+    assert extract_command("authorization", parsed.message) == "show version"
+    assert parse_log_line("authorization", "garbage line\n") is None
+
+
+def test_authorization_outcome_is_not_read_from_the_profile_name() -> None:
+    prefix = "2026-05-04 10:00:00 +0000\t10.0.0.1\talice\tvty0\t10.0.0.9\t"
+    key = ("alice", "10.0.0.1", "10.0.0.9")
+    line = prefix + "permit-all deny shell show run <cr>"
+    assert classify_line("authorization", line) == (key, 1)
+    line = prefix + "deny-list permit shell show run"
+    assert classify_line("authorization", line) == (key, 0)
+    assert classify_result("authorization", "permit shell show run") == "permit"
+
+
+def test_parse_auth_line_without_client_ip() -> None:
+    line = "2026-05-04 10:00:00 +0000\t10.0.0.1\talice\t39001\tpap login failed\n"
+    parsed = parse_log_line("authentication", line)
+    assert parsed is not None
+    assert parsed.client_ip == "10.0.0.1"
+    assert parsed.port == "39001"
+    assert classify_result("authentication", parsed.message) == "failed"
+
+
+def test_log_tail_only_reads_appended_lines(tmp_path: Path) -> None:
+    path = _log_path(tmp_path)
+    path.write_text(_PERMIT + _DENY)
+    tail = LogTail(str(path))
+    seen = _Collector()
+
+    tail.read_new_lines(seen.consume, seen.reset)
+    assert seen.lines == [_PERMIT.rstrip("\n"), _DENY.rstrip("\n")]
+
+    with path.open("a") as f:
+        f.write(_PERMIT)
+    tail.read_new_lines(seen.consume, seen.reset)
+    assert len(seen.lines) == 3
+    assert seen.resets == 0
+
+
+def test_log_tail_buffers_partial_line(tmp_path: Path) -> None:
+    path = _log_path(tmp_path)
+    path.write_text(_PERMIT + _DENY[:20])
+    tail = LogTail(str(path))
+    seen = _Collector()
+
+    tail.read_new_lines(seen.consume, seen.reset)
+    assert seen.lines == [_PERMIT.rstrip("\n")]
+
+    with path.open("a") as f:
+        f.write(_DENY[20:])
+    tail.read_new_lines(seen.consume, seen.reset)
+    assert seen.lines[-1] == _DENY.rstrip("\n")
+
+
+def test_log_tail_handles_truncation_and_rotation(tmp_path: Path) -> None:
+    path = _log_path(tmp_path)
+    path.write_text(_PERMIT * 3)
+    tail = LogTail(str(path))
+    seen = _Collector()
+    tail.read_new_lines(seen.consume, seen.reset)
+    assert len(seen.lines) == 3
+
+    # Truncated in place: shorter than the saved offset.
+    path.write_text(_DENY)
+    tail.read_new_lines(seen.consume, seen.reset)
+    assert seen.resets == 1
+    assert seen.lines == [_DENY.rstrip("\n")]
+
+    # Rotated: a new inode at the same path.
+    os.rename(path, path.with_suffix(".old"))
+    path.write_text(_PERMIT * 5 + _DENY * 2)
+    tail.read_new_lines(seen.consume, seen.reset)
+    assert seen.resets == 2
+    assert len(seen.lines) == 7
+
+
+def test_iter_lines_reversed(tmp_path: Path) -> None:
+    path = tmp_path / "x.log"
+    path.write_text("first\n\nthird\nlast\n")
+    assert list(iter_lines_reversed(str(path))) == ["last", "third", "", "first"]
+
+    path.write_text("no trailing newline\nend")
+    assert list(iter_lines_reversed(str(path))) == ["end", "no trailing newline"]
+
+    path.write_text("")
+    assert list(iter_lines_reversed(str(path))) == []
+
+
+def test_timestamp_epoch_matches_strptime() -> None:
+    for timestamp in (
+        "2026-05-04 10:00:00 +0000",
+        "2026-05-04 00:30:59 +0700",
+        "2026-12-31 23:59:59 -0530",
+        "2024-02-29 12:00:01 +1245",
+    ):
+        expected = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S %z").timestamp()
+        assert timestamp_epoch(timestamp) == expected
+
+
+def test_iter_lines_between_matches_a_linear_scan(tmp_path: Path) -> None:
+    path = tmp_path / "x.log"
+    base = timestamp_epoch("2026-05-04 00:00:00 +0000")
+    lines = []
+    for i in range(500):
+        # Mixed UTC offsets, repeated seconds and lines without a timestamp.
+        epoch = base + i * 7 // 3
+        offset = "+0200" if i % 3 else "-0100"
+        local = datetime.fromtimestamp(epoch + (7200 if i % 3 else -3600), timezone.utc)
+        lines.append(f"{local:%Y-%m-%d %H:%M:%S} {offset}\t10.0.0.1\tuser{i}\tok")
+        if i % 11 == 0:
+            lines.append(f"continued {i}")
+    path.write_text("\n".join(lines))
+
+    def stamped(found: list[str]) -> list[str]:
+        return [line for line in found if not line.startswith("continued")]
+
+    for start, end in ((0, 10), (100, 433), (base, base + 10**6), (-5, -1)):
+        start_epoch, end_epoch = base + start, base + end
+        expected = [
+            line
+            for line in stamped(lines)
+            if start_epoch <= timestamp_epoch(line[:25]) <= end_epoch
+        ]
+        found = list(iter_lines_between(str(path), start_epoch, end_epoch))
+        assert stamped(found) == expected
+    assert "continued 110" in iter_lines_between(str(path), base + 100, base + 433)
+    assert list(iter_lines_between(str(path), base + 2000, base + 3000)) == []
+
+    path.write_text("")
+    assert list(iter_lines_between(str(path), base, base + 10)) == []
+
+
+def test_count_log_file_counts_lines_and_keys(tmp_path: Path) -> None:
+    path = _log_path(tmp_path)
+    other_day = _PERMIT.replace("2026-05-04", "2026-05-03")
+    path.write_text(_PERMIT + _DENY + _PERMIT + other_day + "garbage\n")
+
+    (permitted, denied), lines_read = count_log_file(_DAY, "authorization", str(path))
+    assert lines_read == 5
+    assert permitted == {("alice", "10.0.0.1", "10.1.1.1"): 2}
+    assert denied == {("bob", "10.0.0.1", "10.1.1.2"): 1}
@@ -278,8 +278,10 @@ function RuleDialog({
             >
               <option value="fail_count">Fail Count</option>
               <option value="deny_count">Deny Count</option>
-              <option value="username">New Username</option>
+              <option value="username">Username</option>
               <option value="client_ip">Source IP</option>
+              <option value="nas_ip">NAS IP</option>
+              <option value="command">Command</option>
             </select>
             {form.condition_field === "client_ip" && (
               <Text fontSize="xs" color="fg.muted" mt={1}>